@@ -359,6 +359,7 @@ class CLIApp:
                 self._render_status()
 
         self._persist()
+        self._close_knowledge_base()
 
     def handle_line(self, raw_line: str) -> CommandResponse:
         """Handle a single line of user input (used by tests and run loop)."""
@@ -788,14 +789,16 @@ class CLIApp:
         env_summary = "; ".join(runtime_ctx_parts) if runtime_ctx_parts else None
 
         # Build conversation history and append a notice to treat the new prompt as a fresh task
-        conv_history = self.context_manager.conversation_history()
-        conv_history.append({
-            "role": "system",
-            "content": (
-                "Notice: The user has provided new instructions. Treat this prompt as a new task and "
-                "abandon any previous plans/TODOs unless the user explicitly asks to continue them."
-            ),
-        })
+        conv_history = [
+            *self.context_manager.iter_conversation_history(),
+            {
+                "role": "system",
+                "content": (
+                    "Notice: The user has provided new instructions. Treat this prompt as a new task and "
+                    "abandon any previous plans/TODOs unless the user explicitly asks to continue them."
+                ),
+            },
+        ]
 
         context = AgentLoopContext(
             prompt=prompt,
@@ -1170,6 +1173,17 @@ class CLIApp:
         except PermissionError:
             pass
 
+    def _close_knowledge_base(self) -> None:
+        """Finalize the `/kb` client, if one was created, before exiting."""
+        client = getattr(self, "_knowledge_base_client", None)
+        if client is None:
+            return
+        try:
+            client.close()
+        except Exception:  # noqa: BLE001
+            logger.debug("Failed to close knowledge base client", exc_info=True)
+        self._knowledge_base_client = None
+
     def _persist(self) -> None:
         if self.session_manager is not None:
             self.session_manager.save(self.session_context)
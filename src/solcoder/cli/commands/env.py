@@ -39,7 +39,7 @@ def register(_app: CLIApp, router: CommandRouter) -> None:
         return CommandResponse(messages=[("system", USAGE)])
 
     def _handle_diag(_args: list[str]) -> CommandResponse:
-        results = collect_environment_diagnostics()
+        results = collect_environment_diagnostics(refresh=True)
         content = _format_env_diag(results)
         total = len(results)
         missing = sum(not item.found for item in results)
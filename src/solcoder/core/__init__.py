@@ -13,9 +13,15 @@ from .agent import (
     AgentToolResult,
     build_tool_manifest,
     manifest_to_prompt_section,
+    tool_manifest_prompt,
     parse_agent_directive,
 )
-from .env_diag import DiagnosticResult, ToolRequirement, collect_environment_diagnostics
+from .env_diag import (
+    DiagnosticResult,
+    ToolRequirement,
+    clear_env_diag_cache,
+    collect_environment_diagnostics,
+)
 from .exec_ua import build_exec_ua_header, clear_exec_ua_cache
 from .knowledge_base import KnowledgeBaseAnswer, KnowledgeBaseClient, KnowledgeBaseError
 from .templates import RenderOptions, TemplateError, TemplateExistsError, TemplateNotFoundError, available_templates, render_template
@@ -31,6 +37,7 @@ from .context import (
     ContextManager,
     HistoryCompactionStrategy,
     RollingHistoryStrategy,
+    SlidingWindowStrategy,
     DEFAULT_HISTORY_LIMIT,
     DEFAULT_SUMMARY_KEEP,
     DEFAULT_SUMMARY_MAX_WORDS,
@@ -47,12 +54,14 @@ __all__ = [
     "AgentToolResult",
     "build_tool_manifest",
     "manifest_to_prompt_section",
+    "tool_manifest_prompt",
     "parse_agent_directive",
     "ConfigManager",
     "ConfigContext",
     "SolCoderConfig",
     "ConfigurationError",
     "DEFAULT_CONFIG_DIR",
+    "clear_env_diag_cache",
     "collect_environment_diagnostics",
     "DiagnosticResult",
     "ToolRequirement",
@@ -70,6 +79,7 @@ __all__ = [
     "ContextManager",
     "HistoryCompactionStrategy",
     "RollingHistoryStrategy",
+    "SlidingWindowStrategy",
     "DEFAULT_HISTORY_LIMIT",
     "DEFAULT_SUMMARY_KEEP",
     "DEFAULT_SUMMARY_MAX_WORDS",
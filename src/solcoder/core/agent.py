@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import weakref
 from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import Any, Literal
@@ -127,6 +128,22 @@ def manifest_to_prompt_section(toolkits: Iterable[ToolManifestToolkit]) -> str:
     return json.dumps(serialisable, separators=(",", ":"))
 
 
+# Rendered manifest per registry, tagged with the registry revision it reflects.
+_manifest_prompt_cache: weakref.WeakKeyDictionary[ToolRegistry, tuple[int, str]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def tool_manifest_prompt(registry: ToolRegistry) -> str:
+    """Return the prompt manifest JSON for ``registry``, reusing it until the registry changes."""
+    cached = _manifest_prompt_cache.get(registry)
+    if cached is not None and cached[0] == registry.revision:
+        return cached[1]
+    rendered = manifest_to_prompt_section(build_tool_manifest(registry))
+    _manifest_prompt_cache[registry] = (registry.revision, rendered)
+    return rendered
+
+
 def parse_agent_directive(raw_payload: str) -> AgentDirective:
     """Parse and validate an LLM directive payload."""
     try:
@@ -149,5 +166,6 @@ __all__ = [
     "ToolManifestTool",
     "build_tool_manifest",
     "manifest_to_prompt_section",
+    "tool_manifest_prompt",
     "parse_agent_directive",
 ]
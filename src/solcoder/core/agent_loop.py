@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import time
 from collections.abc import Callable, Sequence
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -19,19 +21,44 @@ from solcoder.core import (
     AgentMessageError,
     AgentToolResult,
     ConfigContext,
-    build_tool_manifest,
     build_exec_ua_header,
-    manifest_to_prompt_section,
     parse_agent_directive,
+    tool_manifest_prompt,
 )
-from solcoder.core.todo import TodoItem, TodoManager
+from solcoder.core.todo import TodoManager
 from solcoder.core.todo import _normalize_title as _todo_normalize_title
 from solcoder.core.tool_registry import ToolRegistry, ToolRegistryError
 from solcoder.session import SessionMetadata
 
 DEFAULT_AGENT_MAX_ITERATIONS = 100
+DEFAULT_AGENT_MAX_WALL_SECONDS = 1800.0
+DEFAULT_AGENT_MAX_TOTAL_TOKENS = 2_000_000
+DEFAULT_AGENT_MAX_CONSECUTIVE_ERRORS = 3
 AGENT_PLAN_ACK = json.dumps({"type": "plan_ack", "status": "ready"})
 
+# Loop-local history budget (rough bytes/4 token estimate). Above the soft limit the
+# oldest tool results are folded into a single marker; above the hard limit the
+# oldest loop prompt/reply pairs are dropped outright.
+_HISTORY_SOFT_TOKENS = 6000
+_HISTORY_HARD_TOKENS = 8000
+_HISTORY_KEEP_TOOL_RESULTS = 2
+_HISTORY_MIN_TAIL = 4
+_TOOL_RESULT_PREFIX = '{"type": "tool_result"'
+_COMPRESSED_PREFIX = "[compressed: "
+
+# Per-iteration LLM payload snapshots are a debugging aid; skip serialising them
+# unless explicitly requested.
+_LLM_LOG_ENABLED = os.environ.get("SOLCODER_LLM_LOG", "").strip().lower() not in {
+    "",
+    "0",
+    "false",
+    "no",
+}
+_LLM_LOG_PARSE_LIMIT = 65536
+
+# Shared spinner label; status updates never mutate the Text they are given.
+_STATUS_THINKING = Text("Thinking…", style="solcoder.status.text")
+
 if TYPE_CHECKING:  # pragma: no cover
     from solcoder.cli.types import CommandResponse, LLMBackend
 
@@ -53,6 +80,80 @@ class AgentLoopContext:
     initial_todo_message: str | None = None
     max_iterations: int = DEFAULT_AGENT_MAX_ITERATIONS
     env_summary: str | None = None
+    max_wall_seconds: float | None = DEFAULT_AGENT_MAX_WALL_SECONDS
+    max_total_tokens: int | None = DEFAULT_AGENT_MAX_TOTAL_TOKENS
+    max_consecutive_errors: int = DEFAULT_AGENT_MAX_CONSECUTIVE_ERRORS
+
+
+@dataclass(slots=True)
+class _LoopUsage:
+    """Latency and token totals gathered across one agent loop run."""
+
+    latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    finish_reason: str | None = None
+    all_cached: bool = True
+
+
+def _accumulate_usage(
+    usage: _LoopUsage, result: Any, metadata: SessionMetadata
+) -> None:
+    usage.latency += getattr(result, "latency_seconds", 0.0)
+    finish = getattr(result, "finish_reason", None)
+    if finish:
+        usage.finish_reason = finish
+    if not getattr(result, "cached", False):
+        usage.all_cached = False
+    token_usage = getattr(result, "token_usage", None)
+    if not token_usage:
+        return
+    input_tokens = int(
+        token_usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
+    )
+    output_tokens = int(
+        token_usage.get("output_tokens") or token_usage.get("completion_tokens") or 0
+    )
+    input_tokens = max(input_tokens, 0)
+    output_tokens = max(output_tokens, 0)
+    usage.input_tokens += input_tokens
+    usage.output_tokens += output_tokens
+    metadata.llm_input_tokens += input_tokens
+    metadata.llm_output_tokens += output_tokens
+    metadata.llm_last_input_tokens = input_tokens
+    metadata.llm_last_output_tokens = output_tokens
+
+
+def _loop_budget_message(
+    ctx: AgentLoopContext,
+    usage: _LoopUsage,
+    *,
+    started_at: float,
+    consecutive_errors: int,
+) -> str | None:
+    """Return a stop message once the loop exceeds its time, token, or retry budget."""
+    if (
+        ctx.max_wall_seconds is not None
+        and time.monotonic() - started_at > ctx.max_wall_seconds
+    ):
+        return (
+            "Agent loop stopped after exceeding the "
+            f"{ctx.max_wall_seconds:g}s time budget."
+        )
+    if (
+        ctx.max_total_tokens is not None
+        and usage.input_tokens + usage.output_tokens > ctx.max_total_tokens
+    ):
+        return (
+            "Agent loop stopped after exceeding the "
+            f"{ctx.max_total_tokens} token budget."
+        )
+    if consecutive_errors > ctx.max_consecutive_errors:
+        return (
+            "Agent loop stopped after "
+            f"{consecutive_errors} consecutive rejected directives."
+        )
+    return None
 
 
 def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
@@ -61,20 +162,31 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         CommandResponse,  # Local import to avoid circular dependency
     )
 
-    manifest = build_tool_manifest(ctx.tool_registry)
-    manifest_json = manifest_to_prompt_section(manifest)
     exec_ua_header = build_exec_ua_header()
-    system_prompt = _agent_system_prompt(
-        ctx.config_context,
-        manifest_json,
-        exec_ua_header,
-        ctx.todo_manager,
-        runtime_context=ctx.env_summary,
-    )
+
+    def _build_system_prompt(*, include_manifest: bool) -> str:
+        manifest_json = None
+        if include_manifest:
+            manifest_json = tool_manifest_prompt(ctx.tool_registry)
+        return _agent_system_prompt(
+            ctx.config_context,
+            manifest_json,
+            exec_ua_header,
+            ctx.todo_manager,
+            runtime_context=ctx.env_summary,
+        )
+
+    # Without TODO state the first turn is often a one-shot answer, so start with a
+    # prompt that omits the tool manifest and only pay for it once tools are needed.
+    light_first_turn = ctx.todo_manager is None and not ctx.initial_todo_message
+    system_prompt = _build_system_prompt(include_manifest=not light_first_turn)
+    iteration_limit = ctx.max_iterations
 
     loop_history = list(ctx.history)
     if ctx.initial_todo_message:
         loop_history.append({"role": "system", "content": ctx.initial_todo_message})
+    loop_history_start = len(loop_history)
+    history_budget = _HistoryBudget(start=loop_history_start)
     pending_prompt = ctx.prompt
     plan_received = False
     rendered_roles: set[str] = set()
@@ -83,12 +195,9 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
     display_messages: list[tuple[str, str]] = []
     tool_summaries: list[dict[str, Any]] = []
     logger = logging.getLogger(__name__)
-    total_latency = 0.0
-    total_input_tokens = 0
-    total_output_tokens = 0
-    last_finish_reason: str | None = None
-    all_cached = True
+    usage = _LoopUsage()
     retry_payload: str | None = None
+    consecutive_errors = 0
     todo_render_revision = -1
     should_exit = False
     if ctx.todo_manager is not None:
@@ -105,46 +214,22 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         ctx.config_context
     )
 
-    def _accumulate_usage(result: Any) -> None:
-        nonlocal total_latency, total_input_tokens, total_output_tokens, last_finish_reason, all_cached
-        total_latency += getattr(result, "latency_seconds", 0.0)
-        finish = getattr(result, "finish_reason", None)
-        if finish:
-            last_finish_reason = finish
-        if not getattr(result, "cached", False):
-            all_cached = False
-        token_usage = getattr(result, "token_usage", None)
-        if not token_usage:
-            return
-        input_tokens = int(
-            token_usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
-        )
-        output_tokens = int(
-            token_usage.get("output_tokens")
-            or token_usage.get("completion_tokens")
-            or 0
-        )
-        input_tokens = max(input_tokens, 0)
-        output_tokens = max(output_tokens, 0)
-        total_input_tokens += input_tokens
-        total_output_tokens += output_tokens
-        metadata = ctx.session_metadata
-        metadata.llm_input_tokens += input_tokens
-        metadata.llm_output_tokens += output_tokens
-        metadata.llm_last_input_tokens = input_tokens
-        metadata.llm_last_output_tokens = output_tokens
-
     def _log_llm_payload(
         *, prompt: str, history: Sequence[dict[str, str]], system_prompt: str, iteration: int
     ) -> None:
+        if not _LLM_LOG_ENABLED:
+            return
         try:
             llm_log_dir.mkdir(parents=True, exist_ok=True)
-            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+            timestamp_ns = time.time_ns()
             session_id = ctx.session_metadata.session_id
-            filename = f"{timestamp}_iter{iteration:04d}_{session_id}.json"
+            filename = f"{timestamp_ns:x}_iter{iteration:04d}_{session_id}.json"
             prompt_entry: dict[str, Any] = {"raw": prompt}
-            prompt_stripped = prompt.strip()
-            if prompt_stripped:
+            prompt_stripped = prompt.lstrip()
+            if (
+                prompt_stripped[:1] in ("{", "[")
+                and len(prompt_stripped) < _LLM_LOG_PARSE_LIMIT
+            ):
                 try:
                     parsed = json.loads(prompt_stripped)
                 except json.JSONDecodeError:
@@ -155,7 +240,9 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                         prompt_entry["type"] = parsed.get("type")
             payload = {
                 "session_id": session_id,
-                "timestamp": timestamp,
+                "timestamp": datetime.fromtimestamp(
+                    timestamp_ns / 1e9, timezone.utc
+                ).isoformat(),
                 "iteration": iteration,
                 "system_prompt": system_prompt,
                 "prompt": prompt_entry,
@@ -167,6 +254,11 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         except Exception:  # noqa: BLE001
             pass
 
+    def _emit(role: str, message: str) -> None:
+        display_messages.append((role, message))
+        ctx.render_message(role, message)
+        rendered_roles.add(role)
+
     def _emit_raw_llm_response(raw_reply: str) -> None:
         if not ctx.print_raw_llm:
             return
@@ -180,7 +272,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
 
     iteration = 0
     cancelled = False
-    status_message = Text("Thinking…", style="solcoder.status.text")
+    status_message = _STATUS_THINKING
 
     def _maybe_render_todo(payload: Any) -> None:
         if not isinstance(payload, dict):
@@ -196,21 +288,16 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         nonlocal todo_render_revision
         if revision is not None and revision == todo_render_revision:
             return
-        display_messages.append(("agent", todo_render))
-        ctx.render_message("agent", todo_render)
-        rendered_roles.add("agent")
+        _emit("agent", todo_render)
         if revision is not None:
             todo_render_revision = revision
 
     def _append_todo_instruction(step_title: str | None = None) -> None:
         if ctx.todo_manager is None:
             return
-        open_tasks = [
-            task for task in ctx.todo_manager.tasks() if task.status != "done"
-        ]
-        if not open_tasks:
+        next_task = ctx.todo_manager.next_open_task()
+        if next_task is None:
             return
-        next_task = open_tasks[0]
         instruction = (
             "TODO reminder: Review the pending checklist items before continuing. "
             f"Next pending task: {next_task.id} — {next_task.title}. "
@@ -332,11 +419,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         active = ctx.todo_manager.active_task()
         if active is None:
             return None
-        first_open: TodoItem | None = None
-        for task in ctx.todo_manager.tasks():
-            if task.status != "done":
-                first_open = task
-                break
+        first_open = ctx.todo_manager.next_open_task()
         if first_open is None:
             return None
         if first_open.id == active.id:
@@ -354,8 +437,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
         if not tasks:
             ctx.todo_manager.acknowledge()
             return
-        remaining = [task for task in tasks if task.status != "done"]
-        if remaining:
+        if ctx.todo_manager.next_open_task() is not None:
             if ctx.todo_manager.acknowledged:
                 return
             reminder = (
@@ -363,19 +445,31 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                 f"{ctx.todo_manager.render()}\n"
                 "Use `/todo done <id>` to complete items or `/todo clear` to remove them."
             )
-            display_messages.append(("system", reminder))
-            ctx.render_message("system", reminder)
-            rendered_roles.add("system")
+            _emit("system", reminder)
             ctx.todo_manager.acknowledge()
         else:
             ctx.todo_manager.acknowledge()
 
     with ctx.console.status(status_message, spinner="dots") as status_indicator:
         try:
-            while iteration < ctx.max_iterations:
+            started_at = time.monotonic()
+            while iteration < iteration_limit:
+                if iteration:
+                    budget_message = _loop_budget_message(
+                        ctx,
+                        usage,
+                        started_at=started_at,
+                        consecutive_errors=consecutive_errors,
+                    )
+                    if budget_message is not None:
+                        _emit("system", budget_message)
+                        break
                 iteration += 1
                 status_indicator.update(status_message)
                 tokens: list[str] = []
+                _compact_loop_history(
+                    loop_history, start=loop_history_start, budget=history_budget
+                )
                 try:
                     _log_llm_payload(
                         prompt=pending_prompt,
@@ -393,9 +487,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                     if isinstance(exc, ToolRegistryError):
                         raise
                     error_message = f"LLM error: {exc}"
-                    display_messages.append(("system", error_message))
-                    ctx.render_message("system", error_message)
-                    rendered_roles.add("system")
+                    _emit("system", error_message)
                     break
 
                 reply_text = "".join(tokens) or getattr(result, "text", "")
@@ -404,9 +496,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
 
                 if not reply_text:
                     error_message = "LLM returned an empty directive."
-                    display_messages.append(("system", error_message))
-                    ctx.render_message("system", error_message)
-                    rendered_roles.add("system")
+                    _emit("system", error_message)
                     break
 
                 try:
@@ -417,9 +507,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                             "LLM failed to provide a valid directive after a retry. "
                             f"Error: {exc}"
                         )
-                        display_messages.append(("system", error_message))
-                        ctx.render_message("system", error_message)
-                        rendered_roles.add("system")
+                        _emit("system", error_message)
                         break
                     logger.warning("Invalid agent directive: %s", exc)
                     had_invalid_directive = True
@@ -440,7 +528,19 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
 
                 loop_history.append({"role": "assistant", "content": reply_text})
                 retry_payload = None
-                _accumulate_usage(result)
+                _accumulate_usage(usage, result, ctx.session_metadata)
+
+                if light_first_turn:
+                    light_first_turn = False
+                    if directive.type in {"plan", "tool_request"}:
+                        # Replay the original prompt with the full tool manifest; drop
+                        # everything the light turn added, including invalid-reply retries.
+                        del loop_history[loop_history_start:]
+                        history_budget.reset()
+                        system_prompt = _build_system_prompt(include_manifest=True)
+                        pending_prompt = ctx.prompt
+                        iteration_limit += 1
+                        continue
 
                 if not plan_received:
                     if directive.type == "plan":
@@ -501,15 +601,14 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                                 directive.steps or [], directive.message
                             )
                             if plan_text.strip():
-                                display_messages.append(("agent", plan_text))
-                                ctx.render_message("agent", plan_text)
-                                rendered_roles.add("agent")
+                                _emit("agent", plan_text)
                         if directive.steps:
                             status_message = Text(
                                 directive.steps[0], style="solcoder.status.text"
                             )
                         pending_prompt = json.dumps(ack_payload)
                         had_invalid_directive = False
+                        consecutive_errors = 0
                         continue
 
                     sequence_warning = _enforce_task_sequence()
@@ -521,6 +620,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                                 "message": sequence_warning,
                             }
                         )
+                        consecutive_errors += 1
                         continue
 
                     if directive.type == "reply":
@@ -538,24 +638,21 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                                     ),
                                 }
                             )
+                            consecutive_errors += 1
                             continue
                         final_message = directive.message or ""
                         if directive.step_title:
                             final_message = f"{directive.step_title}\n{final_message}"
-                        display_messages.append(("agent", final_message))
-                        ctx.render_message("agent", final_message)
-                        rendered_roles.add("agent")
-                        status_message = Text("Thinking…", style="solcoder.status.text")
+                        _emit("agent", final_message)
+                        status_message = _STATUS_THINKING
                         _handle_completion_todo()
                         break
                     if directive.type == "cancel":
                         cancel_message = (
                             directive.message or "Agent cancelled the request."
                         )
-                        display_messages.append(("system", cancel_message))
-                        ctx.render_message("system", cancel_message)
-                        rendered_roles.add("system")
-                        status_message = Text("Thinking…", style="solcoder.status.text")
+                        _emit("system", cancel_message)
+                        status_message = _STATUS_THINKING
                         _handle_completion_todo()
                         break
                     pending_prompt = json.dumps(
@@ -566,6 +663,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                             ),
                         }
                     )
+                    consecutive_errors += 1
                     continue
 
                 if directive.type == "plan":
@@ -628,15 +726,14 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                             directive.steps or [], directive.message
                         )
                         if plan_text.strip():
-                            display_messages.append(("agent", plan_text))
-                            ctx.render_message("agent", plan_text)
-                            rendered_roles.add("agent")
+                            _emit("agent", plan_text)
                     if directive.steps:
                         status_message = Text(
                             directive.steps[0], style="solcoder.status.text"
                         )
                     pending_prompt = json.dumps(ack_payload)
                     had_invalid_directive = False
+                    consecutive_errors = 0
                     continue
 
                 sequence_warning = _enforce_task_sequence()
@@ -645,9 +742,11 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                     pending_prompt = json.dumps(
                         {"type": "error", "message": sequence_warning}
                     )
+                    consecutive_errors += 1
                     continue
 
                 if directive.type == "tool_request":
+                    consecutive_errors = 0
                     tool_name = directive.tool.name
                     step_title = directive.step_title or tool_name
                     tool_args = directive.tool.args
@@ -683,9 +782,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                     preview_rendered = False
                     if not is_todo_tool and not suppress_preview:
                         preview = _format_tool_preview(step_title, output)
-                        display_messages.append(("agent", preview))
-                        ctx.render_message("agent", preview)
-                        rendered_roles.add("agent")
+                        _emit("agent", preview)
                         preview_rendered = True
                     _maybe_render_todo(payload_data)
                     _append_active_summary()
@@ -720,9 +817,7 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                         status_indicator.update(status_message)
                         farewell = str(payload_data.get("farewell") or "Session closed. Goodbye!")
                         if not preview_rendered:
-                            display_messages.append(("agent", farewell))
-                            ctx.render_message("agent", farewell)
-                            rendered_roles.add("agent")
+                            _emit("agent", farewell)
                         _append_active_summary()
                         _show_current_todo_panel()
                         _handle_completion_todo()
@@ -756,30 +851,24 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
                             sources_block = "\n".join(["Sources:", *formatted_citations])
                             if "Sources:" not in final_message:
                                 final_message = f"{final_message.rstrip()}\n\n{sources_block}"
-                    display_messages.append(("agent", final_message))
-                    ctx.render_message("agent", final_message)
-                    rendered_roles.add("agent")
+                    _emit("agent", final_message)
                     _append_active_summary()
                     _show_current_todo_panel()
-                    status_message = Text("Thinking…", style="solcoder.status.text")
+                    status_message = _STATUS_THINKING
                     _handle_completion_todo()
                     break
 
                 if directive.type == "cancel":
                     cancel_message = directive.message or "Agent cancelled the request."
-                    display_messages.append(("system", cancel_message))
-                    ctx.render_message("system", cancel_message)
-                    rendered_roles.add("system")
-                    status_message = Text("Thinking…", style="solcoder.status.text")
+                    _emit("system", cancel_message)
+                    status_message = _STATUS_THINKING
                     _handle_completion_todo()
                     break
         except KeyboardInterrupt:
             cancelled = True
             cancel_message = "Interrupted by user."
-            display_messages.append(("system", cancel_message))
-            ctx.render_message("system", cancel_message)
-            rendered_roles.add("system")
-            status_message = Text("Thinking…", style="solcoder.status.text")
+            _emit("system", cancel_message)
+            status_message = _STATUS_THINKING
 
     if not display_messages:
         if cancelled:
@@ -790,37 +879,33 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
             )
 
     if (
-        iteration >= ctx.max_iterations
+        iteration >= iteration_limit
         and not cancelled
         and display_messages[-1][0] != "system"
     ):
         timeout_message = "Agent loop stopped after reaching the iteration limit."
-        display_messages.append(("system", timeout_message))
-        ctx.render_message("system", timeout_message)
-        rendered_roles.add("system")
+        _emit("system", timeout_message)
 
-    total_tokens = total_input_tokens + total_output_tokens
+    total_tokens = usage.input_tokens + usage.output_tokens
     llm_summary: dict[str, Any] = {
         "type": "llm",
         "name": f"{provider_name}:{model_name}",
-        "status": "cached" if all_cached else "success",
-        "latency": round(total_latency, 3),
+        "status": "cached" if usage.all_cached else "success",
+        "latency": round(usage.latency, 3),
     }
-    if last_finish_reason:
-        llm_summary["summary"] = f"finish={last_finish_reason}"
+    if usage.finish_reason:
+        llm_summary["summary"] = f"finish={usage.finish_reason}"
     if total_tokens:
         llm_summary["token_usage"] = {
-            "input_tokens": total_input_tokens,
-            "output_tokens": total_output_tokens,
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
             "total_tokens": total_tokens,
         }
     if reasoning_effort:
         llm_summary["reasoning_effort"] = reasoning_effort
 
     for message in pending_system_messages:
-        display_messages.append(("system", message))
-        ctx.render_message("system", message)
-        rendered_roles.add("system")
+        _emit("system", message)
 
     tool_calls = [llm_summary, *tool_summaries]
     return CommandResponse(
@@ -831,6 +916,112 @@ def run_agent_loop(ctx: AgentLoopContext) -> CommandResponse:
     )
 
 
+def _entry_tokens(entry: dict[str, str]) -> int:
+    return len(entry.get("content") or "") // 4
+
+
+@dataclass(slots=True)
+class _HistoryBudget:
+    """Running token estimate for the entries the loop appended (``history[start:]``).
+
+    ``counted`` is the history length already folded into ``tokens``; entries
+    appended since are added on the next compaction pass instead of re-summing.
+    """
+
+    start: int
+    tokens: int = 0
+    counted: int = 0
+
+    def __post_init__(self) -> None:
+        self.counted = self.start
+
+    def reset(self) -> None:
+        self.tokens = 0
+        self.counted = self.start
+
+
+def _is_tool_result_entry(entry: dict[str, str]) -> bool:
+    return entry.get("role") == "user" and (entry.get("content") or "").startswith(
+        _TOOL_RESULT_PREFIX
+    )
+
+
+def _compressed_count(entry: dict[str, str]) -> int | None:
+    content = entry.get("content") or ""
+    if entry.get("role") != "system" or not content.startswith(_COMPRESSED_PREFIX):
+        return None
+    count, _, _ = content[len(_COMPRESSED_PREFIX) :].partition(" ")
+    return int(count) if count.isdigit() else None
+
+
+def _compact_loop_history(
+    history: list[dict[str, str]],
+    *,
+    start: int,
+    budget: _HistoryBudget | None = None,
+) -> None:
+    """Keep entries appended by the loop (from ``start`` on) within the token budget.
+
+    Only ``history[start:]`` counts against the budget; the conversation before it
+    is owned by the ContextManager and is neither measured nor modified here.
+    """
+    if budget is None:
+        budget = _HistoryBudget(start=start)
+    for entry in history[budget.counted :]:
+        budget.tokens += _entry_tokens(entry)
+    budget.counted = len(history)
+    if budget.tokens <= _HISTORY_SOFT_TOKENS:
+        return
+
+    tool_indexes = [
+        index
+        for index in range(start, len(history))
+        if _is_tool_result_entry(history[index])
+    ]
+    stale = tool_indexes[:-_HISTORY_KEEP_TOOL_RESULTS]
+    if stale:
+        marker_index: int | None = None
+        folded = len(stale)
+        for index in range(start, len(history)):
+            previous = _compressed_count(history[index])
+            if previous is not None:
+                marker_index = index
+                folded += previous
+                break
+        for index in reversed(stale):
+            budget.tokens -= _entry_tokens(history[index])
+            del history[index]
+        marker = {
+            "role": "system",
+            "content": f"{_COMPRESSED_PREFIX}{folded} prior tool calls]",
+        }
+        if marker_index is not None:
+            budget.tokens -= _entry_tokens(history[marker_index])
+            history[marker_index] = marker
+        else:
+            history.insert(stale[0], marker)
+        budget.tokens += _entry_tokens(marker)
+
+    while budget.tokens > _HISTORY_HARD_TOKENS:
+        index = start
+        if index < len(history) and _compressed_count(history[index]) is not None:
+            index += 1
+        # Drop a user prompt together with the reply to it so no answer is orphaned.
+        width = 1
+        if (
+            index + 1 < len(history)
+            and history[index].get("role") == "user"
+            and history[index + 1].get("role") == "assistant"
+        ):
+            width = 2
+        if len(history) - index - width < _HISTORY_MIN_TAIL:
+            break
+        for entry in history[index : index + width]:
+            budget.tokens -= _entry_tokens(entry)
+        del history[index : index + width]
+    budget.counted = len(history)
+
+
 def _active_model_details(config_context: ConfigContext | None) -> tuple[str, str, str]:
     provider_name = "unknown"
     model_name = "unknown"
@@ -846,63 +1037,100 @@ def _active_model_details(config_context: ConfigContext | None) -> tuple[str, st
     return provider_name, model_name, reasoning_effort
 
 
+_PROMPT_PREAMBLE = (
+    "You are SolCoder — build Solana dApps at light speed. Operate like a senior Solana engineer who keeps the "
+    "toolchain healthy, champions on-chain safety, and delivers environment-aware guidance. Always respond with a single "
+    "JSON object that matches the schema below. Do not include Markdown or prose outside the JSON value. "
+    "Use compact JSON without extra commentary while foregrounding Solana-specific context, tooling, and deployment nuances.\n\n"
+)
+
+_SCHEMA_DESCRIPTION = (
+    "Schema:\n"
+    '{ "type": "plan|tool_request|reply|cancel",\n'
+    '  "message": string?,\n'
+    '  "step_title": string?,\n'
+    '  "tool": {"name": string, "args": object}?,\n'
+    '  "steps": string[]? }\n'
+)
+
+_RULES_PREFIX = (
+    "Rules:\n"
+    "0. You are the user's Solana lead engineer—stay laser-focused on Solana program development. "
+    "Highlight Anchor workflows, BPF limitations, account sizing, rent-exemption rules, and differences from EVM stacks. "
+    "Always sanity-check the local toolchain (Solana CLI, Anchor, Rust, Node, Yarn, Python) and remind the user to run `/env diag` or "
+    "`/env install <tool>` when setup gaps appear. Surface PATH or version concerns explicitly.\n"
+    "1. If a prompt can be satisfied immediately without tools or multi-step work, respond "
+    '   directly with {"type":"reply","message":...}. Otherwise begin with '
+    '   {"type":"plan","steps":[...]} describing the intended workflow.\n'
+    "2. When you need to run a tool, reply with "
+    '{"type":"tool_request","step_title":...,"tool":{"name":...,"args":{...}}}. '
+    "Keep arguments strictly within the declared schema.\n"
+    "3. Once work is complete, respond with "
+    '   {"type":"reply","message":...}. Include any final user-facing summary there.\n'
+    "4. You may send {'type':'cancel','message':...} if the request cannot be "
+    "completed safely.\n"
+    "5. After your plan is acknowledged the orchestrator will send "
+    '   {"type":"plan_ack","status":"ready"}; treat it as confirmation to continue.\n'
+    "6. After the orchestrator sends you tool results, continue the loop using the "
+    "latest context until you can emit a final reply.\n"
+)
+
+_MANIFEST_RULE = "7. Do not invent tools. Only use the manifest provided below.\n"
+_MANIFEST_WITHHELD_RULE = (
+    "7. Do not invent tools. The tool manifest is withheld for this turn; respond with a "
+    "plan if you need tools and it will be provided.\n"
+)
+
+_RULES_BODY = (
+    "8. Use todo_update_list to manage multi-step work. Prefer override=false to append or tweak new milestones while "
+    "preserving existing tasks; use override=true only when you intend to replace the entire checklist. "
+    "Each task must include a name and status (todo, in_progress, or done). Skip TODO tools entirely for quick answers. "
+    "Reserve generate_plan for long-term strategy. Set show_todo_list=true when you want the CLI to render the checklist.\n"
+    "9. If the user indicates they want to end the conversation or close SolCoder, invoke the "
+    "quit tool to terminate the session gracefully, then acknowledge the shutdown with a final reply.\n"
+    "10. Every response must be a single JSON object matching the schema above. Non-compliant outputs will be ignored and you will be asked once to retry.\n"
+    "11. To run commands or make filesystem changes, you must call execute_shell_command via a tool_request. Never embed raw shell or here-doc snippets in your JSON.\n"
+    "12. With override=true you must resubmit every task you intend to keep. With override=false the list is extended, but duplicate or conflicting tasks still raise errors. "
+    "Sending an empty array with override=true clears the list. Avoid creating duplicate management tasks or paraphrased duplicates.\n"
+    "TODO Discipline (Policy): Use TODO only for milestone-level outcomes visible to the user. "
+    "Do not create checklist items for trivial sub-steps or for managing the list itself. "
+    "Seed milestones during planning and keep at least two tasks whenever the list is populated. "
+    "Mark tasks done only after validators/tests succeed.\n"
+    "TODO list stability: Use todo_update_list primarily to update statuses or append genuinely new work; avoid reordering or removing existing tasks unless the user or context explicitly requires it.\n"
+    "Review gate: Before completing a TODO item, call an appropriate validate tool to produce evidence that the work succeeded.\n"
+    "Fallback guidance: If a tool is unavailable or fails twice, choose an alternative available tool instead of repeating the same request.\n"
+    "Idempotency requirement: When inserting content into a file, wrap it with begin/end markers (e.g., <!-- BEGIN:ID --> / <!-- END:ID -->) and replace the block if those markers already exist.\n"
+)
+
+_RULES_SUFFIX = (
+    "\nGood example: {\"type\":\"tool_request\",\"step_title\":\"List files\",\"tool\":{\"name\":\"execute_shell_command\",\"args\":{\"command\":\"ls -la\"}}}.\n"
+    "Bad example: 'Sure, here is the command:' followed by raw shell text.\n\n"
+    "Preference: For SPL token operations, use the dedicated toolchain instead of ad-hoc shell commands. "
+    "Specifically, prefer the 'solcoder.token.create_quick_token' tool to stage a quick Token‑2022 mint, which will "
+    "dispatch '/new token --quick --decimals … --supply …' for interactive confirmation. Do NOT instruct the user to run raw "
+    "commands; the CLI will prompt for passphrase and confirmation.\n"
+    "For scaffolding new programs (counter, token, nft, registry), use the blueprint tools instead of raw shell: "
+    "First call 'solcoder.blueprint.get_wizard_questions' to learn required fields (e.g., program_name, name, symbol, uri). "
+    "If the user explicitly states a program name (e.g., 'create nft named foo'), use that exact value as program_name. "
+    "Collect missing answers from the user, then create the program via 'solcoder.blueprint.create_program_blueprint'. "
+    "Optionally call 'solcoder.blueprint.check_program_exists' first to avoid name collisions; if exists, ask the user to pick a different name.\n"
+    "For NFT blueprints, 'uri' is optional at scaffold time — recommend using '/metadata wizard --mint <MINT>' after deploy to attach metadata.\n"
+)
+
+_PROMPT_TOOL_RESULT_NOTE = (
+    "During the conversation you may also receive JSON objects with "
+    '{"type":"tool_result",...}. Use them to inform the next action.'
+)
+
+
 def _agent_system_prompt(
     config_context: ConfigContext | None,
-    manifest_json: str,
+    manifest_json: str | None,
     exec_ua_header: str,
     todo_manager: TodoManager | None = None,
     runtime_context: str | None = None,
 ) -> str:
     provider_name, model_name, reasoning_effort = _active_model_details(config_context)
-    schema_description = (
-        "Schema:\n"
-        '{ "type": "plan|tool_request|reply|cancel",\n'
-        '  "message": string?,\n'
-        '  "step_title": string?,\n'
-        '  "tool": {"name": string, "args": object}?,\n'
-        '  "steps": string[]? }\n'
-    )
-
-    rules = (
-        "Rules:\n"
-        "0. You are the user's Solana lead engineer—stay laser-focused on Solana program development. "
-        "Highlight Anchor workflows, BPF limitations, account sizing, rent-exemption rules, and differences from EVM stacks. "
-        "Always sanity-check the local toolchain (Solana CLI, Anchor, Rust, Node, Yarn, Python) and remind the user to run `/env diag` or "
-        "`/env install <tool>` when setup gaps appear. Surface PATH or version concerns explicitly.\n"
-        "1. If a prompt can be satisfied immediately without tools or multi-step work, respond "
-        '   directly with {"type":"reply","message":...}. Otherwise begin with '
-        '   {"type":"plan","steps":[...]} describing the intended workflow.\n'
-        "2. When you need to run a tool, reply with "
-        '{"type":"tool_request","step_title":...,"tool":{"name":...,"args":{...}}}. '
-        "Keep arguments strictly within the declared schema.\n"
-        "3. Once work is complete, respond with "
-        '   {"type":"reply","message":...}. Include any final user-facing summary there.\n'
-        "4. You may send {'type':'cancel','message':...} if the request cannot be "
-        "completed safely.\n"
-        "5. After your plan is acknowledged the orchestrator will send "
-        '   {"type":"plan_ack","status":"ready"}; treat it as confirmation to continue.\n'
-        "6. After the orchestrator sends you tool results, continue the loop using the "
-        "latest context until you can emit a final reply.\n"
-        "7. Do not invent tools. Only use the manifest provided below.\n"
-        "8. Use todo_update_list to manage multi-step work. Prefer override=false to append or tweak new milestones while "
-        "preserving existing tasks; use override=true only when you intend to replace the entire checklist. "
-        "Each task must include a name and status (todo, in_progress, or done). Skip TODO tools entirely for quick answers. "
-        "Reserve generate_plan for long-term strategy. Set show_todo_list=true when you want the CLI to render the checklist.\n"
-        "9. If the user indicates they want to end the conversation or close SolCoder, invoke the "
-        "quit tool to terminate the session gracefully, then acknowledge the shutdown with a final reply.\n"
-        "10. Every response must be a single JSON object matching the schema above. Non-compliant outputs will be ignored and you will be asked once to retry.\n"
-        "11. To run commands or make filesystem changes, you must call execute_shell_command via a tool_request. Never embed raw shell or here-doc snippets in your JSON.\n"
-        "12. With override=true you must resubmit every task you intend to keep. With override=false the list is extended, but duplicate or conflicting tasks still raise errors. "
-        "Sending an empty array with override=true clears the list. Avoid creating duplicate management tasks or paraphrased duplicates.\n"
-        "TODO Discipline (Policy): Use TODO only for milestone-level outcomes visible to the user. "
-        "Do not create checklist items for trivial sub-steps or for managing the list itself. "
-        "Seed milestones during planning and keep at least two tasks whenever the list is populated. "
-        "Mark tasks done only after validators/tests succeed.\n"
-        "TODO list stability: Use todo_update_list primarily to update statuses or append genuinely new work; avoid reordering or removing existing tasks unless the user or context explicitly requires it.\n"
-        "Review gate: Before completing a TODO item, call an appropriate validate tool to produce evidence that the work succeeded.\n"
-        "Fallback guidance: If a tool is unavailable or fails twice, choose an alternative available tool instead of repeating the same request.\n"
-        "Idempotency requirement: When inserting content into a file, wrap it with begin/end markers (e.g., <!-- BEGIN:ID --> / <!-- END:ID -->) and replace the block if those markers already exist.\n"
-    )
 
     active_task = None
     if todo_manager is not None:
@@ -910,6 +1138,11 @@ def _agent_system_prompt(
         if current is not None:
             active_task = f"{current.id}: {current.title}"
 
+    rules = (
+        _RULES_PREFIX
+        + (_MANIFEST_WITHHELD_RULE if manifest_json is None else _MANIFEST_RULE)
+        + _RULES_BODY
+    )
     if active_task:
         rules += (
             "13. Current active task: "
@@ -920,35 +1153,27 @@ def _agent_system_prompt(
             "13. If you begin multi-step work, set one TODO entry to in_progress and keep it updated until completion before replying.\n"
         )
 
-    rules += (
-        "\nGood example: {\"type\":\"tool_request\",\"step_title\":\"List files\",\"tool\":{\"name\":\"execute_shell_command\",\"args\":{\"command\":\"ls -la\"}}}.\n"
-        "Bad example: 'Sure, here is the command:' followed by raw shell text.\n\n"
-        "Preference: For SPL token operations, use the dedicated toolchain instead of ad-hoc shell commands. "
-        "Specifically, prefer the 'solcoder.token.create_quick_token' tool to stage a quick Token‑2022 mint, which will "
-        "dispatch '/new token --quick --decimals … --supply …' for interactive confirmation. Do NOT instruct the user to run raw "
-        "commands; the CLI will prompt for passphrase and confirmation.\n"
-        "For scaffolding new programs (counter, token, nft, registry), use the blueprint tools instead of raw shell: "
-        "First call 'solcoder.blueprint.get_wizard_questions' to learn required fields (e.g., program_name, name, symbol, uri). "
-        "If the user explicitly states a program name (e.g., 'create nft named foo'), use that exact value as program_name. "
-        "Collect missing answers from the user, then create the program via 'solcoder.blueprint.create_program_blueprint'. "
-        "Optionally call 'solcoder.blueprint.check_program_exists' first to avoid name collisions; if exists, ask the user to pick a different name.\n"
-        "For NFT blueprints, 'uri' is optional at scaffold time — recommend using '/metadata wizard --mint <MINT>' after deploy to attach metadata.\n"
-    )
+    rules += _RULES_SUFFIX
+
+    if manifest_json is None:
+        tools_section = (
+            "Available tools: (manifest withheld for this turn) Reply directly when no "
+            "tools are needed; otherwise respond with a plan and the full manifest will be "
+            "provided.\n"
+        )
+    else:
+        tools_section = f"Available tools: {manifest_json}\n"
 
     return (
-        "You are SolCoder — build Solana dApps at light speed. Operate like a senior Solana engineer who keeps the "
-        "toolchain healthy, champions on-chain safety, and delivers environment-aware guidance. Always respond with a single "
-        "JSON object that matches the schema below. Do not include Markdown or prose outside the JSON value. "
-        "Use compact JSON without extra commentary while foregrounding Solana-specific context, tooling, and deployment nuances.\n\n"
-        f"{schema_description}"
-        f"{rules}"
-        f"Current configuration: provider={provider_name}, model={model_name}, "
+        _PROMPT_PREAMBLE
+        + _SCHEMA_DESCRIPTION
+        + rules
+        + f"Current configuration: provider={provider_name}, model={model_name}, "
         f"reasoning_effort={reasoning_effort}.\n"
         + (f"Runtime context: {runtime_context}\n" if runtime_context else "")
         + f"{exec_ua_header}\n"
-        + f"Available tools: {manifest_json}\n"
-        + "During the conversation you may also receive JSON objects with "
-        + '{"type":"tool_result",...}. Use them to inform the next action.'
+        + tools_section
+        + _PROMPT_TOOL_RESULT_NOTE
     )
 
 
@@ -992,6 +1217,9 @@ def _format_kb_citations(citations: Sequence[Any]) -> list[str]:
 __all__ = [
     "AgentLoopContext",
     "AGENT_PLAN_ACK",
+    "DEFAULT_AGENT_MAX_CONSECUTIVE_ERRORS",
     "DEFAULT_AGENT_MAX_ITERATIONS",
+    "DEFAULT_AGENT_MAX_TOTAL_TOKENS",
+    "DEFAULT_AGENT_MAX_WALL_SECONDS",
     "run_agent_loop",
 ]
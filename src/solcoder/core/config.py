@@ -4,18 +4,14 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import json
 import os
 from collections.abc import Callable
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any
 from pathlib import Path
 
-import tomli_w
-from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from pydantic import BaseModel, ValidationError
 
 try:  # Python 3.11+
@@ -23,12 +19,43 @@ try:  # Python 3.11+
 except ModuleNotFoundError:  # pragma: no cover
     import tomli as tomllib  # type: ignore
 
-import typer
+# cryptography, tomli_w and typer are imported where they are used: commands that
+# never touch credentials or write config should not pay for them at startup.
 
 DEFAULT_CONFIG_DIR = Path(os.environ.get("SOLCODER_HOME", Path.home() / ".solcoder"))
 CONFIG_FILENAME = "config.toml"
 CREDENTIALS_FILENAME = "credentials.json"
 PBKDF_ITERATIONS = 390_000
+CREDENTIALS_KDF = "pbkdf2-sha256"
+CREDENTIALS_ALG = "aesgcm256"
+LLM_API_KEY_SECRET = "llm_api_key"  # noqa: S105
+DERIVED_KEY_CACHE_SIZE = 4
+
+# Parsed TOML documents keyed by path and validated against (mtime_ns, size).
+_toml_cache: dict[Path, tuple[tuple[int, int], dict[str, Any]]] = {}
+# Keyword order of update_llm_preferences / update_wallet_policy; the wallet
+# entries carry the cast applied before persisting.
+_LLM_PREF_KEYS = (
+    "llm_base_url",
+    "llm_model",
+    "llm_reasoning_effort",
+    "history_max_messages",
+    "history_summary_keep",
+    "history_summary_max_words",
+    "history_auto_compact_threshold",
+    "llm_input_token_limit",
+    "llm_output_token_limit",
+    "history_compaction_cooldown",
+)
+_WALLET_POLICY_FIELDS: tuple[tuple[str, Callable[[Any], object]], ...] = (
+    ("max_session_spend", float),
+    ("auto_airdrop", bool),
+    ("auto_airdrop_threshold", float),
+    ("auto_airdrop_cooldown_secs", int),
+    ("auto_airdrop_min_balance", float),
+    ("auto_airdrop_amount", float),
+    ("airdrop_cooldown_secs", int),
+)
 
 
 class ConfigurationError(RuntimeError):
@@ -62,6 +89,8 @@ class SolCoderConfig(BaseModel):
     llm_input_token_limit: int = 272_000
     llm_output_token_limit: int = 128_000
     history_compaction_cooldown: int = 10
+    # "summarize" rolls old turns into an LLM summary; "sliding" just drops them.
+    history_compaction_strategy: str = "summarize"
 
 
 @dataclass
@@ -74,42 +103,111 @@ class ConfigContext:
 
 
 class CredentialStore:
-    """Encrypts/decrypts API keys using a passphrase-derived key."""
+    """Encrypts/decrypts API keys using a passphrase-derived key.
+
+    Secrets are stored as a named batch that shares one salt, so the PBKDF2 key is
+    derived once per save/load however many secrets are kept. Each secret is
+    sealed with AES-256-GCM using its name as associated data. Older Fernet payloads
+    (no ``alg`` field) remain readable and are exposed under ``LLM_API_KEY_SECRET``.
+    """
 
     def __init__(self, credentials_path: Path) -> None:
         self.credentials_path = credentials_path
+        # Derived keys keyed by (passphrase digest, salt, iterations) so repeat
+        # loads skip PBKDF2.
+        self._key_cache: dict[tuple[bytes, bytes, int], bytes] = {}
 
     def save(self, passphrase: str, api_key: str) -> None:
+        self.save_many(passphrase, {LLM_API_KEY_SECRET: api_key})
+
+    def load(self, passphrase: str) -> str:
+        secrets = self.load_many(passphrase)
+        try:
+            return secrets[LLM_API_KEY_SECRET]
+        except KeyError as exc:
+            raise ConfigurationError("SolCoder credentials do not contain an LLM API key") from exc
+
+    def save_many(self, passphrase: str, secrets: dict[str, str]) -> None:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
         salt = os.urandom(16)
-        key = self._derive_key(passphrase, salt)
-        token = Fernet(key).encrypt(api_key.encode("utf-8"))
+        cipher = AESGCM(self._derive_key(passphrase, salt, PBKDF_ITERATIONS))
+        sealed: dict[str, dict[str, str]] = {}
+        for name, value in secrets.items():
+            nonce = os.urandom(12)
+            ciphertext = cipher.encrypt(nonce, value.encode("utf-8"), name.encode("utf-8"))
+            sealed[name] = {
+                "nonce": base64.b64encode(nonce).decode("ascii"),
+                "ciphertext": base64.b64encode(ciphertext).decode("ascii"),
+            }
         payload = {
+            "alg": CREDENTIALS_ALG,
+            "kdf": CREDENTIALS_KDF,
             "salt": base64.b64encode(salt).decode("ascii"),
-            "ciphertext": base64.b64encode(token).decode("ascii"),
             "iterations": PBKDF_ITERATIONS,
+            "secrets": sealed,
         }
-        self.credentials_path.write_text(json.dumps(payload, indent=2))
+        self.credentials_path.write_text(json.dumps(payload, separators=(",", ":")))
+
+    def load_many(self, passphrase: str) -> dict[str, str]:
+        from cryptography.exceptions import InvalidTag
+        from cryptography.fernet import Fernet, InvalidToken
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
-    def load(self, passphrase: str) -> str:
         data = json.loads(self.credentials_path.read_text())
+        kdf = data.get("kdf", CREDENTIALS_KDF)
+        if kdf != CREDENTIALS_KDF:
+            raise ConfigurationError(f"Unsupported credential key derivation '{kdf}'")
+        alg = data.get("alg")
+        if alg not in (None, CREDENTIALS_ALG):
+            raise ConfigurationError(f"Unsupported credential cipher '{alg}'")
         salt = base64.b64decode(data["salt"])
-        ciphertext = base64.b64decode(data["ciphertext"])
-        key = self._derive_key(passphrase, salt)
+        iterations = int(data.get("iterations") or PBKDF_ITERATIONS)
+        key = self._derive_key_cached(passphrase, salt, iterations)
         try:
-            decrypted = Fernet(key).decrypt(ciphertext)
-        except InvalidToken as exc:  # pragma: no cover - exercised in tests
+            if alg is None:
+                ciphertext = base64.b64decode(data["ciphertext"])
+                token = Fernet(base64.urlsafe_b64encode(key)).decrypt(ciphertext)
+                return {LLM_API_KEY_SECRET: token.decode("utf-8")}
+            cipher = AESGCM(key)
+            secrets: dict[str, str] = {}
+            for name, entry in data["secrets"].items():
+                nonce = base64.b64decode(entry["nonce"])
+                ciphertext = base64.b64decode(entry["ciphertext"])
+                plaintext = cipher.decrypt(nonce, ciphertext, name.encode("utf-8"))
+                secrets[name] = plaintext.decode("utf-8")
+            return secrets
+        except (InvalidTag, InvalidToken) as exc:
             raise ConfigurationError("Invalid passphrase for SolCoder credentials") from exc
-        return decrypted.decode("utf-8")
+
+    def _derive_key_cached(
+        self, passphrase: str, salt: bytes, iterations: int = PBKDF_ITERATIONS
+    ) -> bytes:
+        digest = hashlib.blake2b(passphrase.encode("utf-8")).digest()
+        cache_key = (digest, salt, iterations)
+        key = self._key_cache.get(cache_key)
+        if key is None:
+            key = self._derive_key(passphrase, salt, iterations)
+            if len(self._key_cache) >= DERIVED_KEY_CACHE_SIZE:
+                self._key_cache.pop(next(iter(self._key_cache)))
+            self._key_cache[cache_key] = key
+        return key
 
     @staticmethod
-    def _derive_key(passphrase: str, salt: bytes) -> bytes:
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=PBKDF_ITERATIONS,
+    def _derive_key(
+        passphrase: str, salt: bytes, iterations: int = PBKDF_ITERATIONS
+    ) -> bytes:
+        # hashlib dispatches straight to OpenSSL's (SHA-NI accelerated) PBKDF2.
+        return hashlib.pbkdf2_hmac(
+            "sha256", passphrase.encode("utf-8"), salt, iterations, dklen=32
         )
-        return base64.urlsafe_b64encode(kdf.derive(passphrase.encode("utf-8")))
+
+
+def _stat_or_none(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
 
 
 class ConfigManager:
@@ -129,7 +227,7 @@ class ConfigManager:
         self.credentials_path = self.config_dir / CREDENTIALS_FILENAME
         self._credential_store = CredentialStore(self.credentials_path)
         self._prompt = prompt_fn or self._default_prompt
-        self._echo = echo_fn or typer.echo
+        self._echo = echo_fn or self._default_echo
         self.project_config_path = project_config_path
         self.override_config_path = override_config_path
 
@@ -149,23 +247,27 @@ class ConfigManager:
     ) -> ConfigContext:
         """Ensure configuration and credentials exist; return decrypted context."""
 
+        # One stat per file; the config stat is reused when reading the TOML.
+        config_stat = _stat_or_none(self.config_path)
         if offline_mode:
-            if self.config_path.exists():
-                config = self._load_config()
+            if config_stat is not None:
+                config = self._load_config(config_stat)
             else:
                 config = SolCoderConfig()
                 self._save_config(config)
 
             updates: dict[str, str] = {}
             if llm_base_url and config.llm_base_url != llm_base_url:
+                config.llm_base_url = llm_base_url
                 updates["llm_base_url"] = llm_base_url
             if llm_model and config.llm_model != llm_model:
+                config.llm_model = llm_model
                 updates["llm_model"] = llm_model
             if llm_reasoning and config.llm_reasoning_effort != llm_reasoning:
+                config.llm_reasoning_effort = llm_reasoning
                 updates["llm_reasoning_effort"] = llm_reasoning
             if updates:
                 self.update_llm_preferences(**updates)
-                config = self._load_config()
 
             return ConfigContext(
                 config=config,
@@ -173,8 +275,8 @@ class ConfigManager:
                 passphrase=passphrase,
             )
 
-        if self.config_path.exists() and self.credentials_path.exists():
-            config = self._load_config()
+        if config_stat is not None and _stat_or_none(self.credentials_path) is not None:
+            config = self._load_config(config_stat)
             updates: dict[str, str] = {}
             if llm_base_url and config.llm_base_url != llm_base_url:
                 config.llm_base_url = llm_base_url
@@ -254,13 +356,18 @@ class ConfigManager:
                 confirmation_prompt=True,
             )
 
-        base_config_data = {
-            "llm_base_url": base_url,
-            "llm_model": model,
-            "llm_reasoning_effort": reasoning,
-        }
-        self.update_llm_preferences(**base_config_data)
-        merged_config = self._load_config()
+        base_data = self._read_config_dict(self.config_path)
+        base_data.update(
+            llm_base_url=base_url,
+            llm_model=model,
+            llm_reasoning_effort=reasoning,
+        )
+        base_config = self._build_config(base_data)
+        self._save_config(base_config)
+        if self.project_config_path or self.override_config_path:
+            merged_config = self._load_config()
+        else:
+            merged_config = base_config
         self._credential_store.save(passphrase_value, api_key)
         self._echo("✅ SolCoder configuration saved to " + str(self.config_path))
         return ConfigContext(config=merged_config, llm_api_key=api_key, passphrase=passphrase_value)
@@ -269,25 +376,36 @@ class ConfigManager:
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
-    def _load_config(self) -> SolCoderConfig:
-        data: dict[str, Any] = self._read_config_dict(self.config_path)
+    def _load_config(self, config_stat: os.stat_result | None = None) -> SolCoderConfig:
+        data: dict[str, Any] = self._read_config_dict(self.config_path, config_stat)
+        if not (self.project_config_path or self.override_config_path):
+            # Common single-file install: nothing to layer on top of the base config.
+            return self._build_config(data)
         if self.project_config_path:
             data = self._merge_dicts(data, self._read_config_dict(self.project_config_path))
         if self.override_config_path:
             data = self._merge_dicts(data, self._read_config_dict(self.override_config_path))
+        return self._build_config(data)
+
+    @staticmethod
+    def _build_config(data: dict[str, Any]) -> SolCoderConfig:
         try:
-            return SolCoderConfig(**data)
+            return SolCoderConfig.model_validate(data)
         except ValidationError as exc:
             raise ConfigurationError(str(exc)) from exc
 
     def _save_config(self, config: SolCoderConfig) -> None:
-        self.config_path.write_text(tomli_w.dumps(config.model_dump(exclude_none=True)))
+        import tomli_w
+
+        with self.config_path.open("wb") as handle:
+            tomli_w.dump(config.model_dump(exclude_none=True), handle)
+        _toml_cache.pop(self.config_path, None)
 
     def _update_base_config(self, **updates: object) -> None:
         current = self._read_config_dict(self.config_path)
         current = current.copy() if current else {}
         current.update(updates)
-        base_config = SolCoderConfig(**current)
+        base_config = self._build_config(current)
         self._save_config(base_config)
 
     def update_llm_preferences(
@@ -304,27 +422,23 @@ class ConfigManager:
         llm_output_token_limit: int | None = None,
         history_compaction_cooldown: int | None = None,
     ) -> None:
-        updates: dict[str, str] = {}
-        if llm_base_url is not None:
-            updates["llm_base_url"] = llm_base_url
-        if llm_model is not None:
-            updates["llm_model"] = llm_model
-        if llm_reasoning_effort is not None:
-            updates["llm_reasoning_effort"] = llm_reasoning_effort
-        if history_max_messages is not None:
-            updates["history_max_messages"] = history_max_messages
-        if history_summary_keep is not None:
-            updates["history_summary_keep"] = history_summary_keep
-        if history_summary_max_words is not None:
-            updates["history_summary_max_words"] = history_summary_max_words
-        if history_auto_compact_threshold is not None:
-            updates["history_auto_compact_threshold"] = history_auto_compact_threshold
-        if llm_input_token_limit is not None:
-            updates["llm_input_token_limit"] = llm_input_token_limit
-        if llm_output_token_limit is not None:
-            updates["llm_output_token_limit"] = llm_output_token_limit
-        if history_compaction_cooldown is not None:
-            updates["history_compaction_cooldown"] = history_compaction_cooldown
+        values = (
+            llm_base_url,
+            llm_model,
+            llm_reasoning_effort,
+            history_max_messages,
+            history_summary_keep,
+            history_summary_max_words,
+            history_auto_compact_threshold,
+            llm_input_token_limit,
+            llm_output_token_limit,
+            history_compaction_cooldown,
+        )
+        updates = {
+            key: value
+            for key, value in zip(_LLM_PREF_KEYS, values, strict=True)
+            if value is not None
+        }
         if updates:
             self._update_base_config(**updates)
 
@@ -339,36 +453,52 @@ class ConfigManager:
         auto_airdrop_amount: float | None = None,
         airdrop_cooldown_secs: int | None = None,
     ) -> None:
-        updates: dict[str, object] = {}
-        if max_session_spend is not None:
-            updates["max_session_spend"] = float(max_session_spend)
-        if auto_airdrop is not None:
-            updates["auto_airdrop"] = bool(auto_airdrop)
-        if auto_airdrop_threshold is not None:
-            updates["auto_airdrop_threshold"] = float(auto_airdrop_threshold)
-        if auto_airdrop_cooldown_secs is not None:
-            updates["auto_airdrop_cooldown_secs"] = int(auto_airdrop_cooldown_secs)
-        if auto_airdrop_min_balance is not None:
-            updates["auto_airdrop_min_balance"] = float(auto_airdrop_min_balance)
-        if auto_airdrop_amount is not None:
-            updates["auto_airdrop_amount"] = float(auto_airdrop_amount)
-        if airdrop_cooldown_secs is not None:
-            updates["airdrop_cooldown_secs"] = int(airdrop_cooldown_secs)
+        values = (
+            max_session_spend,
+            auto_airdrop,
+            auto_airdrop_threshold,
+            auto_airdrop_cooldown_secs,
+            auto_airdrop_min_balance,
+            auto_airdrop_amount,
+            airdrop_cooldown_secs,
+        )
+        updates = {
+            key: cast(value)
+            for (key, cast), value in zip(_WALLET_POLICY_FIELDS, values, strict=True)
+            if value is not None
+        }
         if updates:
             self._update_base_config(**updates)
 
-    def _read_config_dict(self, path: Path | None) -> dict[str, Any]:
+    def _read_config_dict(
+        self, path: Path | None, stat_result: os.stat_result | None = None
+    ) -> dict[str, Any]:
         if path is None:
             return {}
-        if not path.exists():
-            return {}
+        if stat_result is None:
+            try:
+                stat_result = path.stat()
+            except FileNotFoundError:
+                _toml_cache.pop(path, None)
+                return {}
+            except OSError as exc:
+                raise ConfigurationError(f"Failed to load config from {path}: {exc}") from exc
+        stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = _toml_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return dict(cached[1])
         try:
-            return tomllib.loads(path.read_text())
+            with path.open("rb") as handle:
+                data = tomllib.load(handle)
         except (OSError, tomllib.TOMLDecodeError) as exc:
             raise ConfigurationError(f"Failed to load config from {path}: {exc}") from exc
+        _toml_cache[path] = (stamp, data)
+        return dict(data)
 
     def _merge_dicts(self, base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
-        result = deepcopy(base)
+        # Only tables that are merged get copied; leaf values are shared, which is
+        # safe because neither input is mutated and lists are replaced wholesale.
+        result = dict(base)
         for key, value in override.items():
             if (
                 key in result
@@ -406,6 +536,12 @@ class ConfigManager:
                 self._echo("❌ Invalid passphrase. Please try again.")
                 passphrase = None
 
+    @staticmethod
+    def _default_echo(message: str) -> None:
+        import typer
+
+        typer.echo(message)
+
     @staticmethod
     def _default_prompt(
         message: str,
@@ -414,6 +550,8 @@ class ConfigManager:
         confirmation_prompt: bool = False,
         default: str | None = None,
     ) -> str:
+        import typer
+
         if default is not None:
             return typer.prompt(message, default=default, hide_input=hide_input, confirmation_prompt=confirmation_prompt)
         return typer.prompt(message, hide_input=hide_input, confirmation_prompt=confirmation_prompt)
@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import TYPE_CHECKING, Any, Sequence
+from typing import TYPE_CHECKING, Any
 
 from solcoder.core.llm import LLMError
 from solcoder.session import TRANSCRIPT_LIMIT, SessionContext
@@ -27,6 +28,64 @@ DEFAULT_AUTO_COMPACT_THRESHOLD = 0.95
 DEFAULT_LLM_INPUT_LIMIT = 272_000
 DEFAULT_COMPACTION_COOLDOWN = 10
 
+_SUMMARY_SYSTEM_PROMPT = "You are a concise summarization engine for coding assistant transcripts."
+_SUMMARY_PROMPT = (
+    "Summarize the following SolCoder chat history in no more than {max_words} words. "
+    "Highlight user goals, decisions, constraints, and any open questions.\n"
+    "Conversation:\n{text}\n"
+    "Return plain text without bullet characters unless required."
+)
+_INCREMENTAL_SUMMARY_PROMPT = (
+    "Update this summary of a SolCoder chat with the new turns below, in no more "
+    "than {max_words} words. Keep user goals, decisions, constraints, and open "
+    "questions that still apply.\n"
+    "Summary so far:\n{summary}\n"
+    "New turns:\n{text}\n"
+    "Return plain text without bullet characters unless required."
+)
+
+# Transcript roles mapped onto chat roles; anything else is sent as "system".
+_LLM_ROLES = {"user": "user", "agent": "assistant"}
+
+
+@dataclass(slots=True)
+class _CompactionConfig:
+    """Compaction-related config values, resolved once per config object."""
+
+    history_limit: int
+    summary_keep: int
+    summary_max_words: int
+    auto_compact_threshold: float
+    llm_input_limit: int
+    compaction_cooldown: int
+
+
+def _message_tokens(entry: dict[str, Any]) -> int:
+    message = entry.get("message")
+    return len(message.split()) if isinstance(message, str) else 0
+
+
+_utcnow = datetime.now
+
+
+def _now_iso() -> str:
+    return _utcnow(UTC).isoformat()
+
+
+def _recent_lines(entries: list[dict[str, Any]], count: int = 3) -> str:
+    return "\n".join(
+        f"{entry.get('role', 'unknown')}: {entry.get('message', '')}" for entry in entries[-count:]
+    )
+
+
+def _split_previous_summary(
+    entries: list[dict[str, Any]],
+) -> tuple[str | None, list[dict[str, Any]]]:
+    """Separate a leading rolled-up summary from the turns that aged out after it."""
+    if entries and entries[0].get("summary") and isinstance(entries[0].get("message"), str):
+        return entries[0]["message"], entries[1:]
+    return None, entries
+
 
 class HistoryCompactionStrategy:
     """Protocol for history compaction policies."""
@@ -45,17 +104,18 @@ class RollingHistoryStrategy(HistoryCompactionStrategy):
     def compact(self, manager: ContextManager) -> None:
         transcript = manager.session_context.transcript
         metadata = manager.session_context.metadata
-        history_limit = manager.config_int("history_max_messages", DEFAULT_HISTORY_LIMIT)
         cooldown = metadata.compression_cooldown
-        if len(transcript) > history_limit and cooldown <= 0:
+        if cooldown > 0:
+            # Neither trigger can fire during cooldown; skip the config lookups.
+            metadata.compression_cooldown = cooldown - 1
+            return
+        settings = manager.compaction_config
+        if len(transcript) > settings.history_limit:
             self._summarize_older_history(manager)
 
-        input_limit = manager.config_int("llm_input_token_limit", DEFAULT_LLM_INPUT_LIMIT)
-        threshold = manager.config_float(
-            "history_auto_compact_threshold",
-            DEFAULT_AUTO_COMPACT_THRESHOLD,
-        )
-        if metadata.llm_last_input_tokens >= int(input_limit * threshold) and cooldown <= 0:
+        if metadata.llm_last_input_tokens >= int(
+            settings.llm_input_limit * settings.auto_compact_threshold
+        ):
             self._compress_full_history(manager)
 
         metadata.compression_cooldown = max(metadata.compression_cooldown - 1, 0)
@@ -68,63 +128,94 @@ class RollingHistoryStrategy(HistoryCompactionStrategy):
 
     def _summarize_older_history(self, manager: ContextManager) -> None:
         transcript = manager.session_context.transcript
-        history_limit = manager.config_int("history_max_messages", DEFAULT_HISTORY_LIMIT)
-        keep_count = manager.config_int("history_summary_keep", DEFAULT_SUMMARY_KEEP)
+        settings = manager.compaction_config
+        history_limit = settings.history_limit
+        keep_count = settings.summary_keep
         if keep_count >= history_limit:
             keep_count = max(history_limit - 2, 1)
         if len(transcript) <= keep_count:
             return
 
-        older = transcript[:-keep_count]
+        previous_summary, older = _split_previous_summary(transcript[:-keep_count])
         if not older:
             return
 
-        summary_text = manager.generate_summary(older)
+        summary_text = manager.generate_incremental_summary(previous_summary, older)
         summary_entry = {
             "role": "system",
             "message": summary_text,
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": _now_iso(),
             "summary": True,
         }
-        manager.session_context.transcript = [summary_entry, *transcript[-keep_count:]]
+        # Replace in place so every holder of the transcript list stays in sync.
+        transcript[:-keep_count] = [summary_entry]
         manager.refresh_transcript_reference()
-        input_limit = manager.config_int("llm_input_token_limit", DEFAULT_LLM_INPUT_LIMIT)
         manager.session_context.metadata.llm_last_input_tokens = min(
             manager.estimate_context_tokens(),
-            input_limit,
-        )
-        manager.session_context.metadata.compression_cooldown = manager.config_int(
-            "history_compaction_cooldown",
-            DEFAULT_COMPACTION_COOLDOWN,
+            settings.llm_input_limit,
         )
+        manager.session_context.metadata.compression_cooldown = settings.compaction_cooldown
 
     def _compress_full_history(self, manager: ContextManager) -> None:
         transcript = manager.session_context.transcript
-        keep_count = manager.config_int("history_summary_keep", DEFAULT_SUMMARY_KEEP)
-        keep_count = max(min(keep_count, len(transcript)), 1)
+        settings = manager.compaction_config
+        keep_count = max(min(settings.summary_keep, len(transcript)), 1)
         if len(transcript) <= keep_count:
             return
 
-        keep = transcript[-keep_count:]
-        summary_text = manager.generate_summary(transcript[:-keep_count])
+        previous_summary, older = _split_previous_summary(transcript[:-keep_count])
+        if not older:
+            return
+        summary_text = manager.generate_incremental_summary(previous_summary, older)
         summary_entry = {
             "role": "system",
             "message": summary_text,
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": _now_iso(),
             "summary": True,
         }
-        manager.session_context.transcript = [summary_entry, *keep]
+        transcript[:-keep_count] = [summary_entry]
         manager.refresh_transcript_reference()
         estimated = manager.estimate_context_tokens()
         metadata = manager.session_context.metadata
-        input_limit = manager.config_int("llm_input_token_limit", DEFAULT_LLM_INPUT_LIMIT)
-        metadata.llm_last_input_tokens = min(estimated, input_limit)
-        metadata.compression_cooldown = manager.config_int(
-            "history_compaction_cooldown",
-            DEFAULT_COMPACTION_COOLDOWN,
+        metadata.llm_last_input_tokens = min(estimated, settings.llm_input_limit)
+        metadata.compression_cooldown = settings.compaction_cooldown
+
+
+@dataclass
+class SlidingWindowStrategy(HistoryCompactionStrategy):
+    """Drop the oldest turns without an LLM call, keeping any rolled-up summary."""
+
+    def compact(self, manager: ContextManager) -> None:
+        if len(manager.session_context.transcript) > manager.compaction_config.history_limit:
+            self._drop_older_turns(manager)
+
+    def force_compact(self, manager: ContextManager) -> str:
+        before = len(manager.session_context.transcript)
+        self._drop_older_turns(manager)
+        after = len(manager.session_context.transcript)
+        return f"Compacted history from {before} entries to {after}."
+
+    def _drop_older_turns(self, manager: ContextManager) -> None:
+        transcript = manager.session_context.transcript
+        settings = manager.compaction_config
+        keep_count = max(settings.summary_keep, 1)
+        if len(transcript) <= keep_count:
+            return
+        preserved = transcript[:1] if transcript[0].get("summary") else []
+        del transcript[len(preserved) : -keep_count]
+        manager.refresh_transcript_reference()
+        manager.session_context.metadata.llm_last_input_tokens = min(
+            manager.estimate_context_tokens(),
+            settings.llm_input_limit,
         )
 
 
+HISTORY_COMPACTION_STRATEGIES: dict[str, type[HistoryCompactionStrategy]] = {
+    "summarize": RollingHistoryStrategy,
+    "sliding": SlidingWindowStrategy,
+}
+
+
 class ContextManager:
     """Coordinates transcript updates and history compaction policies for the CLI."""
 
@@ -139,34 +230,65 @@ class ContextManager:
         self.session_context = session_context
         self.llm = llm
         self.config_context = config_context
-        self.strategy = strategy or RollingHistoryStrategy()
+        self._compaction_config: _CompactionConfig | None = None
+        self._compaction_config_source: ConfigContext | None = None
+        self.strategy = strategy or self._configured_strategy()
         self._transcript = self.session_context.transcript
+        # Running word count of the transcript, valid while the cached list and its
+        # length match what it was computed against.
+        self._token_estimate = 0
+        self._token_basis: tuple[int, int] = (0, -1)
+        self._recount_tokens()
+
+    def _configured_strategy(self) -> HistoryCompactionStrategy:
+        name = "summarize"
+        if self.config_context is not None:
+            name = getattr(self.config_context.config, "history_compaction_strategy", name) or name
+        strategy_cls = HISTORY_COMPACTION_STRATEGIES.get(name)
+        if strategy_cls is None:
+            logger.warning("Unknown history compaction strategy %r; using 'summarize'.", name)
+            strategy_cls = RollingHistoryStrategy
+        return strategy_cls()
 
     @property
     def transcript(self) -> list[dict[str, Any]]:
         return self._transcript
 
     def refresh_transcript_reference(self) -> None:
-        """Resynchronise cached transcript reference after reassignment."""
+        """Resynchronise the cached transcript reference and token count after edits."""
         self._transcript = self.session_context.transcript
+        self._recount_tokens()
+
+    def _recount_tokens(self) -> None:
+        transcript = self._transcript
+        self._token_estimate = sum(_message_tokens(entry) for entry in transcript)
+        self._token_basis = (id(transcript), len(transcript))
+
+    def _synced_transcript(self) -> list[dict[str, Any]]:
+        # Trimming happens in place, so the cached reference and token count only
+        # need rebuilding when the session transcript was swapped or edited elsewhere.
+        transcript = self.session_context.transcript
+        if transcript is not self._transcript:
+            self._transcript = transcript
+            self._recount_tokens()
+        elif self._token_basis != (id(transcript), len(transcript)):
+            self._recount_tokens()
+        return transcript
 
     def conversation_history(self) -> list[dict[str, str]]:
-        history: list[dict[str, str]] = []
-        for entry in self.transcript[:-1]:
+        return list(self.iter_conversation_history())
+
+    def iter_conversation_history(self) -> Iterator[dict[str, str]]:
+        """Yield LLM chat messages for every transcript entry except the newest."""
+        transcript = self._transcript
+        role_map = _LLM_ROLES
+        for index in range(len(transcript) - 1):
+            entry = transcript[index]
             message = entry.get("message")
-            if not isinstance(message, str) or not message:
+            if not message or not isinstance(message, str):
                 continue
-            if entry.get("summary"):
-                history.append({"role": "system", "content": message})
-                continue
-            role = entry.get("role")
-            if role == "user":
-                history.append({"role": "user", "content": message})
-            elif role == "agent":
-                history.append({"role": "assistant", "content": message})
-            else:
-                history.append({"role": "system", "content": message})
-        return history
+            role = "system" if entry.get("summary") else role_map.get(entry.get("role"), "system")
+            yield {"role": role, "content": message}
 
     def record(
         self,
@@ -178,14 +300,19 @@ class ContextManager:
         entry: dict[str, Any] = {
             "role": role,
             "message": message,
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": _now_iso(),
         }
         if tool_calls:
             entry["tool_calls"] = list(tool_calls)
-        self.session_context.transcript.append(entry)
-        if len(self.session_context.transcript) > TRANSCRIPT_LIMIT:
-            del self.session_context.transcript[:-TRANSCRIPT_LIMIT]
-        self.refresh_transcript_reference()
+        transcript = self._synced_transcript()
+        transcript.append(entry)
+        estimate = self._token_estimate + _message_tokens(entry)
+        overflow = len(transcript) - TRANSCRIPT_LIMIT
+        if overflow > 0:
+            estimate -= sum(_message_tokens(old) for old in transcript[:overflow])
+            del transcript[:overflow]
+        self._token_estimate = estimate
+        self._token_basis = (id(transcript), len(transcript))
 
     def compact_history_if_needed(self) -> None:
         self.strategy.compact(self)
@@ -193,6 +320,34 @@ class ContextManager:
     def force_compact_history(self) -> str:
         return self.strategy.force_compact(self)
 
+    @property
+    def compaction_config(self) -> _CompactionConfig:
+        # Rebuilt automatically when config_context is swapped; call refresh_config()
+        # after editing the current config in place.
+        cached = self._compaction_config
+        if cached is None or self._compaction_config_source is not self.config_context:
+            cached = self.refresh_config()
+        return cached
+
+    def refresh_config(self) -> _CompactionConfig:
+        """Re-read compaction settings from ``config_context``."""
+        self._compaction_config = _CompactionConfig(
+            history_limit=self.config_int("history_max_messages", DEFAULT_HISTORY_LIMIT),
+            summary_keep=self.config_int("history_summary_keep", DEFAULT_SUMMARY_KEEP),
+            summary_max_words=self.config_int(
+                "history_summary_max_words", DEFAULT_SUMMARY_MAX_WORDS
+            ),
+            auto_compact_threshold=self.config_float(
+                "history_auto_compact_threshold", DEFAULT_AUTO_COMPACT_THRESHOLD
+            ),
+            llm_input_limit=self.config_int("llm_input_token_limit", DEFAULT_LLM_INPUT_LIMIT),
+            compaction_cooldown=self.config_int(
+                "history_compaction_cooldown", DEFAULT_COMPACTION_COOLDOWN
+            ),
+        )
+        self._compaction_config_source = self.config_context
+        return self._compaction_config
+
     def config_int(self, attr: str, default: int) -> int:
         if self.config_context is None:
             return default
@@ -204,49 +359,53 @@ class ContextManager:
         return float(getattr(self.config_context.config, attr, default) or default)
 
     def estimate_context_tokens(self) -> int:
-        total = 0
-        for entry in self.session_context.transcript:
-            message = entry.get("message")
-            if isinstance(message, str):
-                total += len(message.split())
-        return total
+        self._synced_transcript()
+        return self._token_estimate
 
     def generate_summary(self, entries: list[dict[str, Any]]) -> str:
+        return self.generate_incremental_summary(None, entries)
+
+    def generate_incremental_summary(
+        self,
+        previous_summary: str | None,
+        entries: list[dict[str, Any]],
+    ) -> str:
+        """Summarise ``entries``, folding them into ``previous_summary`` when one exists.
+
+        Only turns that aged out since the last compaction are sent to the LLM, so the
+        prompt grows with the new turns rather than the whole history.
+        """
         if not entries:
-            return "(history empty)"
-
-        conversation_lines: list[str] = []
-        for entry in entries:
-            role = entry.get("role", "unknown")
-            message = entry.get("message", "")
-            conversation_lines.append(f"{role}: {message}")
-        transcript_text = "\n".join(conversation_lines)
-        base_words = self.config_int("history_summary_max_words", DEFAULT_SUMMARY_MAX_WORDS)
-        keep_count = self.config_int("history_summary_keep", DEFAULT_SUMMARY_KEEP)
-        multiplier = max(1, len(entries) // max(1, keep_count))
-        max_words = base_words * multiplier
-        prompt = (
-            f"Summarize the following SolCoder chat history in no more than {max_words} words. "
-            "Highlight user goals, decisions, constraints, and any open questions.\n"
-            f"Conversation:\n{transcript_text}\n"
-            "Return plain text without bullet characters unless required."
+            return previous_summary or "(history empty)"
+
+        transcript_text = "\n".join(
+            f"{entry.get('role', 'unknown')}: {entry.get('message', '')}" for entry in entries
         )
+        settings = self.compaction_config
+        multiplier = max(1, len(entries) // max(1, settings.summary_keep))
+        max_words = settings.summary_max_words * multiplier
+        if previous_summary is None:
+            prompt = _SUMMARY_PROMPT.format(max_words=max_words, text=transcript_text)
+        else:
+            prompt = _INCREMENTAL_SUMMARY_PROMPT.format(
+                max_words=max_words, summary=previous_summary, text=transcript_text
+            )
         if self.llm is None:
             logger.warning("LLM backend unavailable; returning truncated history for summary.")
-            return "\n".join(conversation_lines[-3:]) or "Summary not available."
+            return _recent_lines(entries) or "Summary not available."
 
         tokens: list[str] = []
         try:
             result = self.llm.stream_chat(  # type: ignore[call-arg]
                 prompt,
                 history=(),
-                system_prompt="You are a concise summarization engine for coding assistant transcripts.",
+                system_prompt=_SUMMARY_SYSTEM_PROMPT,
                 on_chunk=tokens.append,
             )
             summary_text = "".join(tokens).strip() or getattr(result, "text", "").strip()
         except LLMError as exc:
             logger.warning("LLM summarization failed: %s", exc)
-            summary_text = "Summary unavailable. Recent highlights:\n" + "\n".join(conversation_lines[-3:])
+            summary_text = "Summary unavailable. Recent highlights:\n" + _recent_lines(entries)
         if not summary_text:
             summary_text = "Summary not available."
         return summary_text
@@ -255,6 +414,8 @@ __all__ = [
     "ContextManager",
     "HistoryCompactionStrategy",
     "RollingHistoryStrategy",
+    "SlidingWindowStrategy",
+    "HISTORY_COMPACTION_STRATEGIES",
     "DEFAULT_HISTORY_LIMIT",
     "DEFAULT_SUMMARY_KEEP",
     "DEFAULT_SUMMARY_MAX_WORDS",
@@ -2,15 +2,20 @@
 
 from __future__ import annotations
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, Iterable, List
 import json
+import os
 import shutil
 import subprocess
+import sys
+import threading
+import time
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ToolRequirement:
     name: str
     executable: str
@@ -19,7 +24,7 @@ class ToolRequirement:
     fallback_paths: tuple[str, ...] = ()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DiagnosticResult:
     name: str
     status: str
@@ -127,8 +132,128 @@ REQUIRED_TOOLS: tuple[ToolRequirement, ...] = (
 )
 
 
+_MAX_PROBE_WORKERS = 16
+# See exec_ua: leaving close_fds off lets version probes use posix_spawn.
+_PROBE_CLOSE_FDS = sys.platform == "win32"
+
+# PATH lookups and fallback-path probes are reused for a short while so repeated
+# status refreshes skip the filesystem walk. Entries are stamped with
+# time.monotonic(); which() results are additionally keyed by the current PATH.
+_PATH_CACHE_TTL = 30.0
+_WHICH_CACHE: dict[tuple[str, str], tuple[float, str | None]] = {}
+_FALLBACK_CACHE: dict[tuple[str, ...], tuple[float, str | None]] = {}
+# Fallback candidates mostly share a few directories (~/.cargo/bin, ~/.local/bin);
+# each is listed once and candidates are checked against the listing.
+_DIR_LISTING_CACHE: dict[str, tuple[float, frozenset[str]]] = {}
+_PROBE_CACHE: dict[tuple[str, str, tuple[str, ...], str], tuple[float, DiagnosticResult]] = {}
+# Workspace discovery walks every ancestor of the cwd; it is reused briefly since
+# the cwd rarely changes between status refreshes.
+_WORKSPACE_CACHE_TTL = 5.0
+_WORKSPACE_CACHE: dict[Path, tuple[float, tuple[Path, ...]]] = {}
+
+
+def resolve_executables(executables: Iterable[str]) -> dict[str, str | None]:
+    """Resolve several executables against PATH, scanning each directory once."""
+    path_env = os.environ.get("PATH", "")
+    now = time.monotonic()
+    resolved: dict[str, str | None] = {}
+    missing: set[str] = set()
+    for executable in executables:
+        cached = _WHICH_CACHE.get((executable, path_env))
+        if cached is not None and now - cached[0] < _PATH_CACHE_TTL:
+            resolved[executable] = cached[1]
+        else:
+            missing.add(executable)
+    if missing:
+        index = _build_path_index(missing, path_env)
+        for executable in missing:
+            path = index.get(executable)
+            resolved[executable] = path
+            _WHICH_CACHE[(executable, path_env)] = (now, path)
+    return resolved
+
+
+def _build_path_index(executables: set[str], path_env: str) -> dict[str, str]:
+    """Map each executable to its first PATH match, like ``shutil.which``."""
+    if sys.platform == "win32":
+        # PATHEXT and case-insensitive lookup rules are easier to get right there.
+        found = {name: shutil.which(name, path=path_env) for name in executables}
+        return {name: path for name, path in found.items() if path}
+    index: dict[str, str] = {}
+    seen_dirs: set[str] = set()
+    for directory in path_env.split(os.pathsep):
+        directory = directory or os.curdir
+        if directory in seen_dirs:
+            continue
+        seen_dirs.add(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name not in executables or name in index:
+                        continue
+                    try:
+                        is_file = entry.is_file()
+                    except OSError:
+                        continue
+                    if is_file and os.access(entry.path, os.X_OK):
+                        index[name] = entry.path
+        except OSError:
+            continue
+        if len(index) == len(executables):
+            break
+    return index
+
+
+def _resolve_fallback_path(fallback_paths: tuple[str, ...]) -> str | None:
+    now = time.monotonic()
+    cached = _FALLBACK_CACHE.get(fallback_paths)
+    if cached is not None and now - cached[0] < _PATH_CACHE_TTL:
+        return cached[1]
+    resolved: str | None = None
+    # Resolve $HOME once per lookup and probe with plain strings; most candidates
+    # miss, so skip building Path objects for them.
+    home = os.path.expanduser("~")
+    for raw in fallback_paths:
+        candidate = os.path.join(home, raw[2:]) if raw.startswith("~/") else os.path.expanduser(raw)
+        directory, name = os.path.split(candidate)
+        if name in _directory_listing(directory, now):
+            resolved = candidate
+            break
+    _FALLBACK_CACHE[fallback_paths] = (now, resolved)
+    return resolved
+
+
+def _directory_listing(directory: str, now: float) -> frozenset[str]:
+    cached = _DIR_LISTING_CACHE.get(directory)
+    if cached is not None and now - cached[0] < _PATH_CACHE_TTL:
+        return cached[1]
+    try:
+        names = frozenset(os.listdir(directory))
+    except OSError:
+        names = frozenset()
+    _DIR_LISTING_CACHE[directory] = (now, names)
+    return names
+
+
+def clear_env_diag_cache() -> None:
+    """Forget cached tool locations and probe results, e.g. after installing a tool."""
+    _WHICH_CACHE.clear()
+    _FALLBACK_CACHE.clear()
+    _DIR_LISTING_CACHE.clear()
+    _PROBE_CACHE.clear()
+    _WORKSPACE_CACHE.clear()
+
+
 def _default_runner(command: list[str]) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(command, capture_output=True, text=True, check=False, timeout=5)
+    return subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=5,
+        close_fds=_PROBE_CLOSE_FDS,
+    )
 
 
 def collect_environment_diagnostics(
@@ -136,107 +261,172 @@ def collect_environment_diagnostics(
     runner: ToolRunner | None = None,
     resolver: WhichResolver | None = None,
     tools: Iterable[ToolRequirement] = REQUIRED_TOOLS,
+    refresh: bool = False,
 ) -> List[DiagnosticResult]:
-    which = resolver or shutil.which
-    exec_runner = runner or _default_runner
-    results: List[DiagnosticResult] = []
-    for tool in tools:
-        path = which(tool.executable)
-        fallback_path: str | None = None
-        if not path and tool.fallback_paths:
-            for raw in tool.fallback_paths:
-                candidate = Path(raw).expanduser()
-                if candidate.exists():
-                    fallback_path = str(candidate)
-                    break
-
-        if not path and fallback_path is None:
-            results.append(
-                DiagnosticResult(
-                    name=tool.name,
-                    status="missing",
-                    found=False,
-                    version=None,
-                    remediation=tool.remediation,
-                )
+    """Probe each required tool and the Bundlr runner workspace.
+
+    With the default runner and resolver, per-tool results are reused for
+    ``_PATH_CACHE_TTL`` seconds (keyed by the current PATH); pass ``refresh=True``
+    to drop every cached lookup and force new probes. Injected hooks always probe.
+    """
+    if refresh:
+        # Tools may have been installed since the last pass; forget PATH scans,
+        # fallback locations and directory listings as well as probe results.
+        clear_env_diag_cache()
+    exec_runner = _shared_probe_runner(runner or _default_runner)
+    requirements = list(tools)
+    use_cache = runner is None and resolver is None
+    path_env = os.environ.get("PATH", "")
+    now = time.monotonic()
+    results: list[DiagnosticResult | None] = [None] * len(requirements)
+    pending: list[int] = []
+    for index, tool in enumerate(requirements):
+        cached = None
+        if use_cache:
+            cached = _PROBE_CACHE.get(_probe_cache_key(tool, path_env))
+        if cached is not None and now - cached[0] < _PATH_CACHE_TTL:
+            results[index] = cached[1]
+        else:
+            pending.append(index)
+    if pending:
+        if resolver is not None:
+            which = resolver
+        else:
+            which = resolve_executables(
+                requirements[index].executable for index in pending
+            ).get
+        # Probes are independent and spend their time waiting on subprocesses, so
+        # run them concurrently; map() keeps results in requirement order.
+        workers = min(_MAX_PROBE_WORKERS, len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            probed = executor.map(
+                lambda index: _probe_tool(requirements[index], which, exec_runner), pending
             )
-            continue
-
-        if not path and fallback_path:
+            for index, result in zip(pending, probed, strict=True):
+                results[index] = result
+                if use_cache:
+                    _PROBE_CACHE[_probe_cache_key(requirements[index], path_env)] = (now, result)
+
+    diagnostics: list[DiagnosticResult] = [result for result in results if result is not None]
+    diagnostics.extend(_collect_runner_diagnostics(Path.cwd()))
+    return diagnostics
+
+
+def _probe_cache_key(
+    tool: ToolRequirement, path_env: str
+) -> tuple[str, str, tuple[str, ...], str]:
+    return (tool.name, tool.executable, tuple(tool.version_args), path_env)
+
+
+def _shared_probe_runner(runner: ToolRunner) -> ToolRunner:
+    """Run each distinct probe command once per diagnostics pass.
+
+    Several requirements probe the same binary (``node --version`` backs both
+    Node.js and the Umi runtime); later callers wait for the first result instead
+    of spawning another process.
+    """
+    probes: dict[tuple[str, ...], Future[subprocess.CompletedProcess[str]]] = {}
+    lock = threading.Lock()
+
+    def run(command: list[str]) -> subprocess.CompletedProcess[str]:
+        key = tuple(command)
+        with lock:
+            future = probes.get(key)
+            owner = future is None
+            if future is None:
+                future = probes[key] = Future()
+        if owner:
             try:
-                completed = exec_runner([fallback_path, *tool.version_args])
-            except Exception as exc:  # noqa: BLE001
-                results.append(
-                    DiagnosticResult(
-                        name=tool.name,
-                        status="missing",
-                        found=False,
-                        version=None,
-                        remediation=tool.remediation,
-                        details=f"Found at {fallback_path} but failed to execute: {exc}",
-                    )
-                )
-                continue
-
-            output = (completed.stdout or completed.stderr or "").strip()
-            version = output.splitlines()[0].strip() if output else "unknown"
-            parent_dir = Path(fallback_path).expanduser().parent
-            remediation = (
-                f"{tool.remediation} Add {parent_dir} to your PATH."
-                if tool.remediation
-                else f"Add {parent_dir} to your PATH."
-            )
-            results.append(
-                DiagnosticResult(
-                    name=tool.name,
-                    status="missing",
-                    found=False,
-                    version=version,
-                    remediation=remediation,
-                    details=f"Detected at {fallback_path}, but it is not on PATH.",
-                )
-            )
-            continue
+                future.set_result(runner(command))
+            except BaseException as exc:  # noqa: BLE001 - re-raised to every waiter
+                future.set_exception(exc)
+        return future.result()
+
+    return run
+
+
+def _probe_tool(
+    tool: ToolRequirement,
+    which: WhichResolver,
+    exec_runner: ToolRunner,
+) -> DiagnosticResult:
+    # Unpack the requirement once; the fields are read on every branch below.
+    name, remediation, version_args = tool.name, tool.remediation, tool.version_args
+    path = which(tool.executable)
+    fallback_path: str | None = None
+    if not path and tool.fallback_paths:
+        fallback_path = _resolve_fallback_path(tool.fallback_paths)
+
+    if not path and fallback_path is None:
+        return DiagnosticResult(
+            name=name,
+            status="missing",
+            found=False,
+            version=None,
+            remediation=remediation,
+        )
 
-        assert path is not None  # for type checkers
+    if not path and fallback_path:
         try:
-            completed = exec_runner([path, *tool.version_args])
+            completed = exec_runner([fallback_path, *version_args])
         except Exception as exc:  # noqa: BLE001
-            results.append(
-                DiagnosticResult(
-                    name=tool.name,
-                    status="error",
-                    found=True,
-                    version=None,
-                    remediation=tool.remediation,
-                    details=str(exc),
-                )
+            return DiagnosticResult(
+                name=name,
+                status="missing",
+                found=False,
+                version=None,
+                remediation=remediation,
+                details=f"Found at {fallback_path} but failed to execute: {exc}",
             )
-            continue
 
         output = (completed.stdout or completed.stderr or "").strip()
         version = output.splitlines()[0].strip() if output else "unknown"
-        status = "ok" if completed.returncode == 0 and output else "warn"
-        details = None
-        if completed.returncode != 0 and not details:
-            details = f"Non-zero exit code: {completed.returncode}"
-        results.append(
-            DiagnosticResult(
-                name=tool.name,
-                status=status,
-                found=True,
-                version=version,
-                remediation=None if status == "ok" else tool.remediation,
-                details=details,
-            )
+        parent_dir = os.path.dirname(fallback_path)
+        path_hint = (
+            f"{remediation} Add {parent_dir} to your PATH."
+            if remediation
+            else f"Add {parent_dir} to your PATH."
+        )
+        return DiagnosticResult(
+            name=name,
+            status="missing",
+            found=False,
+            version=version,
+            remediation=path_hint,
+            details=f"Detected at {fallback_path}, but it is not on PATH.",
         )
 
-    results.extend(_collect_runner_diagnostics(Path.cwd()))
-    return results
+    assert path is not None  # for type checkers
+    try:
+        completed = exec_runner([path, *version_args])
+    except Exception as exc:  # noqa: BLE001
+        return DiagnosticResult(
+            name=name,
+            status="error",
+            found=True,
+            version=None,
+            remediation=remediation,
+            details=str(exc),
+        )
+
+    output = (completed.stdout or completed.stderr or "").strip()
+    version = output.splitlines()[0].strip() if output else "unknown"
+    status = "ok" if completed.returncode == 0 and output else "warn"
+    details = None
+    if completed.returncode != 0 and not details:
+        details = f"Non-zero exit code: {completed.returncode}"
+    return DiagnosticResult(
+        name=name,
+        status=status,
+        found=True,
+        version=version,
+        remediation=None if status == "ok" else remediation,
+        details=details,
+    )
 
 
 def _collect_runner_diagnostics(start: Path) -> List[DiagnosticResult]:
-    candidates = _workspace_candidates(start)
+    candidates = _cached_workspace_candidates(start)
     name = "Bundlr uploader (Irys)"
     remediation = "Run `/env install bundlr-runner` (with an active workspace) to install uploader dependencies."
 
@@ -259,7 +449,7 @@ def _collect_runner_diagnostics(start: Path) -> List[DiagnosticResult]:
         pkg_path = runner_dir / "package.json"
         module_dir = runner_dir / "node_modules" / "@irys" / "sdk"
 
-        if not runner_dir.exists():
+        if not os.path.exists(runner_dir):
             missing_entries.append(
                 (
                     workspace,
@@ -269,7 +459,7 @@ def _collect_runner_diagnostics(start: Path) -> List[DiagnosticResult]:
             )
             continue
 
-        if not pkg_path.exists():
+        if not os.path.exists(pkg_path):
             missing_entries.append(
                 (
                     workspace,
@@ -279,17 +469,9 @@ def _collect_runner_diagnostics(start: Path) -> List[DiagnosticResult]:
             )
             continue
 
-        version = None
-        try:
-            pkg_data = json.loads(pkg_path.read_text())
-            version = (
-                pkg_data.get("dependencies", {}).get("@irys/sdk")
-                or pkg_data.get("devDependencies", {}).get("@irys/sdk")
-            )
-        except Exception:
-            version = None
+        version = _irys_sdk_version(pkg_path)
 
-        if module_dir.exists():
+        if os.path.exists(module_dir):
             return [
                 DiagnosticResult(
                     name=name,
@@ -341,6 +523,34 @@ def _collect_runner_diagnostics(start: Path) -> List[DiagnosticResult]:
     ]
 
 
+def _irys_sdk_version(pkg_path: Path) -> str | None:
+    """Return the declared ``@irys/sdk`` version, parsing package.json only if it names it."""
+    try:
+        raw = pkg_path.read_bytes()
+    except OSError:
+        return None
+    if b"@irys/sdk" not in raw:
+        return None
+    try:
+        pkg_data = json.loads(raw)
+        return (
+            pkg_data.get("dependencies", {}).get("@irys/sdk")
+            or pkg_data.get("devDependencies", {}).get("@irys/sdk")
+        )
+    except Exception:
+        return None
+
+
+def _cached_workspace_candidates(start: Path) -> List[Path]:
+    now = time.monotonic()
+    cached = _WORKSPACE_CACHE.get(start)
+    if cached is not None and now - cached[0] < _WORKSPACE_CACHE_TTL:
+        return list(cached[1])
+    candidates = _workspace_candidates(start)
+    _WORKSPACE_CACHE[start] = (now, tuple(candidates))
+    return candidates
+
+
 def _workspace_candidates(start: Path) -> List[Path]:
     try:
         current = start.expanduser().resolve()
@@ -349,10 +559,10 @@ def _workspace_candidates(start: Path) -> List[Path]:
     candidates: List[Path] = []
     for candidate in [current, *current.parents]:
         solcoder_dir = candidate / ".solcoder"
-        if solcoder_dir.exists():
+        if os.path.exists(solcoder_dir):
             candidates.append(candidate)
         workspace_child = candidate / "workspace"
-        if (workspace_child / ".solcoder").exists():
+        if os.path.exists(workspace_child / ".solcoder"):
             candidates.append(workspace_child)
     # Deduplicate preserving order
     seen: set[Path] = set()
@@ -364,4 +574,11 @@ def _workspace_candidates(start: Path) -> List[Path]:
     return unique
 
 
-__all__ = ["DiagnosticResult", "ToolRequirement", "collect_environment_diagnostics", "REQUIRED_TOOLS"]
+__all__ = [
+    "DiagnosticResult",
+    "ToolRequirement",
+    "clear_env_diag_cache",
+    "collect_environment_diagnostics",
+    "resolve_executables",
+    "REQUIRED_TOOLS",
+]
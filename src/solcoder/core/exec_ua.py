@@ -2,20 +2,42 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
 import os
 import platform
-import re
-import shutil
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Mapping, Sequence
 from urllib.parse import quote
 
+from solcoder.core.env_diag import resolve_executables
+
 _SPEC_VERSION = "v1"
 _DEFAULT_TIMEOUT_SECONDS = 15.0
-_VERSION_PATTERN = re.compile(r"(\d+\.\d+)")
 _EXEC_UA_CACHE: dict[str, str] = {}
+# Probes are short read-only commands. Python opens its own descriptors as
+# non-inheritable, so skipping close_fds leaks nothing and lets subprocess use
+# posix_spawn instead of fork+exec. Windows keeps the default.
+_PROBE_CLOSE_FDS = sys.platform == "win32"
+# Headers are also persisted across CLI invocations, keyed on a cheap
+# fingerprint of the inputs most likely to change them.
+_DISK_CACHE_TTL = 3600.0
+_CACHEDIR_TAG = (
+    "Signature: 8a477f597d28d172789f06886806bc55\n"
+    "# This file is a cache directory tag created by SolCoder.\n"
+    "# For information about cache directory tags see https://bford.info/cachedir/\n"
+)
+# Characters quote(..., safe="/:\\") leaves untouched, mapped for deletion.
+_CWD_SAFE_CHARS = str.maketrans(
+    "", "", "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~/:\\"
+)
+_CWD_QUOTE_CACHE: dict[str, str] = {}
+_OS_RELEASE_PATHS = ("/etc/os-release", "/usr/lib/os-release")
 
 _PM_CANDIDATES: Mapping[str, str] = {
     "apt": "apt",
@@ -33,6 +55,20 @@ _TOOL_PROBES: tuple[tuple[str, Sequence[str]], ...] = (
     ("git", ("git", "--version")),
 )
 
+# Every executable the detectors look up, resolved together in one PATH scan.
+_EXECUTABLES: tuple[str, ...] = (
+    *_PM_CANDIDATES.values(),
+    "sudo",
+    "git",
+    *(command[0] for name, command in _TOOL_PROBES if name != "python"),
+)
+
+
+def _locate_executables() -> dict[str, str | None]:
+    # env_diag caches resolutions briefly, so only the first detector pays for
+    # the scan.
+    return resolve_executables(_EXECUTABLES)
+
 
 def _run_command(args: Sequence[str], *, timeout: float = 2.0) -> subprocess.CompletedProcess[str]:
     try:
@@ -42,6 +78,7 @@ def _run_command(args: Sequence[str], *, timeout: float = 2.0) -> subprocess.Com
             text=True,
             check=False,
             timeout=timeout,
+            close_fds=_PROBE_CLOSE_FDS,
         )
     except Exception as exc:  # noqa: BLE001
         return subprocess.CompletedProcess(args, returncode=1, stdout="", stderr=str(exc))
@@ -50,12 +87,40 @@ def _run_command(args: Sequence[str], *, timeout: float = 2.0) -> subprocess.Com
 def _normalize_version(raw: str | None) -> str:
     if not raw:
         return "unknown"
-    match = _VERSION_PATTERN.search(raw)
-    if not match:
-        return "unknown"
-    return match.group(1)
+    # Plain scan for the first "<digits>.<digits>"; probe output is short and
+    # this is called for every tool on each header build.
+    length = len(raw)
+    index = 0
+    while index < length:
+        if not "0" <= raw[index] <= "9":
+            index += 1
+            continue
+        start = index
+        while index < length and "0" <= raw[index] <= "9":
+            index += 1
+        if index + 1 < length and raw[index] == "." and "0" <= raw[index + 1] <= "9":
+            index += 1
+            while index < length and "0" <= raw[index] <= "9":
+                index += 1
+            return raw[start:index]
+    return "unknown"
+
+
+def _os_release_version_id() -> str:
+    """Return VERSION_ID from os-release, reading the file directly."""
+    for path in _OS_RELEASE_PATHS:
+        try:
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    if line.startswith("VERSION_ID="):
+                        return line[len("VERSION_ID=") :].strip().strip("\"'")
+        except OSError:
+            continue
+        return ""
+    return ""
 
 
+@functools.lru_cache(maxsize=1)
 def _detect_os() -> tuple[str, str]:
     system = platform.system().lower()
     if system == "darwin":
@@ -66,13 +131,7 @@ def _detect_os() -> tuple[str, str]:
         version = platform.win32_ver()[0]
     elif system == "linux":
         os_name = "linux"
-        version = ""
-        if hasattr(platform, "freedesktop_os_release"):
-            try:
-                release_info = platform.freedesktop_os_release()
-            except Exception:  # noqa: BLE001
-                release_info = {}
-            version = (release_info or {}).get("VERSION_ID") or ""
+        version = _os_release_version_id()
         if not version:
             version = platform.release()
     else:
@@ -85,6 +144,7 @@ def _detect_os() -> tuple[str, str]:
     return os_name, version
 
 
+@functools.lru_cache(maxsize=1)
 def _detect_arch() -> str:
     machine = platform.machine().lower()
     if "arm" in machine or "aarch64" in machine:
@@ -108,17 +168,15 @@ def _detect_shell() -> str:
 
 
 def _detect_package_managers() -> str:
-    detected: list[str] = []
-    for key, exe in _PM_CANDIDATES.items():
-        if shutil.which(exe):
-            detected.append(key)
+    located = _locate_executables()
+    detected = [key for key, exe in _PM_CANDIDATES.items() if located.get(exe)]
     return ",".join(detected) if detected else "none"
 
 
 def _detect_sudo_mode(os_name: str) -> str:
     if os_name == "windows":
         return "forbidden"
-    sudo_path = shutil.which("sudo")
+    sudo_path = _locate_executables().get("sudo")
     if not sudo_path:
         return "forbidden"
     result = _run_command([sudo_path, "-n", "true"])
@@ -131,31 +189,90 @@ def _detect_sudo_mode(os_name: str) -> str:
 
 
 def _detect_cwd() -> str:
-    cwd = str(Path.cwd())
-    return quote(cwd, safe="/:\\")
+    cwd = os.getcwd()
+    cached = _CWD_QUOTE_CACHE.get(cwd)
+    if cached is not None:
+        return cached
+    # Most paths contain nothing quote() would escape; skip it for those.
+    quoted = cwd if not cwd.translate(_CWD_SAFE_CHARS) else quote(cwd, safe="/:\\")
+    _CWD_QUOTE_CACHE.clear()
+    _CWD_QUOTE_CACHE[cwd] = quoted
+    return quoted
 
 
 def _detect_git_state() -> str:
-    git_path = shutil.which("git")
+    git_path = _locate_executables().get("git")
     if not git_path:
         return "0"
-    inside = _run_command([git_path, "rev-parse", "--is-inside-work-tree"])
-    if inside.returncode != 0 or (inside.stdout or "").strip().lower() != "true":
+    # One porcelain v2 call reports the branch header and the dirty entries; it
+    # fails outside a work tree.
+    result = _run_command([git_path, "status", "--branch", "--porcelain=v2"])
+    if result.returncode != 0:
         return "0"
-    branch = _run_command([git_path, "rev-parse", "--abbrev-ref", "HEAD"]).stdout.strip() or "unknown"
-    status = _run_command([git_path, "status", "--porcelain"]).stdout.strip()
-    dirty = "*" if status else ""
+    branch = "unknown"
+    dirty = ""
+    for line in (result.stdout or "").splitlines():
+        if line.startswith("# branch.head "):
+            branch = line[len("# branch.head ") :].strip() or "unknown"
+        elif line and not line.startswith("#"):
+            dirty = "*"
+    if branch == "(detached)":
+        branch = "HEAD"  # matches `git rev-parse --abbrev-ref HEAD`
     branch_clean = branch.replace(" ", "_")
     return f"1:{branch_clean}{dirty}"
 
 
+def _find_git_dir(start: Path) -> Path | None:
+    """Return the nearest `.git` entry (directory or worktree file) above ``start``."""
+    for candidate in (start, *start.parents):
+        git_entry = candidate / ".git"
+        if os.path.exists(git_entry):
+            return git_entry
+    return None
+
+
+def _read_ref(git_dir: Path, ref: str) -> str:
+    try:
+        return (git_dir / ref).read_text(encoding="utf-8").strip()
+    except OSError:
+        pass
+    try:
+        packed = (git_dir / "packed-refs").read_text(encoding="utf-8")
+    except OSError:
+        return ""
+    for line in packed.splitlines():
+        sha, _, name = line.partition(" ")
+        if name == ref:
+            return sha
+    return ""
+
+
+def _git_head_sha() -> str:
+    """Return the checked-out commit by reading `.git` directly, without spawning git."""
+    git_entry = _find_git_dir(Path.cwd())
+    if git_entry is None:
+        return ""
+    try:
+        if not git_entry.is_dir():
+            # Worktree pointer file; its contents are stable enough for a fingerprint.
+            return git_entry.read_text(encoding="utf-8").strip()
+        head = (git_entry / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+    if head.startswith("ref: "):
+        ref = head[len("ref: ") :]
+        return f"{ref}@{_read_ref(git_entry, ref)}"
+    return head
+
+
 def _detect_tools() -> str:
     tools: list[str] = []
+    located = _locate_executables()
     for name, command in _TOOL_PROBES:
         if name == "python":
             version = f"{sys.version_info.major}.{sys.version_info.minor}"
         else:
-            if not shutil.which(command[0]):
+            if not located.get(command[0]):
                 continue
             result = _run_command(command)
             version = _normalize_version(result.stdout or result.stderr)
@@ -172,20 +289,102 @@ def _normalize_timeout(timeout: float | int | None) -> str:
     return f"{value:.2f}".rstrip("0").rstrip(".")
 
 
+def _disk_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "solcoder" / "exec_ua.json"
+
+
+def _environment_fingerprint() -> str:
+    parts = (
+        os.environ.get("PATH", ""),
+        os.environ.get("SHELL") or os.environ.get("COMSPEC") or "",
+        str(Path.cwd()),
+        _git_head_sha(),
+    )
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()  # noqa: S324
+
+
+def _load_disk_entries(path: Path) -> dict[str, dict]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    entries = payload.get("entries") if isinstance(payload, dict) else None
+    return entries if isinstance(entries, dict) else {}
+
+
+def _read_disk_cache(cache_key: str, fingerprint: str) -> str | None:
+    entry = _load_disk_entries(_disk_cache_path()).get(cache_key)
+    if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+        return None
+    try:
+        age = time.time() - float(entry.get("created", 0))
+    except (TypeError, ValueError):
+        return None
+    header = entry.get("header")
+    if not isinstance(header, str) or not 0 <= age < _DISK_CACHE_TTL:
+        return None
+    return header
+
+
+def _write_disk_cache(cache_key: str, fingerprint: str, header: str) -> None:
+    path = _disk_cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tag_path = path.parent / "CACHEDIR.TAG"
+        if not tag_path.exists():
+            tag_path.write_text(_CACHEDIR_TAG, encoding="utf-8")
+        entries = _load_disk_entries(path)
+        entries[cache_key] = {"fingerprint": fingerprint, "created": time.time(), "header": header}
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"entries": entries}), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError:
+        # The disk cache is an optimisation only.
+        return
+
+
+def _with_git_state(header: str, git_state: str) -> str:
+    prefix, marker, rest = header.partition("; git=")
+    if not marker:
+        return header
+    _old_state, _, suffix = rest.partition(";")
+    return f"{prefix}; git={git_state};{suffix}"
+
+
 def build_exec_ua_header(*, timeout: float | int | None = None, refresh: bool = False) -> str:
     """Return the Exec-UA header string describing the current environment."""
     cache_key = str(timeout) if timeout is not None else "default"
     if not refresh and cache_key in _EXEC_UA_CACHE:
         return _EXEC_UA_CACHE[cache_key]
 
+    fingerprint = _environment_fingerprint()
+    if not refresh:
+        cached = _read_disk_cache(cache_key, fingerprint)
+        if cached is not None:
+            # Uncommitted edits do not change the fingerprint, so the git token
+            # is always re-read rather than trusted from disk.
+            cached = _with_git_state(cached, _detect_git_state())
+            _EXEC_UA_CACHE[cache_key] = cached
+            return cached
+
     os_name, os_version = _detect_os()
     arch = _detect_arch()
-    shell = _detect_shell()
-    package_managers = _detect_package_managers()
-    sudo_mode = _detect_sudo_mode(os_name)
-    cwd = _detect_cwd()
-    git_state = _detect_git_state()
-    tools = _detect_tools()
+    _locate_executables()  # one PATH scan up front instead of one per thread
+    # The remaining detectors mostly wait on short subprocesses; overlap them.
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        shell_future = executor.submit(_detect_shell)
+        pm_future = executor.submit(_detect_package_managers)
+        sudo_future = executor.submit(_detect_sudo_mode, os_name)
+        cwd_future = executor.submit(_detect_cwd)
+        git_future = executor.submit(_detect_git_state)
+        tools_future = executor.submit(_detect_tools)
+        shell = shell_future.result()
+        package_managers = pm_future.result()
+        sudo_mode = sudo_future.result()
+        cwd = cwd_future.result()
+        git_state = git_future.result()
+        tools = tools_future.result()
     timeout_value = _normalize_timeout(timeout)
 
     tokens = [
@@ -203,11 +402,18 @@ def build_exec_ua_header(*, timeout: float | int | None = None, refresh: bool =
     ]
     header = "Exec-UA: " + "; ".join(tokens) + ";"
     _EXEC_UA_CACHE[cache_key] = header
+    _write_disk_cache(cache_key, fingerprint, header)
     return header
 
 
 def clear_exec_ua_cache() -> None:
     _EXEC_UA_CACHE.clear()
+    _detect_os.cache_clear()
+    _detect_arch.cache_clear()
+    try:
+        _disk_cache_path().unlink()
+    except OSError:
+        pass
 
 
 __all__ = ["build_exec_ua_header", "clear_exec_ua_cache"]
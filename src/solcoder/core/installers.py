@@ -2,16 +2,27 @@
 
 from __future__ import annotations
 
+import codecs
+import functools
+import locale
+import os
 import platform
+import selectors
 import subprocess
-import os
+import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Iterable, Mapping, Sequence
+from typing import IO, Any, Callable, Iterable, Mapping, Sequence
 
 from typing_extensions import TypeAlias
 
-from solcoder.core.env_diag import DiagnosticResult, collect_environment_diagnostics
+from solcoder.core.env_diag import (
+    REQUIRED_TOOLS,
+    DiagnosticResult,
+    clear_env_diag_cache,
+    collect_environment_diagnostics,
+)
 import tomli_w
 
 try:  # Python 3.11+
@@ -21,6 +32,9 @@ except ModuleNotFoundError:  # pragma: no cover
 
 Runner: TypeAlias = Callable[[list[str]], subprocess.CompletedProcess[str]]
 
+_OUTPUT_BATCH_LINES = 32
+_OUTPUT_FLUSH_INTERVAL = 0.1
+
 
 class InstallerError(RuntimeError):
     """Raised when an installer cannot complete successfully."""
@@ -62,6 +76,7 @@ class InstallerResult:
         return "error"
 
 
+@functools.lru_cache(maxsize=1)
 def _platform_key() -> str:
     system = platform.system().lower()
     if system == "darwin":
@@ -73,10 +88,58 @@ def _platform_key() -> str:
     return system
 
 
+_STEP_MARKER = "::solcoder-install-step::"
+
+
 def _bash_command(cmd: str) -> list[str]:
     return ["bash", "-lc", cmd]
 
 
+def _fused_bash_command(commands: Sequence[str]) -> tuple[str, ...]:
+    """Chain ``commands`` in one login shell so sourced env and exports carry over.
+
+    Each step is preceded by a ``_STEP_MARKER`` line so the caller can tell which
+    step was running when the chain stopped.
+    """
+    if len(commands) == 1:
+        return tuple(_bash_command(commands[0]))
+    return tuple(
+        _bash_command(
+            " && ".join(
+                f"echo {_STEP_MARKER}{index} && {{ {command}; }}"
+                for index, command in enumerate(commands)
+            )
+        )
+    )
+
+
+def _parse_step_marker(line: str) -> tuple[str, int | None]:
+    """Split a step marker off ``line``; return the text before it and the step.
+
+    The marker follows the previous step's output directly, so it lands mid-line
+    when that output did not end with a newline.
+    """
+    head, marker, tail = line.partition(_STEP_MARKER)
+    if not marker or not tail.isdigit():
+        return line, None
+    return head, int(tail)
+
+
+def _split_step_markers(lines: Sequence[str]) -> tuple[list[str], int]:
+    """Drop step markers from ``lines``; return the rest and the last step started."""
+    output: list[str] = []
+    last_step = 0
+    for line in lines:
+        text, step = _parse_step_marker(line)
+        if step is None:
+            output.append(line)
+            continue
+        last_step = step
+        if text:
+            output.append(text)
+    return output, last_step
+
+
 INSTALLER_SPECS: dict[str, InstallerSpec] = {
     "solana": InstallerSpec(
         key="solana",
@@ -180,6 +243,20 @@ INSTALLER_SPECS: dict[str, InstallerSpec] = {
     ),
 }
 
+# First installer (in declaration order) verified against each diagnostic name.
+_SPEC_BY_TARGET: dict[str, InstallerSpec] = {}
+for _spec in INSTALLER_SPECS.values():
+    for _target in _spec.verification_targets:
+        _SPEC_BY_TARGET.setdefault(_target, _spec)
+
+# One argv per installer and platform, built once since the command maps are static.
+_BASH_ARGV: dict[tuple[str, str], tuple[str, ...]] = {
+    (_spec.key, _platform): _fused_bash_command(_commands)
+    for _spec in INSTALLER_SPECS.values()
+    for _platform, _commands in _spec.command_map.items()
+}
+del _spec, _target
+
 
 def list_installable_tools() -> list[str]:
     """Return the list of supported installer keys."""
@@ -200,10 +277,8 @@ def installer_display_name(tool: str) -> str:
 
 def installer_key_for_diagnostic(target_name: str) -> str | None:
     """Return the installer key that verifies against the given diagnostic name."""
-    for spec in INSTALLER_SPECS.values():
-        if target_name in spec.verification_targets:
-            return spec.key
-    return None
+    spec = _SPEC_BY_TARGET.get(target_name)
+    return spec.key if spec is not None else None
 
 
 def detect_missing_tools(
@@ -212,14 +287,12 @@ def detect_missing_tools(
     only_required: bool = False,
 ) -> list[str]:
     """Return installer keys that are missing according to diagnostics."""
-    diag_map = {item.name: item for item in diagnostics}
-    missing: list[str] = []
-    for key, spec in INSTALLER_SPECS.items():
-        if only_required and not spec.required:
-            continue
-        if not _has_tool(spec, diag_map):
-            missing.append(key)
-    return missing
+    found = _found_names(diagnostics)
+    return [
+        key
+        for key, spec in INSTALLER_SPECS.items()
+        if (spec.required or not only_required) and not _has_tool(spec, found)
+    ]
 
 
 def install_tool(
@@ -252,34 +325,44 @@ def install_tool(
         executed_commands.append(command)
         if dry_run:
             logs.append(f"[dry-run] {command}")
-            continue
-        if console:
+        elif console:
             console.print(f"[bold #14F195]$ {command}[/]")
+
+    if not dry_run:
+        # All steps share one login shell: profiles are sourced once and steps
+        # like `source $HOME/.cargo/env` affect the commands after them.
+        argv = _BASH_ARGV.get((spec.key, platform_key)) or _fused_bash_command(commands)
         if runner:
-            completed = runner(_bash_command(command))
+            completed = runner(list(argv))
+            return_code = completed.returncode
             output = (completed.stdout or "") + (completed.stderr or "")
-            if output:
-                for line in output.splitlines():
-                    logs.append(line)
-                    if console:
-                        console.print(line)
-            if completed.returncode != 0:
-                success = False
-                error = f"Command exited with {completed.returncode}"
-                break
+            output_lines, last_step = _split_step_markers(output.splitlines())
+            for line in output_lines:
+                logs.append(line)
+                if console:
+                    console.print(line)
         else:
-            return_code, output_lines = _run_command(command, env=env, console=console)
+            return_code, raw_lines = _run_command(argv, env=env, console=console)
+            output_lines, last_step = _split_step_markers(raw_lines)
             logs.extend(output_lines)
-            if return_code != 0:
-                success = False
-                error = f"Command exited with {return_code}"
-                break
+        if return_code != 0:
+            # `&&` stops at the first failure, so later steps never ran.
+            executed_commands = executed_commands[: last_step + 1]
+            success = False
+            error = (
+                f"Step {last_step + 1}/{len(commands)} exited with {return_code}: "
+                f"{commands[last_step]}"
+            )
 
     verification_passed = False
     if success and not dry_run:
         _refresh_environment(spec)
-        diagnostics = collect_environment_diagnostics()
-        verification_passed = _has_tool(spec, {d.name: d for d in diagnostics})
+        clear_env_diag_cache()
+        # Only the tools this installer is verified against need probing.
+        diagnostics = collect_environment_diagnostics(
+            tools=tuple(t for t in REQUIRED_TOOLS if t.name in spec.verification_targets)
+        )
+        verification_passed = _has_tool(spec, _found_names(diagnostics))
         if not verification_passed and success:
             error = "Post-install verification failed."
             success = False
@@ -296,16 +379,16 @@ def install_tool(
     )
 
 
-def _has_tool(spec: InstallerSpec, diag_map: Mapping[str, DiagnosticResult]) -> bool:
-    for target in spec.verification_targets:
-        diag = diag_map.get(target)
-        if diag is None or not diag.found:
-            return False
-    return True
+def _found_names(diagnostics: Iterable[DiagnosticResult]) -> set[str]:
+    return {item.name for item in diagnostics if item.found}
+
+
+def _has_tool(spec: InstallerSpec, found: set[str]) -> bool:
+    return found.issuperset(spec.verification_targets)
 
 
 def _run_command(
-    command: str,
+    argv: Sequence[str],
     *,
     env: Mapping[str, str] | None = None,
     console=None,
@@ -315,25 +398,76 @@ def _run_command(
         merged_env = {**os.environ, **env}
 
     process = subprocess.Popen(  # noqa: S603,S607
-        _bash_command(command),
+        argv,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
         env=merged_env,
+        # Installer commands only see inheritable fds, which Python never creates
+        # by default; leaving close_fds off allows posix_spawn.
+        close_fds=sys.platform == "win32",
     )
     output_lines: list[str] = []
     try:
         if process.stdout is not None:
-            for line in process.stdout:
-                stripped = line.rstrip("\n")
-                output_lines.append(stripped)
-                if console:
-                    console.print(stripped)
+            _stream_output(process.stdout, output_lines, console)
     finally:
         return_code = process.wait()
     return return_code, output_lines
 
 
+def _stream_output(stream: IO[bytes], output_lines: list[str], console=None) -> None:
+    """Collect ``stream`` into ``output_lines``, echoing it to ``console`` in batches.
+
+    Printing every line through Rich dominates long compiler logs, so lines are
+    flushed together once enough accumulate or the output goes quiet.
+    """
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))("replace")
+    pending: list[str] = []
+    last_flush = time.monotonic()
+
+    def flush() -> None:
+        nonlocal last_flush
+        if pending and console:
+            console.print("\n".join(pending))
+        pending.clear()
+        last_flush = time.monotonic()
+
+    def add(lines: list[str]) -> None:
+        for line in lines:
+            stripped = line.rstrip("\r")
+            output_lines.append(stripped)
+            text, step = _parse_step_marker(stripped)
+            if step is None or text:
+                pending.append(text)
+        if len(pending) >= _OUTPUT_BATCH_LINES or time.monotonic() - last_flush >= _OUTPUT_FLUSH_INTERVAL:
+            flush()
+
+    if sys.platform == "win32":
+        # select() does not support pipes on Windows; batch on line arrival.
+        for raw in stream:
+            add([decoder.decode(raw).rstrip("\n")])
+        flush()
+        return
+
+    partial = ""
+    fd = stream.fileno()
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            if not selector.select(timeout=_OUTPUT_FLUSH_INTERVAL):
+                flush()
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            *lines, partial = (partial + decoder.decode(chunk)).split("\n")
+            add(lines)
+    partial += decoder.decode(b"", final=True)
+    if partial:
+        add([partial])
+    flush()
+
+
 def _prepare_install_environment(spec: InstallerSpec, commands: Sequence[str]) -> None:
     """Ensure any prerequisite configuration is in place prior to running installer commands."""
     if any("cargo install" in cmd for cmd in commands):
@@ -396,13 +530,16 @@ def _refresh_environment(spec: InstallerSpec) -> None:
 
     current = os.environ.get("PATH", "")
     parts = [entry for entry in current.split(os.pathsep) if entry]
-    updated = False
+    # Compare normalised entries so "/x/bin/" and "/x/bin" count as the same dir.
+    seen = {os.path.normpath(entry) for entry in parts}
+    prefix: list[str] = []
     for entry in additions:
-        if entry and entry not in parts:
-            parts.insert(0, entry)
-            updated = True
-    if updated:
-        os.environ["PATH"] = os.pathsep.join(parts)
+        normalized = os.path.normpath(entry)
+        if entry and normalized not in seen:
+            seen.add(normalized)
+            prefix.insert(0, entry)
+    if prefix:
+        os.environ["PATH"] = os.pathsep.join(prefix + parts)
 
 
 __all__ = [
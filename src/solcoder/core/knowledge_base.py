@@ -5,14 +5,18 @@ Lightweight client helper for the SolCoder knowledge base powered by LightRAG.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
 import re
-from collections import Counter
-from collections.abc import AsyncIterable
+import sys
+import time
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import AsyncIterable, Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from heapq import nlargest
+from heapq import heappush, heapreplace
 from pathlib import Path
 from typing import Any
 
@@ -22,13 +26,26 @@ except ImportError:  # pragma: no cover
     LightRAG = None  # type: ignore[assignment]
     QueryParam = None  # type: ignore[assignment]
 
+try:  # pragma: no cover - optional speedup for loading the local knowledge pack
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
 
 DEFAULT_WORKING_DIR = Path("var/lightrag/solana/lightrag")
+# Opt-in reuse of answers for repeated questions (SOLCODER_KB_ANSWER_CACHE=1).
+_ANSWER_CACHE_SIZE = 256
+_ANSWER_CACHE_TTL = 300.0
+_DEFAULT_PARAPHRASE_THRESHOLD = 0.85
 
 
 logger = logging.getLogger(__name__)
 
 
+def _env_enabled(name: str) -> bool:
+    return os.environ.get(name, "").lower() in {"1", "true", "yes", "on"}
+
+
 class KnowledgeBaseError(RuntimeError):
     """Raised when the knowledge base cannot be queried."""
 
@@ -59,6 +76,33 @@ class KnowledgeBaseClient:
         self._prefer_local = os.environ.get("SOLCODER_KB_BACKEND", "").lower() == "local"
         self._local_backend: _LocalKnowledgeBase | None = None
         self._local_backend_error: str | None = None
+        # One LightRAG instance is initialized on first use and reused until
+        # close(); its storages belong to the event loop that set them up, so
+        # synchronous queries share a private loop instead of asyncio.run().
+        self._rag: Any = None
+        self._rag_loop: asyncio.AbstractEventLoop | None = None
+        self._rag_lock: asyncio.Lock | None = None
+        self._sync_loop: asyncio.AbstractEventLoop | None = None
+        # Local queries run on a private single worker so a busy default executor
+        # cannot delay them; SOLCODER_KB_INLINE=1 runs them on the calling task.
+        self._local_executor: ThreadPoolExecutor | None = None
+        # Exact-type handlers for the common result shapes; subclasses and
+        # response objects fall through to the isinstance/getattr checks.
+        self._result_handlers: dict[type, Callable[[Any], tuple[str, list[Any]]]] = {
+            str: _plain_text_result,
+            dict: self._parse_dict_result,
+        }
+        self._run_local_inline = _env_enabled("SOLCODER_KB_INLINE")
+        self._answer_cache_enabled = _env_enabled("SOLCODER_KB_ANSWER_CACHE")
+        self._answer_cache: OrderedDict[
+            tuple[str, str], tuple[float, frozenset[str], KnowledgeBaseAnswer]
+        ] = OrderedDict()
+        try:
+            self._paraphrase_threshold = float(
+                os.environ.get("SOLCODER_KB_ANSWER_CACHE_JACCARD", _DEFAULT_PARAPHRASE_THRESHOLD)
+            )
+        except ValueError:
+            self._paraphrase_threshold = _DEFAULT_PARAPHRASE_THRESHOLD
 
     async def aquery(self, question: str, *, mode: str | None = None) -> KnowledgeBaseAnswer:
         """Run an async query against the knowledge base."""
@@ -67,6 +111,46 @@ class KnowledgeBaseClient:
         if not question:
             raise KnowledgeBaseError("Knowledge base query requires a non-empty question.")
 
+        if not self._answer_cache_enabled:
+            return await self._answer(question, mode)
+
+        # Lookup and insert never straddle an await, so no lock is needed.
+        token_list = _tokens(question)
+        tokens = frozenset(token_list)
+        cache_key = (" ".join(token_list), mode or self.query_mode)
+        cached = self._cached_answer(cache_key, tokens)
+        if cached is not None:
+            return cached
+        answer = await self._answer(question, mode)
+        self._answer_cache[cache_key] = (time.monotonic(), tokens, answer)
+        self._answer_cache.move_to_end(cache_key)
+        while len(self._answer_cache) > _ANSWER_CACHE_SIZE:
+            self._answer_cache.popitem(last=False)
+        return answer
+
+    def _cached_answer(
+        self, cache_key: tuple[str, str], tokens: frozenset[str]
+    ) -> KnowledgeBaseAnswer | None:
+        now = time.monotonic()
+        entry = self._answer_cache.get(cache_key)
+        if entry is not None and now - entry[0] < _ANSWER_CACHE_TTL:
+            self._answer_cache.move_to_end(cache_key)
+            return entry[2]
+        # Paraphrases: reuse an answer whose question has nearly the same token
+        # set. The cache is small, so comparing against every entry is cheap.
+        if not tokens:
+            return None
+        mode = cache_key[1]
+        for key, (stored_at, cached_tokens, answer) in reversed(self._answer_cache.items()):
+            if key[1] != mode or now - stored_at >= _ANSWER_CACHE_TTL:
+                continue
+            similarity = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if similarity >= self._paraphrase_threshold:
+                self._answer_cache.move_to_end(key)
+                return answer
+        return None
+
+    async def _answer(self, question: str, mode: str | None) -> KnowledgeBaseAnswer:
         if not self.working_dir.exists():
             raise KnowledgeBaseError(
                 f"Knowledge pack missing at {self.working_dir}. "
@@ -77,21 +161,22 @@ class KnowledgeBaseClient:
             return await self._query_local(question)
 
         try:
-            rag = self._build_client()
+            rag = await self._ensure_rag()
         except KnowledgeBaseError as exc:
             logger.debug("LightRAG unavailable, falling back to local backend: %s", exc)
             return await self._query_local(question)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("LightRAG storage setup failed; attempting local fallback", exc_info=True)
+            return await self._query_local(question, failure=exc)
 
         try:
-            await rag.initialize_storages()
-            try:
-                raw_result = await rag.aquery(question, param=self._build_params(mode))
-            finally:
-                await rag.finalize_storages()
+            raw_result = await rag.aquery(question, param=self._build_params(mode))
         except Exception as exc:  # noqa: BLE001
             logger.debug(
                 "LightRAG query failed; attempting local fallback", exc_info=True
             )
+            # Start from fresh storages next time rather than reuse a broken client.
+            await self._release_rag()
             return await self._query_local(question, failure=exc)
 
         text, citations = await self._extract_text_and_citations(raw_result)
@@ -103,11 +188,63 @@ class KnowledgeBaseClient:
         try:
             asyncio.get_running_loop()
         except RuntimeError:
-            return asyncio.run(self.aquery(question, mode=mode))
+            if self._sync_loop is None or self._sync_loop.is_closed():
+                self._sync_loop = asyncio.new_event_loop()
+            return self._sync_loop.run_until_complete(self.aquery(question, mode=mode))
         raise KnowledgeBaseError(
             "Cannot run synchronous query while an event loop is active; await aquery() instead."
         )
 
+    async def _ensure_rag(self) -> Any:
+        loop = asyncio.get_running_loop()
+        lock = self._rag_lock
+        if self._rag_loop is not loop or lock is None:
+            if self._rag is not None:
+                logger.debug("Dropping LightRAG client bound to another event loop")
+            self._rag = None
+            self._rag_loop = loop
+            lock = self._rag_lock = asyncio.Lock()
+        async with lock:
+            if self._rag is None:
+                rag = self._build_client()
+                await rag.initialize_storages()
+                self._rag = rag
+        return self._rag
+
+    async def _release_rag(self) -> None:
+        rag, self._rag = self._rag, None
+        if rag is None:
+            return
+        try:
+            await rag.finalize_storages()
+        except Exception:  # noqa: BLE001
+            logger.debug("LightRAG finalize_storages failed", exc_info=True)
+
+    async def aclose(self) -> None:
+        """Finalize LightRAG storages and release worker threads."""
+        if self._rag is not None and self._rag_loop is asyncio.get_running_loop():
+            await self._release_rag()
+        self.close()
+
+    def close(self) -> None:
+        """Release the LightRAG client, private event loop and local-query worker."""
+        loop = self._sync_loop
+        if loop is not None and not loop.is_closed():
+            if self._rag is not None and self._rag_loop is loop:
+                loop.run_until_complete(self._release_rag())
+            loop.close()
+        self._sync_loop = None
+        self._rag = None
+        if self._local_executor is not None:
+            self._local_executor.shutdown(wait=False)
+            self._local_executor = None
+
+    async def __aenter__(self) -> KnowledgeBaseClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
     def _build_client(self):
         if LightRAG is None or QueryParam is None:
             raise KnowledgeBaseError(
@@ -132,7 +269,14 @@ class KnowledgeBaseClient:
     ) -> KnowledgeBaseAnswer:
         backend = self._ensure_local_backend()
         try:
-            return await asyncio.to_thread(backend.query, question)
+            if self._run_local_inline:
+                return backend.query(question)
+            if self._local_executor is None:
+                self._local_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="solcoder-kb"
+                )
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._local_executor, backend.query, question)
         except KnowledgeBaseError:
             raise
         except Exception as exc:  # noqa: BLE001
@@ -159,23 +303,42 @@ class KnowledgeBaseClient:
             raise KnowledgeBaseError(self._local_backend_error) from exc
 
     async def _extract_text_and_citations(self, raw_result: Any) -> tuple[str, list[Any]]:
+        handlers = self._result_handlers
+        handler = handlers.get(type(raw_result))
+        if handler is not None:
+            return handler(raw_result)
+        if not isinstance(raw_result, AsyncIterable):
+            return self._extract_sync(raw_result)
+
+        text_chunks: list[str] = []
+        citations: list[Any] = []
+        async for chunk in raw_result:
+            # Streamed chunks are usually plain strings or dicts; only recurse
+            # (and pay for a coroutine) on nested streams.
+            handler = handlers.get(type(chunk))
+            if handler is not None:
+                chunk_text, chunk_refs = handler(chunk)
+            elif isinstance(chunk, AsyncIterable):
+                chunk_text, chunk_refs = await self._extract_text_and_citations(chunk)
+            else:
+                chunk_text, chunk_refs = self._extract_sync(chunk)
+            if chunk_text:
+                text_chunks.append(chunk_text)
+            if chunk_refs:
+                citations.extend(chunk_refs)
+        return "".join(text_chunks), citations
+
+    def _extract_sync(self, raw_result: Any) -> tuple[str, list[Any]]:
+        handler = self._result_handlers.get(type(raw_result))
+        if handler is not None:
+            return handler(raw_result)
+
         if isinstance(raw_result, str):
             return raw_result, []
 
         if isinstance(raw_result, dict):
             return self._parse_dict_result(raw_result)
 
-        if isinstance(raw_result, AsyncIterable):
-            text_chunks: list[str] = []
-            citations: list[Any] = []
-            async for chunk in raw_result:
-                chunk_text, chunk_refs = await self._extract_text_and_citations(chunk)
-                if chunk_text:
-                    text_chunks.append(chunk_text)
-                if chunk_refs:
-                    citations.extend(chunk_refs)
-            return "".join(text_chunks), citations
-
         response_attr = getattr(raw_result, "response", None)
         references_attr = getattr(raw_result, "references", None)
         if response_attr is not None or references_attr is not None:
@@ -225,9 +388,31 @@ class KnowledgeBaseClient:
         return [value]
 
 
+def _plain_text_result(value: str) -> tuple[str, list[Any]]:
+    return value, []
+
+
 _SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
 _WORD_RE = re.compile(r"[a-z0-9]+")
+_ENTITY_NAME_RE = re.compile(r"Entity Name:\s*(.+)")
 _MAX_SUMMARY_CHARS = 900
+_TEXT_CHUNKS_FILE = "kv_store_text_chunks.json"
+_INDEX_FORMAT = 4
+
+
+_INDEX_KEYS = frozenset({"entity_chunks", "text_chunks", "entity_summaries", "postings"})
+
+
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
 
 
 class _LocalKnowledgeBase:
@@ -235,33 +420,43 @@ class _LocalKnowledgeBase:
 
     def __init__(self, working_dir: Path) -> None:
         self.working_dir = working_dir
-        self._entity_chunks: dict[str, Any] = self._load_json("kv_store_entity_chunks.json")
-        self._text_chunks: dict[str, Any] = self._load_json("kv_store_text_chunks.json")
-        try:
-            llm_cache: dict[str, Any] = self._load_json("kv_store_llm_response_cache.json")
-        except KnowledgeBaseError:
-            llm_cache = {}
-
-        self._entity_summaries = self._build_entity_summaries(llm_cache)
-        self._normalized_entities = {name: _normalize(name) for name in self._entity_chunks}
+        state = self._load_index()
+        self._entity_chunks: dict[str, Any] = state["entity_chunks"]
+        self._text_chunks: dict[str, Any] = state["text_chunks"]
+        self._entity_summaries: dict[str, str] = state["entity_summaries"]
+        self._postings: dict[str, list[tuple[str, int]]] = state["postings"]
+
+        entity_token_lists = {name: _tokens(name) for name in self._entity_chunks}
+        self._normalized_entities = {name: " ".join(tokens) for name, tokens in entity_token_lists.items()}
+        self._entity_token_count = {name: len(tokens) for name, tokens in entity_token_lists.items()}
+        self._entity_order = {name: index for index, name in enumerate(self._normalized_entities)}
+        self._entity_postings: dict[str, list[str]] = defaultdict(list)
+        for name, tokens in entity_token_lists.items():
+            for token in frozenset(tokens):
+                self._entity_postings[token].append(name)
+        self._chunk_order = {chunk_id: index for index, chunk_id in enumerate(self._text_chunks)}
+        # Parsed chunk content, filled on first use.
+        self._parsed_chunks: dict[str, _ParsedChunk] = {}
 
         if not self._entity_chunks:
             raise KnowledgeBaseError("Knowledge base entity index is empty.")
 
     def query(self, question: str) -> KnowledgeBaseAnswer:
-        normalized_query = _normalize(question)
-        entity_name = self._match_entity(normalized_query)
+        token_list = _tokens(question)
+        normalized_query = " ".join(token_list)
+        query_tokens = frozenset(token_list)
+        entity_name = self._match_entity(normalized_query, query_tokens)
 
         if entity_name:
             summary = self._entity_summaries.get(entity_name)
             if not summary:
-                summary = self._summarize_entity(entity_name, normalized_query)
+                summary = self._summarize_entity(entity_name, query_tokens)
             citations = self._entity_citations(entity_name)
             summary = _trim_summary(summary)
             if summary:
                 return KnowledgeBaseAnswer(text=summary, citations=citations)
 
-        fallback_summary, fallback_citations = self._search_chunks(normalized_query)
+        fallback_summary, fallback_citations = self._search_chunks(query_tokens)
         fallback_summary = _trim_summary(fallback_summary)
         if fallback_summary:
             return KnowledgeBaseAnswer(text=fallback_summary, citations=fallback_citations)
@@ -272,55 +467,123 @@ class _LocalKnowledgeBase:
         path = self.working_dir / name
         if not path.exists():
             raise KnowledgeBaseError(f"Required knowledge base file missing: {path}")
+        if orjson is not None:
+            return orjson.loads(path.read_bytes())
         with path.open("r", encoding="utf-8") as handle:
             return json.load(handle)
 
-    def _match_entity(self, normalized_query: str) -> str | None:
+    def _build_index(self) -> dict[str, Any]:
+        # Overlap reading the three stores; the first two are required.
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            entity_future = pool.submit(self._load_json, "kv_store_entity_chunks.json")
+            text_future = pool.submit(self._load_json, _TEXT_CHUNKS_FILE)
+            cache_future = pool.submit(self._load_json, "kv_store_llm_response_cache.json")
+            entity_chunks: dict[str, Any] = entity_future.result()
+            text_chunks: dict[str, Any] = text_future.result()
+            try:
+                llm_cache: dict[str, Any] = cache_future.result()
+            except KnowledgeBaseError:
+                llm_cache = {}
+        postings = _build_inverted_index(text_chunks)
+        return {
+            "entity_chunks": entity_chunks,
+            "text_chunks": text_chunks,
+            "entity_summaries": self._build_entity_summaries(llm_cache),
+            "postings": postings,
+        }
+
+    def _index_stamp(self) -> bytes | None:
+        try:
+            sources = sorted(self.working_dir.glob("kv_store_*.json"))
+            parts = [f"{_INDEX_FORMAT}"]
+            for path in sources:
+                stat = path.stat()
+                parts.append(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            return None
+        return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).digest()
+
+    def _index_cache_path(self) -> Path:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        pack_key = hashlib.blake2b(
+            str(self.working_dir.resolve()).encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return Path(base) / "solcoder" / "kb_index" / f"{pack_key}.json"
+
+    def _load_index(self) -> dict[str, Any]:
+        """Load the parsed pack and its search index, reusing the copy from a previous run.
+
+        The copy is plain JSON in the user cache dir (never inside the pack), keyed
+        by the pack path and stamped with the stores' names, mtimes and sizes; any
+        change, or an unreadable file, triggers a rebuild.
+        """
+        stamp = self._index_stamp()
+        if stamp is None:
+            return self._build_index()
+        cache_path = self._index_cache_path()
+        try:
+            cached = _json_loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            cached = None
+        if isinstance(cached, dict) and cached.get("stamp") == stamp.hex():
+            state = cached.get("state")
+            if isinstance(state, dict) and _INDEX_KEYS <= state.keys():
+                return state
+        state = self._build_index()
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(_json_dumps({"stamp": stamp.hex(), "state": state}))
+            tmp_path.replace(cache_path)
+        except OSError:
+            logger.debug("Could not persist knowledge base index to %s", cache_path)
+        return state
+
+    def _match_entity(self, normalized_query: str, query_tokens: frozenset[str]) -> str | None:
         if not normalized_query:
             return None
 
-        query_tokens = set(normalized_query.split())
-        best_entity: str | None = None
-        best_score = 0.0
+        # Whole-name matches score by name length; this still needs every entity
+        # since a name can sit inside a longer query word.
+        scores: dict[str, float] = {}
         for name, normalized_name in self._normalized_entities.items():
-            if not normalized_name:
-                continue
-            score = 0.0
-            if normalized_name in normalized_query:
-                score = float(len(normalized_name.split()))
-            else:
-                name_tokens = set(normalized_name.split())
-                overlap = query_tokens & name_tokens
-                if overlap:
-                    score = len(overlap) / max(len(name_tokens), 1)
-            if score > best_score:
-                best_score = score
-                best_entity = name
-
-        if best_entity is None:
-            return None
-        if best_score == 0.0:
+            if normalized_name and normalized_query.find(normalized_name) != -1:
+                scores[name] = float(self._entity_token_count[name])
+
+        # Partial matches only need entities sharing at least one query token;
+        # counting posting hits gives the overlap without intersecting sets.
+        overlaps: dict[str, int] = defaultdict(int)
+        for token in query_tokens:
+            for name in self._entity_postings.get(token, ()):
+                overlaps[name] += 1
+        for name, overlap in overlaps.items():
+            if name not in scores:
+                scores[name] = overlap / max(self._entity_token_count[name], 1)
+
+        if not scores:
             return None
-        return best_entity
+        # Ties go to the entity listed first, as with the old linear scan.
+        order = self._entity_order
+        return max(scores, key=lambda name: (scores[name], -order[name]))
 
-    def _summarize_entity(self, entity_name: str, normalized_query: str) -> str:
+    def _summarize_entity(self, entity_name: str, query_tokens: frozenset[str]) -> str:
         chunk_meta = self._entity_chunks.get(entity_name, {})
         chunk_ids = chunk_meta.get("chunk_ids", [])
         if not chunk_ids:
             return ""
 
-        query_tokens = set(normalized_query.split())
         sentences: list[str] = []
         for chunk_id in chunk_ids:
             chunk = self._text_chunks.get(chunk_id)
             if not chunk:
                 continue
-            cleaned = _clean_chunk_text(chunk.get("content", ""))
-            for sentence in _split_sentences(cleaned):
+            parsed = self._parsed_chunk(chunk_id, chunk)
+            if query_tokens and query_tokens.isdisjoint(parsed.tokens):
+                continue
+            for sentence, sentence_tokens in parsed.sentences:
                 if not sentence:
                     continue
-                sentence_tokens = set(_normalize(sentence).split())
-                if query_tokens and not (sentence_tokens & query_tokens):
+                if query_tokens and query_tokens.isdisjoint(sentence_tokens):
                     continue
                 sentences.append(sentence.strip())
                 if len(sentences) >= 4:
@@ -338,7 +601,7 @@ class _LocalKnowledgeBase:
             chunk = self._text_chunks.get(chunk_id)
             if not chunk:
                 continue
-            source = _extract_source_line(chunk.get("content", ""))
+            source = self._parsed_chunk(chunk_id, chunk).source
             if not source or source in seen_sources:
                 continue
             citations.append(_make_citation(source))
@@ -347,27 +610,29 @@ class _LocalKnowledgeBase:
                 break
         return citations
 
-    def _search_chunks(self, normalized_query: str) -> tuple[str, list[dict[str, str]]]:
-        query_tokens = set(normalized_query.split())
+    def _search_chunks(self, query_tokens: frozenset[str]) -> tuple[str, list[dict[str, str]]]:
         if not query_tokens:
             return "", []
 
-        scored: list[tuple[float, str]] = []
-        for chunk_id, chunk in self._text_chunks.items():
-            text = chunk.get("content", "")
-            tokens = _tokenize(text)
-            if not tokens:
-                continue
-            counts = Counter(tokens)
-            score = float(sum(counts[token] for token in query_tokens if token in counts))
-            if score == 0.0:
-                continue
-            scored.append((score, chunk_id))
+        scores: dict[str, float] = defaultdict(float)
+        for token in query_tokens:
+            for chunk_id, count in self._postings.get(token, ()):
+                scores[chunk_id] += count
 
-        if not scored:
+        if not scores:
             return "", []
 
-        top_matches = nlargest(3, scored, key=lambda item: item[0])
+        # Keep the best three in a min-heap; ties go to the chunk stored first.
+        order = self._chunk_order
+        top: list[tuple[float, int, str]] = []
+        for chunk_id, score in scores.items():
+            entry = (score, -order[chunk_id], chunk_id)
+            if len(top) < 3:
+                heappush(top, entry)
+            elif entry > top[0]:
+                heapreplace(top, entry)
+        top.sort(reverse=True)
+        top_matches = [(score, chunk_id) for score, _rank, chunk_id in top]
         snippets: list[str] = []
         citations: list[dict[str, str]] = []
         seen_sources: set[str] = set()
@@ -376,10 +641,9 @@ class _LocalKnowledgeBase:
             chunk = self._text_chunks.get(chunk_id)
             if not chunk:
                 continue
-            content = chunk.get("content", "")
-            cleaned = _clean_chunk_text(content)
-            snippets.append(_summarize_chunk_text(cleaned, query_tokens))
-            source = _extract_source_line(content)
+            parsed = self._parsed_chunk(chunk_id, chunk)
+            snippets.append(_summarize_chunk_text(parsed, query_tokens))
+            source = parsed.source
             if source and source not in seen_sources:
                 citations.append(_make_citation(source))
                 seen_sources.add(source)
@@ -388,6 +652,13 @@ class _LocalKnowledgeBase:
 
         return " ".join(snippet for snippet in snippets if snippet), citations
 
+    def _parsed_chunk(self, chunk_id: str, chunk: dict[str, Any]) -> _ParsedChunk:
+        parsed = self._parsed_chunks.get(chunk_id)
+        if parsed is None:
+            parsed = _parse_chunk_content(chunk.get("content", ""))
+            self._parsed_chunks[chunk_id] = parsed
+        return parsed
+
     def _build_entity_summaries(self, cache: dict[str, Any]) -> dict[str, str]:
         summaries: dict[str, str] = {}
         for entry in cache.values():
@@ -398,24 +669,29 @@ class _LocalKnowledgeBase:
             summary = (entry.get("return") or "").strip()
             if not summary:
                 continue
-            prompt = entry.get("original_prompt", "")
-            entity_name = _extract_entity_name(prompt)
-            if not entity_name:
-                continue
             cleaned = summary.replace("<|COMPLETE|>", "").strip()
             if cleaned.startswith("entity<|#|>"):
                 # Skip extraction fragments
                 continue
+            entity_name = _extract_entity_name(entry.get("original_prompt", ""))
+            if not entity_name:
+                continue
             summaries.setdefault(entity_name, cleaned)
         return summaries
 
 
-def _normalize(text: str) -> str:
-    return " ".join(_WORD_RE.findall(text.lower()))
+def _build_inverted_index(text_chunks: dict[str, Any]) -> dict[str, list[tuple[str, int]]]:
+    """Map each token to the chunks containing it, with its term frequency."""
+    postings: dict[str, list[tuple[str, int]]] = defaultdict(list)
+    for chunk_id, chunk in text_chunks.items():
+        for token, count in Counter(_tokens(chunk.get("content", ""))).items():
+            postings[token].append((chunk_id, count))
+    return dict(postings)
 
 
-def _tokenize(text: str) -> list[str]:
-    return _WORD_RE.findall(text.lower())
+def _tokens(text: str) -> list[str]:
+    # Interned so the many set lookups against query tokens compare by identity.
+    return [sys.intern(token) for token in _WORD_RE.findall(text.lower())]
 
 
 def _split_sentences(text: str) -> list[str]:
@@ -424,25 +700,34 @@ def _split_sentences(text: str) -> list[str]:
     return _SENTENCE_SPLIT_RE.split(text)
 
 
-def _clean_chunk_text(text: str) -> str:
+@dataclass(slots=True)
+class _ParsedChunk:
+    """Everything the summarizers need from a chunk, derived once."""
+
+    text: str
+    source: str | None
+    sentences: list[tuple[str, frozenset[str]]]
+    tokens: frozenset[str]
+
+
+def _parse_chunk_content(text: str) -> _ParsedChunk:
+    """Strip headings, pick out the `# Source:` path, and split and tokenize the rest."""
     lines = []
+    source: str | None = None
     for line in text.splitlines():
+        if source is None and line.startswith("# Source:"):
+            source = line.split(":", 1)[1].strip()
         stripped = line.strip()
-        if not stripped:
-            continue
-        if stripped.startswith("# Source:"):
-            continue
-        if stripped.startswith("# "):
+        if not stripped or stripped.startswith("# "):
             continue
         lines.append(stripped)
-    return " ".join(lines)
-
-
-def _extract_source_line(text: str) -> str | None:
-    for line in text.splitlines():
-        if line.startswith("# Source:"):
-            return line.split(":", 1)[1].strip()
-    return None
+    cleaned = " ".join(lines)
+    return _ParsedChunk(
+        text=cleaned,
+        source=source,
+        sentences=[(sentence, frozenset(_tokens(sentence))) for sentence in _split_sentences(cleaned)],
+        tokens=frozenset(_tokens(cleaned)),
+    )
 
 
 def _make_citation(source: str) -> dict[str, str]:
@@ -450,25 +735,28 @@ def _make_citation(source: str) -> dict[str, str]:
     return {"title": title, "path": source}
 
 
-def _summarize_chunk_text(text: str, query_tokens: set[str]) -> str:
-    sentences = _split_sentences(text)
+def _summarize_chunk_text(parsed: _ParsedChunk, query_tokens: frozenset[str]) -> str:
+    sentences = parsed.sentences
+    if query_tokens and query_tokens.isdisjoint(parsed.tokens):
+        return sentences[0][0].strip() if sentences else ""
     selections: list[str] = []
-    for sentence in sentences:
+    for sentence, sentence_tokens in sentences:
         if not sentence:
             continue
-        tokens = set(_normalize(sentence).split())
-        if query_tokens and not (tokens & query_tokens):
+        if query_tokens and query_tokens.isdisjoint(sentence_tokens):
             continue
         selections.append(sentence.strip())
         if len(" ".join(selections)) > 400:
             break
     if not selections and sentences:
-        selections.append(sentences[0].strip())
+        selections.append(sentences[0][0].strip())
     return " ".join(selections)
 
 
 def _extract_entity_name(prompt: str) -> str | None:
-    match = re.search(r"Entity Name:\s*(.+)", prompt)
+    if "Entity Name:" not in prompt:
+        return None
+    match = _ENTITY_NAME_RE.search(prompt)
     if match:
         name = match.group(1).strip()
         return name if name else None
@@ -0,0 +1,191 @@
+"""Asynchronous LLM client for running several streams concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+
+import httpx
+
+from .errors import LLMError
+from .offline import offline_response
+from .transport import (
+    StreamState,
+    aiter_stream_lines,
+    build_endpoint,
+    build_headers,
+    encode_payload,
+    error_detail,
+    feed_stream_line,
+    http_client_options,
+    normalize_messages,
+    retry_after_seconds,
+    retry_delay,
+)
+from .types import ChunkCallback, LLMResponse, LLMSettings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Attempt:
+    """State of the request attempt currently being streamed."""
+
+    state: StreamState = field(default_factory=StreamState)
+    started_at: float = 0.0
+
+
+class AsyncLLMClient:
+    """Async counterpart of :class:`LLMClient` built on ``httpx.AsyncClient``.
+
+    Streams from one instance share a connection pool, so several prompts can
+    be awaited concurrently (e.g. with ``asyncio.gather``).
+    """
+
+    def __init__(
+        self,
+        settings: LLMSettings,
+        *,
+        client: httpx.AsyncClient | None = None,
+        sleep: Callable[[float], Awaitable[None]] | None = None,
+    ) -> None:
+        self._settings = settings
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(**http_client_options(settings))
+        self._sleep = sleep or asyncio.sleep
+
+    async def __aenter__(self) -> AsyncLLMClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def stream_chat(
+        self,
+        prompt: str,
+        *,
+        system_prompt: str | None = None,
+        history: Sequence[dict[str, str]] | None = None,
+        on_chunk: ChunkCallback | None = None,
+    ) -> LLMResponse:
+        """Send a prompt and stream the response back."""
+
+        if self._offline():
+            logger.info("LLM offline mode active; returning stub response.")
+            content = offline_response(prompt, system_prompt)
+            if on_chunk:
+                on_chunk(content)
+            return LLMResponse(text=content, latency_seconds=0.0, cached=True)
+
+        attempt = _Attempt()
+        async for chunk_text in self._stream(prompt, system_prompt, history, attempt):
+            if on_chunk:
+                on_chunk(chunk_text)
+        latency = time.perf_counter() - attempt.started_at
+        text, finish_reason, usage = attempt.state.result()
+        logger.debug(
+            "LLM call successful (model=%s, latency=%.2fs, usage=%s)",
+            self._settings.model,
+            latency,
+            usage,
+        )
+        return LLMResponse(
+            text=text,
+            latency_seconds=latency,
+            finish_reason=finish_reason,
+            token_usage=usage,
+        )
+
+    async def stream_tokens(
+        self,
+        prompt: str,
+        *,
+        system_prompt: str | None = None,
+        history: Sequence[dict[str, str]] | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as they arrive."""
+
+        if self._offline():
+            yield offline_response(prompt, system_prompt)
+            return
+        async for chunk_text in self._stream(prompt, system_prompt, history, _Attempt()):
+            yield chunk_text
+
+    def _offline(self) -> bool:
+        return self._settings.offline_mode or not self._settings.api_key
+
+    async def _stream(
+        self,
+        prompt: str,
+        system_prompt: str | None,
+        history: Sequence[dict[str, str]] | None,
+        attempt: _Attempt,
+    ) -> AsyncIterator[str]:
+        messages = normalize_messages(prompt, system_prompt, history)
+        url = build_endpoint(self._settings)
+        headers = build_headers(self._settings)
+        body = encode_payload(self._settings, messages)
+
+        retries = 0
+        last_error: Exception | None = None
+
+        while retries <= self._settings.max_retries:
+            attempt.state = StreamState()
+            attempt.started_at = time.perf_counter()
+            try:
+                async with self._client.stream("POST", url, headers=headers, content=body) as response:
+                    response.raise_for_status()
+                    async for line in aiter_stream_lines(response.aiter_bytes()):
+                        chunk_text = feed_stream_line(attempt.state, line)
+                        if chunk_text:
+                            yield chunk_text
+                return
+            except (httpx.TimeoutException, httpx.NetworkError) as exc:  # noqa: PERF203
+                if attempt.state.has_text:
+                    # Chunks already reached the caller; a retry would repeat them.
+                    raise LLMError(f"LLM stream interrupted: {exc}") from exc
+                last_error = exc
+                retries += 1
+                if retries > self._settings.max_retries:
+                    break
+                sleep_for = retry_delay(self._settings, retries)
+                logger.warning("LLM request failed (%s); retrying in %.1fs", type(exc).__name__, sleep_for)
+                await self._sleep(sleep_for)
+                continue
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if status in self._settings.retry_statuses and retries < self._settings.max_retries:
+                    last_error = exc
+                    retries += 1
+                    sleep_for = retry_delay(self._settings, retries, retry_after_seconds(exc.response))
+                    logger.warning("LLM request returned %s; retrying in %.1fs", status, sleep_for)
+                    await self._sleep(sleep_for)
+                    continue
+                logger.error("LLM request failed with status %s: %s", status, exc)
+                raw = b""
+                try:
+                    raw = await exc.response.aread()
+                except Exception as read_exc:  # noqa: BLE001
+                    logger.debug("Unable to read error payload: %s", read_exc)
+                detail = error_detail(raw, exc.response.reason_phrase)
+                raise LLMError(f"LLM request failed: {detail}") from exc
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Unexpected LLM error: %s", exc)
+                raise LLMError(f"Unexpected LLM error: {exc}") from exc
+
+        message = f"LLM request failed after {self._settings.max_retries + 1} attempts"
+        if last_error:
+            message = f"{message}: {last_error}"
+        raise LLMError(message)
+
+    async def aclose(self) -> None:
+        """Dispose the underlying HTTP client if owned by this instance."""
+
+        if self._owns_client:
+            await self._client.aclose()
+
+
+__all__ = ["AsyncLLMClient"]
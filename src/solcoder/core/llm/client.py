@@ -2,21 +2,26 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import time
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Generator, Sequence
 
 import httpx
 
 from .errors import LLMError
 from .offline import offline_response
 from .transport import (
+    StreamState,
     build_endpoint,
     build_headers,
-    build_payload,
-    consume_stream,
+    encode_payload,
+    error_detail,
+    feed_stream_line,
+    http_client_options,
+    iter_stream_lines,
     normalize_messages,
+    retry_after_seconds,
+    retry_delay,
 )
 from .types import ChunkCallback, LLMResponse, LLMSettings
 
@@ -35,9 +40,15 @@ class LLMClient:
     ) -> None:
         self._settings = settings
         self._owns_client = client is None
-        self._client = client or httpx.Client(timeout=settings.timeout_seconds)
+        self._client = client or httpx.Client(**http_client_options(settings))
         self._sleep = sleep or time.sleep
 
+    def __enter__(self) -> LLMClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
     def stream_chat(
         self,
         prompt: str,
@@ -48,28 +59,56 @@ class LLMClient:
     ) -> LLMResponse:
         """Send a prompt and stream the response back."""
 
+        stream = self.stream_chat_iter(prompt, system_prompt=system_prompt, history=history)
+        try:
+            while True:
+                try:
+                    chunk_text = next(stream)
+                except StopIteration as stop:
+                    return stop.value
+                if on_chunk:
+                    on_chunk(chunk_text)
+        finally:
+            stream.close()
+
+    def stream_chat_iter(
+        self,
+        prompt: str,
+        *,
+        system_prompt: str | None = None,
+        history: Sequence[dict[str, str]] | None = None,
+    ) -> Generator[str, None, LLMResponse]:
+        """Yield response text chunks as they arrive.
+
+        The final :class:`LLMResponse` is the generator's return value
+        (``StopIteration.value``, or the result of ``yield from``).
+        """
+
         if self._settings.offline_mode or not self._settings.api_key:
             logger.info("LLM offline mode active; returning stub response.")
             content = offline_response(prompt, system_prompt)
-            if on_chunk:
-                on_chunk(content)
+            yield content
             return LLMResponse(text=content, latency_seconds=0.0, cached=True)
 
         messages = normalize_messages(prompt, system_prompt, history)
         url = build_endpoint(self._settings)
         headers = build_headers(self._settings)
-        payload = build_payload(self._settings, messages)
+        body = encode_payload(self._settings, messages)
 
         attempt = 0
-        backoff = 1.5
         last_error: Exception | None = None
 
         while attempt <= self._settings.max_retries:
             start_time = time.perf_counter()
+            state = StreamState()
             try:
-                with self._client.stream("POST", url, headers=headers, json=payload) as response:
+                with self._client.stream("POST", url, headers=headers, content=body) as response:
                     response.raise_for_status()
-                    text, finish_reason, usage = consume_stream(response.iter_lines(), on_chunk)
+                    for line in iter_stream_lines(response.iter_bytes()):
+                        chunk_text = feed_stream_line(state, line)
+                        if chunk_text:
+                            yield chunk_text
+                text, finish_reason, usage = state.result()
                 latency = time.perf_counter() - start_time
                 logger.debug(
                     "LLM call successful (model=%s, latency=%.2fs, usage=%s)",
@@ -84,28 +123,33 @@ class LLMClient:
                     token_usage=usage,
                 )
             except (httpx.TimeoutException, httpx.NetworkError) as exc:  # noqa: PERF203
+                if state.has_text:
+                    # Chunks already reached the caller; a retry would repeat them.
+                    raise LLMError(f"LLM stream interrupted: {exc}") from exc
                 last_error = exc
                 attempt += 1
                 if attempt > self._settings.max_retries:
                     break
-                sleep_for = backoff ** attempt
+                sleep_for = retry_delay(self._settings, attempt)
                 logger.warning("LLM request failed (%s); retrying in %.1fs", type(exc).__name__, sleep_for)
                 self._sleep(sleep_for)
                 continue
             except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if status in self._settings.retry_statuses and attempt < self._settings.max_retries:
+                    last_error = exc
+                    attempt += 1
+                    sleep_for = retry_delay(self._settings, attempt, retry_after_seconds(exc.response))
+                    logger.warning("LLM request returned %s; retrying in %.1fs", status, sleep_for)
+                    self._sleep(sleep_for)
+                    continue
                 logger.error("LLM request failed with status %s: %s", exc.response.status_code, exc)
-                detail: str | dict[str, object] | None = None
+                raw = b""
                 try:
                     raw = exc.response.read()
-                    if raw:
-                        try:
-                            detail = json.loads(raw.decode("utf-8", errors="replace"))
-                        except json.JSONDecodeError:
-                            detail = raw.decode("utf-8", errors="replace")
                 except Exception as read_exc:  # noqa: BLE001
                     logger.debug("Unable to read error payload: %s", read_exc)
-                if detail is None:
-                    detail = exc.response.reason_phrase
+                detail = error_detail(raw, exc.response.reason_phrase)
                 raise LLMError(f"LLM request failed: {detail}") from exc
             except Exception as exc:  # noqa: BLE001
                 logger.exception("Unexpected LLM error: %s", exc)
@@ -2,35 +2,109 @@
 
 from __future__ import annotations
 
+import functools
+import importlib.util
 import json
 import logging
-from collections.abc import Iterable, Sequence
+import random
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import httpx
 
 from .errors import LLMError
-from .types import ChunkCallback, LLMSettings
+from .types import LLMSettings
+
+try:  # pragma: no cover - optional speedup for decoding streamed events
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause
+# covers both decoders.
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _dumps(value: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _add_responses_options(
+    payload: dict[str, object], reasoning_effort: str, max_output_tokens: int
+) -> None:
+    if reasoning_effort:
+        payload["reasoning"] = {"effort": reasoning_effort}
+
+
+def _add_anthropic_options(
+    payload: dict[str, object], reasoning_effort: str, max_output_tokens: int
+) -> None:
+    payload["max_tokens"] = max(max_output_tokens, 1)
+
+
+def _add_no_options(
+    payload: dict[str, object], reasoning_effort: str, max_output_tokens: int
+) -> None:
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class _ProviderStrategy:
+    endpoint_path: str
+    anthropic_headers: bool
+    messages_key: str
+    add_options: Callable[[dict[str, object], str, int], None]
+
+
+_OPENAI_STRATEGY = _ProviderStrategy("/responses", False, "input", _add_responses_options)
+_ANTHROPIC_STRATEGY = _ProviderStrategy("/messages", True, "messages", _add_anthropic_options)
+_CHAT_STRATEGY = _ProviderStrategy("/chat/completions", False, "messages", _add_no_options)
+
+
+@functools.lru_cache(maxsize=16)
+def _provider_strategy(provider: str) -> _ProviderStrategy:
+    # Keyed by the raw provider string, so settings mutated at runtime still
+    # resolve correctly while repeat calls skip the lowercasing and set checks.
+    normalized = provider.lower()
+    if normalized in {"openai", "gpt"}:
+        return _OPENAI_STRATEGY
+    if normalized in {"anthropic", "claude"}:
+        return _ANTHROPIC_STRATEGY
+    return _CHAT_STRATEGY
+
+
+@functools.lru_cache(maxsize=16)
+def _header_items(provider: str, api_key: str | None) -> tuple[tuple[str, str], ...]:
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    if _provider_strategy(provider).anthropic_headers:
+        headers["x-api-key"] = api_key or ""
+        headers["anthropic-version"] = "2023-06-01"
+    return tuple(headers.items())
+
 
 def build_endpoint(settings: LLMSettings) -> str:
-    provider = settings.provider.lower()
     base = settings.base_url.rstrip("/")
-    if provider in {"openai", "gpt"}:
-        return f"{base}/responses"
-    if provider in {"anthropic", "claude"}:
-        return f"{base}/messages"
-    return f"{base}/chat/completions"
+    return f"{base}{_provider_strategy(settings.provider).endpoint_path}"
 
 
 def build_headers(settings: LLMSettings) -> dict[str, str]:
-    headers = {"Content-Type": "application/json"}
-    if settings.api_key:
-        headers["Authorization"] = f"Bearer {settings.api_key}"
-    provider = settings.provider.lower()
-    if provider in {"anthropic", "claude"}:
-        headers["x-api-key"] = settings.api_key or ""
-        headers["anthropic-version"] = "2023-06-01"
-    return headers
+    return dict(_header_items(settings.provider, settings.api_key))
 
 
 def normalize_messages(
@@ -52,103 +126,155 @@ def normalize_messages(
     return conversation
 
 
-def build_payload(settings: LLMSettings, messages: list[dict[str, str]]) -> dict[str, object]:
-    provider = settings.provider.lower()
+def _static_payload(
+    strategy: _ProviderStrategy, model: str, reasoning_effort: str, max_output_tokens: int
+) -> dict[str, object]:
     payload: dict[str, object] = {
-        "model": settings.model,
+        "model": model,
         "stream": True,
     }
-    if provider in {"openai", "gpt"}:
-        payload["input"] = messages
-        if settings.reasoning_effort:
-            payload["reasoning"] = {"effort": settings.reasoning_effort}
-    else:
-        payload["messages"] = messages
-        if provider in {"anthropic", "claude"}:
-            payload["max_tokens"] = max(settings.max_output_tokens, 1)
+    strategy.add_options(payload, reasoning_effort, max_output_tokens)
     return payload
 
 
-def consume_stream(
-    lines: Iterable[str],
-    on_chunk: ChunkCallback | None,
-) -> tuple[str, str | None, dict[str, int] | None]:
-    text_parts: list[str] = []
+@functools.lru_cache(maxsize=16)
+def _payload_prefix(
+    provider: str, model: str, reasoning_effort: str, max_output_tokens: int
+) -> bytes:
+    # Everything but the messages is fixed for a given configuration, so it is
+    # serialized once and the body is completed with the messages array.
+    strategy = _provider_strategy(provider)
+    static = _dumps(_static_payload(strategy, model, reasoning_effort, max_output_tokens))
+    return static[:-1] + b"," + _dumps(strategy.messages_key) + b":"
+
+
+def encode_payload(settings: LLMSettings, messages: list[dict[str, str]]) -> bytes:
+    """Serialize the request body for ``messages`` as JSON bytes."""
+
+    prefix = _payload_prefix(
+        settings.provider, settings.model, settings.reasoning_effort, settings.max_output_tokens
+    )
+    return prefix + _dumps(messages) + b"}"
+
+
+def _take_lines(buffer: bytearray) -> list[bytes]:
+    """Remove and return every complete line held in ``buffer``."""
+
+    lines: list[bytes] = []
+    start = 0
+    while (end := buffer.find(b"\n", start)) >= 0:
+        lines.append(bytes(buffer[start:end]))
+        start = end + 1
+    if start:
+        del buffer[:start]
+    return lines
+
+
+def iter_stream_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split raw response bytes into lines without decoding them to text."""
+
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        yield from _take_lines(buffer)
+    if buffer:
+        yield bytes(buffer)
+
+
+async def aiter_stream_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Async counterpart of :func:`iter_stream_lines`."""
+
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        for line in _take_lines(buffer):
+            yield line
+    if buffer:
+        yield bytes(buffer)
+
+
+def feed_stream_line(state: StreamState, raw_line: bytes | str) -> str:
+    """Parse one streamed line into ``state`` and return any new response text."""
+
+    if not raw_line:
+        return ""
+    if isinstance(raw_line, str):
+        raw_line = raw_line.encode("utf-8")
+    if raw_line.startswith(b"data:"):
+        payload = raw_line[5:].strip()
+    else:
+        payload = raw_line.strip()
+    if not payload or payload == b"[DONE]":
+        return ""
+    try:
+        parsed = _loads(payload)
+    except json.JSONDecodeError:
+        logger.debug("Skipping non-JSON LLM payload: %s", payload)
+        return ""
+    event_type = parsed.get("type") if isinstance(parsed, dict) else None
+    if event_type:
+        # Unknown event types (including every "*.delta") carry their text
+        # in "delta", so that handler doubles as the fallback.
+        chunk_text = _EVENT_HANDLERS.get(event_type, _on_delta)(parsed, state)
+    else:
+        chunk_text, state.finish_reason = _extract_chunk(parsed, state.finish_reason)
+    if chunk_text:
+        state.parts.append(chunk_text)
+        state.has_text = True
+    return chunk_text
+
+
+@dataclass(slots=True)
+class StreamState:
+    """Accumulated text and metadata for one streamed response."""
+
+    parts: list[str] = field(default_factory=list)
     finish_reason: str | None = None
     usage: dict[str, int] | None = None
-    for raw_line in lines:
-        if not raw_line:
-            continue
-        if raw_line.startswith("data:"):
-            payload = raw_line.partition("data:")[2].strip()
-        else:
-            payload = raw_line.strip()
-        if not payload or payload == "[DONE]":
-            continue
-        try:
-            parsed = json.loads(payload)
-        except json.JSONDecodeError:
-            logger.debug("Skipping non-JSON LLM payload: %s", payload)
-            continue
-        chunk_text, finish_reason, usage, handled = _handle_response_event(
-            parsed,
-            finish_reason,
-            usage,
-            bool(text_parts),
-        )
-        if not handled:
-            chunk_text, finish_reason = _extract_chunk(parsed, finish_reason)
-        if chunk_text:
-            text_parts.append(chunk_text)
-            if on_chunk:
-                on_chunk(chunk_text)
-    return "".join(text_parts), finish_reason, usage
-
-
-def _handle_response_event(
-    payload: dict[str, object],
-    finish_reason: str | None,
-    usage: dict[str, int] | None,
-    has_existing_text: bool,
-) -> tuple[str, str | None, dict[str, int] | None, bool]:
-    event_type = str(payload.get("type", "")) if isinstance(payload, dict) else ""
-    if not event_type:
-        return "", finish_reason, usage, False
-
-    if event_type == "response.error":
-        error = payload.get("error")
-        if isinstance(error, dict):
-            message = error.get("message") or json.dumps(error)
-        else:
-            message = str(error or "Unknown LLM error")
-        raise LLMError(message)
-
-    chunk_text = ""
-    if event_type.endswith(".delta"):
-        delta = payload.get("delta")
-        if isinstance(delta, str):
-            chunk_text = delta
-    elif event_type == "response.output_text":
-        text = payload.get("text")
-        if isinstance(text, str):
-            chunk_text = text
-    elif event_type == "response.completed":
-        response_block = payload.get("response")
-        if isinstance(response_block, dict):
-            finish_reason = response_block.get("status") or finish_reason or "completed"
-            usage_payload = response_block.get("usage")
-            parsed_usage = _parse_usage(usage_payload)
-            if parsed_usage:
-                usage = parsed_usage
-            final_text = response_block.get("output_text")
-            if isinstance(final_text, str) and final_text and not has_existing_text:
-                chunk_text = final_text
+    has_text: bool = False
+
+    def result(self) -> tuple[str, str | None, dict[str, int] | None]:
+        return "".join(self.parts), self.finish_reason, self.usage
+
+
+def _on_error(payload: dict[str, object], state: StreamState) -> str:
+    error = payload.get("error")
+    if isinstance(error, dict):
+        message = error.get("message") or json.dumps(error)
     else:
-        delta = payload.get("delta")
-        if isinstance(delta, str):
-            chunk_text = delta
+        message = str(error or "Unknown LLM error")
+    raise LLMError(message)
+
+
+def _on_delta(payload: dict[str, object], state: StreamState) -> str:
+    delta = payload.get("delta")
+    return delta if isinstance(delta, str) else ""
+
+
+def _on_output_text(payload: dict[str, object], state: StreamState) -> str:
+    text = payload.get("text")
+    return text if isinstance(text, str) else ""
 
-    return chunk_text, finish_reason, usage, True
+
+def _on_completed(payload: dict[str, object], state: StreamState) -> str:
+    response_block = payload.get("response")
+    if not isinstance(response_block, dict):
+        return ""
+    state.finish_reason = response_block.get("status") or state.finish_reason or "completed"
+    parsed_usage = _parse_usage(response_block.get("usage"))
+    if parsed_usage:
+        state.usage = parsed_usage
+    final_text = response_block.get("output_text")
+    if isinstance(final_text, str) and final_text and not state.has_text:
+        return final_text
+    return ""
+
+
+_EVENT_HANDLERS: dict[str, Callable[[dict[str, object], StreamState], str]] = {
+    "response.error": _on_error,
+    "response.output_text": _on_output_text,
+    "response.completed": _on_completed,
+}
 
 
 def _extract_chunk(payload: dict[str, object], finish_reason: str | None) -> tuple[str, str | None]:
@@ -185,10 +311,72 @@ def _parse_usage(usage_payload: object) -> dict[str, int] | None:
     return usage or None
 
 
+def http_client_options(settings: LLMSettings) -> dict[str, Any]:
+    """Pooling and timeout options shared by the sync and async HTTP clients."""
+
+    return {
+        # HTTP/2 needs the optional ``h2`` package (``httpx[http2]``).
+        "http2": importlib.util.find_spec("h2") is not None,
+        "timeout": httpx.Timeout(settings.timeout_seconds, connect=settings.connect_timeout_seconds),
+        "limits": httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry_seconds,
+        ),
+    }
+
+
+def retry_delay(settings: LLMSettings, attempt: int, retry_after: float | None = None) -> float:
+    """Return the capped, jittered wait before retry number ``attempt``."""
+
+    if retry_after is not None:
+        return min(settings.retry_cap_seconds, retry_after)
+    delay = min(settings.retry_cap_seconds, settings.retry_base_seconds * 2 ** attempt)
+    return delay * (1 + random.random() * settings.retry_jitter)  # noqa: S311
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a ``Retry-After`` header given as delta-seconds or an HTTP date."""
+
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def error_detail(raw: bytes, fallback: str) -> str | dict[str, object]:
+    """Best-effort description of an error response body."""
+
+    if not raw:
+        return fallback
+    text = raw.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
 __all__ = [
     "build_endpoint",
     "build_headers",
     "normalize_messages",
-    "build_payload",
-    "consume_stream",
+    "encode_payload",
+    "iter_stream_lines",
+    "aiter_stream_lines",
+    "feed_stream_line",
+    "StreamState",
+    "http_client_options",
+    "retry_delay",
+    "retry_after_seconds",
+    "error_detail",
 ]
@@ -21,6 +21,14 @@ class LLMSettings:
     offline_mode: bool = False
     reasoning_effort: str = "medium"
     max_output_tokens: int = 1024
+    connect_timeout_seconds: float = 5.0
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry_seconds: float = 60.0
+    retry_base_seconds: float = 1.0
+    retry_cap_seconds: float = 30.0
+    retry_jitter: float = 0.5
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
 
 
 @dataclass(slots=True)
@@ -63,6 +63,8 @@ class TodoManager:
         self.revision = 0
         self._acknowledged = False
         self._last_revision_mismatch = False
+        self._next_open: TodoItem | None = None
+        self._next_open_stale = True
 
     # ------------------------------------------------------------------
     # CRUD operations
@@ -302,6 +304,7 @@ class TodoManager:
     def _touch(self) -> None:
         self.revision += 1
         self._acknowledged = False
+        self._next_open_stale = True
 
     def _check_revision(self, expected_revision: int | None) -> bool:
         mismatch = False
@@ -328,7 +331,16 @@ class TodoManager:
         return self._acknowledged
 
     def has_unfinished_tasks(self) -> bool:
-        return any(task.status != "done" for task in self._tasks)
+        return self.next_open_task() is not None
+
+    def next_open_task(self) -> TodoItem | None:
+        """Return the first task that is not done, cached until the list changes."""
+        if self._next_open_stale:
+            self._next_open = next(
+                (task for task in self._tasks if task.status != "done"), None
+            )
+            self._next_open_stale = False
+        return self._next_open
 
     def unfinished_tasks(self) -> list[TodoItem]:
         return [task for task in self._tasks if task.status != "done"]
@@ -386,6 +398,7 @@ class TodoManager:
         self.revision = int(state.get("revision", len(tasks)))
         self._acknowledged = bool(state.get("acknowledged", False))
         self._last_revision_mismatch = False
+        self._next_open_stale = True
         ensure_active = not any(task.status == "in_progress" for task in tasks)
         self._normalize_active_state(ensure_active=ensure_active)
 
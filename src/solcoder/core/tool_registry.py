@@ -23,6 +23,8 @@ class ToolRegistry:
     def __init__(self, toolkits: list[Toolkit] | None = None) -> None:
         self._tools: dict[str, Tool] = {}
         self._toolkits: dict[str, Toolkit] = {}
+        # Bumped on every mutation so callers can cache derived views (manifest JSON).
+        self._revision = 0
         if toolkits:
             for toolkit in toolkits:
                 self.add_toolkit(toolkit)
@@ -70,14 +72,21 @@ class ToolRegistry:
             raise
 
         self._toolkits[toolkit.name] = toolkit
+        self._revision += 1
+
+    @property
+    def revision(self) -> int:
+        return self._revision
 
     def register(self, tool: Tool, *, overwrite: bool = False) -> None:
         if not overwrite and tool.name in self._tools:
             raise ToolAlreadyRegisteredError(f"Tool '{tool.name}' already registered")
         self._tools[tool.name] = tool
+        self._revision += 1
 
     def unregister(self, name: str) -> None:
-        self._tools.pop(name, None)
+        if self._tools.pop(name, None) is not None:
+            self._revision += 1
 
     def get(self, name: str) -> Tool:
         try:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import atexit
 from typing import Any
 
 from solcoder.core.knowledge_base import KnowledgeBaseClient, KnowledgeBaseError
@@ -15,6 +16,18 @@ def _get_client() -> KnowledgeBaseClient:
     return _KB_CLIENT
 
 
+def _close_client() -> None:
+    global _KB_CLIENT
+    client, _KB_CLIENT = _KB_CLIENT, None
+    if client is not None:
+        client.close()
+
+
+# The shared client outlives any single tool call; finalize LightRAG storages and
+# release its private loop and worker when the process exits.
+atexit.register(_close_client)
+
+
 def _knowledge_handler(payload: dict[str, Any]) -> ToolResult:
     query = (payload.get("query") or "").strip()
     if not query:
@@ -63,7 +63,8 @@ class SessionManager:
         return self._create_new(active_project=active_project)
 
     def save(self, context: SessionContext) -> None:
-        context.transcript = context.transcript[-TRANSCRIPT_LIMIT:]
+        # Trim in place so holders of the transcript list (ContextManager) stay in sync.
+        del context.transcript[:-TRANSCRIPT_LIMIT]
         context.metadata.updated_at = datetime.now(UTC)
         session_dir = self.root / context.metadata.session_id
         session_dir.mkdir(parents=True, exist_ok=True)
@@ -81,3 +81,22 @@ def test_kb_command_handles_errors(console: Console, session_bundle) -> None:
     setattr(app, "_knowledge_base_client", FailingClient())
     response = app.handle_line('/kb "status?"')
     assert any("missing knowledge pack" in message for _, message in response.messages)
+
+
+def test_kb_client_is_closed_on_shutdown(console: Console, session_bundle) -> None:
+    app = _build_app(console, session_bundle)
+
+    class ClosingClient:
+        def __init__(self) -> None:
+            self.closed = 0
+
+        def close(self) -> None:
+            self.closed += 1
+
+    client = ClosingClient()
+    setattr(app, "_knowledge_base_client", client)
+
+    app._close_knowledge_base()
+    app._close_knowledge_base()
+
+    assert client.closed == 1
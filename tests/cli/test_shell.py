@@ -1137,7 +1137,7 @@ def test_env_diag_command(
             remediation="Install Anchor.",
         ),
     ]
-    monkeypatch.setattr(env_commands, "collect_environment_diagnostics", lambda: fake_results)
+    monkeypatch.setattr(env_commands, "collect_environment_diagnostics", lambda **_: fake_results)
     app = CLIApp(
         console=console,
         session_manager=manager,
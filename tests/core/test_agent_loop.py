@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from rich.console import Console
+
+from solcoder.core import agent_loop
+from solcoder.core.agent_loop import (
+    AgentLoopContext,
+    _compact_loop_history,
+    run_agent_loop,
+)
+from solcoder.core.llm import LLMResponse
+from solcoder.core.todo import TodoManager
+from solcoder.core.tool_registry import ToolRegistry
+from solcoder.session import SessionMetadata
+
+
+class RecordingLLM:
+    def __init__(self, replies: list[dict[str, Any] | str]) -> None:
+        self.replies = replies
+        self.prompts: list[str] = []
+        self.system_prompts: list[str | None] = []
+        self.histories: list[list[dict[str, str]]] = []
+
+    def stream_chat(
+        self,
+        prompt: str,
+        *,
+        system_prompt: str | None = None,
+        history: Sequence[dict[str, str]] | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> LLMResponse:
+        self.prompts.append(prompt)
+        self.system_prompts.append(system_prompt)
+        self.histories.append(list(history or []))
+        reply_value = self.replies.pop(0)
+        reply = reply_value if isinstance(reply_value, str) else json.dumps(reply_value)
+        if on_chunk:
+            on_chunk(reply)
+        return LLMResponse(text=reply, latency_seconds=0.0, finish_reason="stop")
+
+
+def _loop_context(llm: RecordingLLM, prompt: str, **overrides: Any) -> AgentLoopContext:
+    now = datetime.now(UTC)
+    rendered: list[tuple[str, str]] = []
+    options: dict[str, Any] = {
+        "prompt": prompt,
+        "history": [],
+        "llm": llm,
+        "tool_registry": ToolRegistry(),
+        "console": Console(file=StringIO()),
+        "config_context": None,
+        "session_metadata": SessionMetadata(
+            session_id="test", created_at=now, updated_at=now
+        ),
+        "render_message": lambda role, message: rendered.append((role, message)),
+    }
+    options.update(overrides)
+    return AgentLoopContext(**options)
+
+
+def _tool_result(index: int, size: int = 4000) -> dict[str, str]:
+    payload = {
+        "type": "tool_result",
+        "tool_name": f"tool_{index}",
+        "step_title": f"Step {index}",
+        "status": "success",
+        "output": "x" * size,
+    }
+    return {"role": "user", "content": json.dumps(payload)}
+
+
+def test_compact_loop_history_is_noop_under_budget() -> None:
+    history = [{"role": "user", "content": "hi"}, _tool_result(1, size=10)]
+    snapshot = list(history)
+
+    _compact_loop_history(history, start=0)
+
+    assert history == snapshot
+
+
+def test_compact_loop_history_folds_old_tool_results() -> None:
+    base = [{"role": "system", "content": "earlier conversation"}]
+    history = list(base)
+    for index in range(6):
+        history.append(_tool_result(index))
+        history.append({"role": "assistant", "content": '{"type":"tool_request"}'})
+
+    _compact_loop_history(history, start=len(base))
+
+    assert history[: len(base)] == base
+    markers = [entry for entry in history if entry["content"].startswith("[compressed: ")]
+    assert markers == [{"role": "system", "content": "[compressed: 4 prior tool calls]"}]
+    remaining = [entry for entry in history if '"tool_result"' in entry["content"]]
+    assert len(remaining) == agent_loop._HISTORY_KEEP_TOOL_RESULTS
+
+    for index in range(6, 8):
+        history.append(_tool_result(index, size=12_000))
+    _compact_loop_history(history, start=len(base))
+
+    markers = [entry for entry in history if entry["content"].startswith("[compressed: ")]
+    assert markers == [{"role": "system", "content": "[compressed: 6 prior tool calls]"}]
+
+
+def test_compact_loop_history_drops_oldest_entries_over_hard_limit() -> None:
+    history = [{"role": "assistant", "content": "y" * 20_000} for _ in range(6)]
+
+    _compact_loop_history(history, start=0)
+
+    assert len(history) == agent_loop._HISTORY_MIN_TAIL
+
+
+def test_compact_loop_history_ignores_large_prior_conversation() -> None:
+    base = [{"role": "user", "content": "z" * 20_000} for _ in range(4)]
+    loop_entries = [
+        {"role": "user", "content": "build the program"},
+        {"role": "assistant", "content": '{"type":"plan"}'},
+        _tool_result(1, size=200),
+        {"role": "assistant", "content": '{"type":"reply"}'},
+    ]
+    history = base + loop_entries
+    snapshot = list(history)
+
+    _compact_loop_history(history, start=len(base))
+
+    assert history == snapshot
+
+
+def test_compact_loop_history_drops_prompt_reply_pairs() -> None:
+    history: list[dict[str, str]] = []
+    for index in range(5):
+        history.append({"role": "user", "content": f"{index}" * 12_000})
+        history.append({"role": "assistant", "content": f"reply {index}"})
+    budget = agent_loop._HistoryBudget(start=0)
+
+    _compact_loop_history(history, start=0, budget=budget)
+
+    assert [entry["role"] for entry in history] == ["user", "assistant"] * 2
+    assert history[0]["content"].startswith("3")
+    assert budget.tokens == sum(agent_loop._entry_tokens(entry) for entry in history)
+
+
+def test_light_first_turn_skips_manifest_for_direct_reply() -> None:
+    llm = RecordingLLM([{"type": "reply", "message": "Hello!"}])
+
+    response = run_agent_loop(_loop_context(llm, "hi"))
+
+    assert response.messages == [("agent", "Hello!")]
+    assert "manifest withheld" in (llm.system_prompts[0] or "")
+    assert "Only use the manifest provided below" not in (llm.system_prompts[0] or "")
+
+
+def test_light_first_turn_is_skipped_with_todo_manager() -> None:
+    llm = RecordingLLM([{"type": "reply", "message": "Hello!"}])
+
+    run_agent_loop(_loop_context(llm, "hi", todo_manager=TodoManager()))
+
+    assert "manifest withheld" not in (llm.system_prompts[0] or "")
+    assert "Only use the manifest provided below" in (llm.system_prompts[0] or "")
+
+
+def test_light_first_turn_replays_prompt_with_manifest_for_plans() -> None:
+    llm = RecordingLLM(
+        [
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "reply", "message": "Done"},
+        ]
+    )
+
+    response = run_agent_loop(_loop_context(llm, "do work"))
+
+    assert llm.prompts == ["do work", "do work"]
+    assert "manifest withheld" in (llm.system_prompts[0] or "")
+    assert "manifest withheld" not in (llm.system_prompts[1] or "")
+    assert response.messages[-1] == ("agent", "Done")
+
+
+def test_light_first_turn_replay_drops_invalid_directive_retry() -> None:
+    llm = RecordingLLM(
+        [
+            "not json",
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "reply", "message": "Done"},
+        ]
+    )
+
+    run_agent_loop(_loop_context(llm, "do work"))
+
+    assert llm.prompts[2] == "do work"
+    assert llm.histories[2] == []
+
+
+def test_loop_stops_when_wall_clock_budget_is_exhausted() -> None:
+    llm = RecordingLLM(
+        [
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "reply", "message": "Never sent"},
+        ]
+    )
+
+    response = run_agent_loop(_loop_context(llm, "do work", max_wall_seconds=0.0))
+
+    assert len(llm.prompts) == 1
+    assert response.messages[-1][0] == "system"
+    assert "time budget" in response.messages[-1][1]
+
+
+def test_loop_stops_after_consecutive_rejected_directives() -> None:
+    todo_manager = TodoManager()
+    todo_manager.create_task("Write program")
+    todo_manager.create_task("Deploy program")
+    llm = RecordingLLM([{"type": "reply", "message": "Done already"}] * 3)
+
+    response = run_agent_loop(
+        _loop_context(
+            llm,
+            "finish up",
+            todo_manager=todo_manager,
+            max_consecutive_errors=1,
+        )
+    )
+
+    assert len(llm.prompts) == 2
+    assert "consecutive rejected directives" in response.messages[-1][1]
+
+
+def test_llm_payload_log_parses_json_prompts_only(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(agent_loop, "_LLM_LOG_ENABLED", True)
+    llm = RecordingLLM(
+        [
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "plan", "steps": ["Inspect", "Answer"]},
+            {"type": "reply", "message": "Done"},
+        ]
+    )
+
+    run_agent_loop(_loop_context(llm, "do work"))
+
+    log_files = sorted((tmp_path / ".solcoder/logs/llm").glob("*.json"))
+    entries = [json.loads(path.read_text())["prompt"] for path in log_files]
+    assert len(entries) == 3
+    assert "parsed" not in entries[0]
+    assert entries[-1]["type"] == "plan_ack"
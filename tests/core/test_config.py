@@ -1,4 +1,5 @@
 
+import json
 from pathlib import Path
 from typing import Any
 
@@ -12,6 +13,8 @@ from solcoder.core.config import (
     ConfigContext,
     ConfigManager,
     ConfigurationError,
+    CredentialStore,
+    SolCoderConfig,
 )
 
 
@@ -223,3 +226,169 @@ def test_invalid_project_config_raises(tmp_path: Path) -> None:
 
     with pytest.raises(ConfigurationError):
         manager_with_bad.ensure(interactive=False, passphrase="pass")
+
+
+def test_credential_store_reuses_derived_key(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = CredentialStore(tmp_path / CREDENTIALS_FILENAME)
+    store.save("passphrase", "secret")
+
+    calls: list[bytes] = []
+    original = CredentialStore._derive_key
+
+    def counting_derive(passphrase: str, salt: bytes, iterations: int) -> bytes:
+        calls.append(salt)
+        return original(passphrase, salt, iterations)
+
+    monkeypatch.setattr(CredentialStore, "_derive_key", staticmethod(counting_derive))
+
+    assert store.load("passphrase") == "secret"
+    assert store.load("passphrase") == "secret"
+    assert len(calls) == 1
+    with pytest.raises(ConfigurationError):
+        store.load("wrong")
+
+
+def test_credential_store_reads_legacy_payload_without_kdf(tmp_path: Path) -> None:
+    store = CredentialStore(tmp_path / CREDENTIALS_FILENAME)
+    store.save("passphrase", "secret")
+    payload = json.loads(store.credentials_path.read_text())
+    assert payload["kdf"] == "pbkdf2-sha256"
+    del payload["kdf"]
+    store.credentials_path.write_text(json.dumps(payload))
+
+    assert CredentialStore(store.credentials_path).load("passphrase") == "secret"
+
+
+def test_read_config_dict_reuses_parse_until_file_changes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = make_manager(tmp_path)
+    path = tmp_path / "custom.toml"
+    path.write_text(tomli_w.dumps({"llm_model": "first"}))
+
+    parses: list[object] = []
+    original_load = tomllib.load
+
+    def counting_load(handle: Any) -> dict[str, Any]:
+        parses.append(handle)
+        return original_load(handle)
+
+    monkeypatch.setattr(tomllib, "load", counting_load)
+
+    assert manager._read_config_dict(path) == {"llm_model": "first"}
+    manager._read_config_dict(path)["llm_model"] = "mutated"
+    assert manager._read_config_dict(path) == {"llm_model": "first"}
+    assert len(parses) == 1
+
+    path.write_text(tomli_w.dumps({"llm_model": "second-model"}))
+    assert manager._read_config_dict(path) == {"llm_model": "second-model"}
+    assert len(parses) == 2
+
+
+def test_load_config_returns_independent_models(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    manager.ensure(interactive=False, llm_api_key="secret", passphrase="pass", offline_mode=True)
+
+    first = manager._load_config()
+    first.llm_model = "mutated"
+    second = manager._load_config()
+
+    assert second is not first
+    assert second.llm_model == "gpt-5-codex"
+
+
+def test_merge_dicts_leaves_inputs_untouched(tmp_path: Path) -> None:
+    manager = make_manager(tmp_path)
+    base = {"tool_controls": {"format": "allow"}, "network": "devnet"}
+    override = {"tool_controls": {"deploy": "deny"}, "network": "mainnet"}
+
+    merged = manager._merge_dicts(base, override)
+
+    assert merged == {
+        "tool_controls": {"format": "allow", "deploy": "deny"},
+        "network": "mainnet",
+    }
+    assert base == {"tool_controls": {"format": "allow"}, "network": "devnet"}
+    assert override == {"tool_controls": {"deploy": "deny"}, "network": "mainnet"}
+
+
+def test_credential_store_reads_legacy_fernet_payload(tmp_path: Path) -> None:
+    import base64
+    import hashlib
+
+    from cryptography.fernet import Fernet
+
+    salt = b"0123456789abcdef"
+    raw_key = hashlib.pbkdf2_hmac("sha256", b"passphrase", salt, 1000, dklen=32)
+    token = Fernet(base64.urlsafe_b64encode(raw_key)).encrypt(b"legacy-secret")
+    path = tmp_path / CREDENTIALS_FILENAME
+    path.write_text(
+        json.dumps(
+            {
+                "salt": base64.b64encode(salt).decode("ascii"),
+                "ciphertext": base64.b64encode(token).decode("ascii"),
+                "iterations": 1000,
+            }
+        )
+    )
+
+    store = CredentialStore(path)
+    assert store.load("passphrase") == "legacy-secret"
+    with pytest.raises(ConfigurationError):
+        store.load("wrong")
+
+
+def test_credential_store_batches_secrets_under_one_derivation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = CredentialStore(tmp_path / CREDENTIALS_FILENAME)
+    calls: list[bytes] = []
+    original = CredentialStore._derive_key
+
+    def counting_derive(passphrase: str, salt: bytes, iterations: int) -> bytes:
+        calls.append(salt)
+        return original(passphrase, salt, iterations)
+
+    monkeypatch.setattr(CredentialStore, "_derive_key", staticmethod(counting_derive))
+
+    store.save_many("passphrase", {"llm_api_key": "llm", "rpc_api_key": "rpc"})
+    assert len(calls) == 1
+
+    assert store.load_many("passphrase") == {"llm_api_key": "llm", "rpc_api_key": "rpc"}
+    assert store.load("passphrase") == "llm"
+    assert len(calls) == 2
+
+
+def test_ensure_reuses_config_stat_when_reading_toml(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = ConfigManager(config_dir=tmp_path)
+    manager.ensure(offline_mode=True)
+    stats: list[Path] = []
+    original_stat = Path.stat
+
+    def recording_stat(self: Path, *args: Any, **kwargs: Any) -> Any:
+        stats.append(self)
+        return original_stat(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "stat", recording_stat)
+
+    manager.ensure(offline_mode=True)
+
+    assert stats.count(manager.config_path) == 1
+
+
+def test_load_config_skips_merge_without_layered_configs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = ConfigManager(config_dir=tmp_path)
+    manager.ensure(offline_mode=True)
+
+    def fail_merge(*_: Any) -> dict[str, Any]:
+        raise AssertionError("merge should not run for a single config file")
+
+    monkeypatch.setattr(manager, "_merge_dicts", fail_merge)
+
+    assert manager._load_config().llm_model == SolCoderConfig().llm_model
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+import pytest
+
+from solcoder.core.config import ConfigContext, SolCoderConfig
+from solcoder.core.context import (
+    DEFAULT_HISTORY_LIMIT,
+    ContextManager,
+    SlidingWindowStrategy,
+)
+from solcoder.core.llm import LLMResponse
+from solcoder.session.manager import TRANSCRIPT_LIMIT, SessionManager
+
+
+class SummaryLLM:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    def stream_chat(
+        self,
+        prompt: str,
+        *,
+        system_prompt: str | None = None,
+        history: Sequence[dict[str, str]] | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> LLMResponse:
+        self.prompts.append(prompt)
+        text = f"summary {len(self.prompts)}"
+        if on_chunk:
+            on_chunk(text)
+        return LLMResponse(text=text, latency_seconds=0.0, finish_reason="stop")
+
+
+def test_record_keeps_transcript_reference_in_sync_after_save(tmp_path: Path) -> None:
+    sessions = SessionManager(root=tmp_path)
+    session = sessions.start()
+    manager = ContextManager(session, llm=None, config_context=None)
+
+    for index in range(TRANSCRIPT_LIMIT + 5):
+        manager.record("user", f"message {index}")
+    sessions.save(session)
+    manager.record("agent", "after save")
+
+    assert manager.transcript is session.transcript
+    assert len(session.transcript) == TRANSCRIPT_LIMIT
+    assert session.transcript[-1]["message"] == "after save"
+    assert manager.conversation_history()[-1] == {
+        "role": "user",
+        "content": f"message {TRANSCRIPT_LIMIT + 4}",
+    }
+
+
+def test_token_estimate_tracks_records_trims_and_reassignment(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    manager = ContextManager(session, llm=None, config_context=None)
+
+    for _ in range(TRANSCRIPT_LIMIT + 3):
+        manager.record("user", "one two three")
+    assert manager.estimate_context_tokens() == TRANSCRIPT_LIMIT * 3
+
+    session.transcript = [{"role": "system", "message": "a b", "summary": True}]
+    assert manager.estimate_context_tokens() == 2
+    manager.record("agent", "c")
+    assert manager.estimate_context_tokens() == 3
+
+
+def test_compaction_folds_only_newly_aged_turns_into_previous_summary(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    llm = SummaryLLM()
+    manager = ContextManager(session, llm=llm, config_context=None)
+
+    for index in range(15):
+        manager.record("user", f"first-{index}")
+    manager.force_compact_history()
+    assert session.transcript[0]["message"] == "summary 1"
+    assert "Summary so far" not in llm.prompts[0]
+
+    for index in range(3):
+        manager.record("user", f"second-{index}")
+    manager.force_compact_history()
+
+    assert session.transcript[0]["message"] == "summary 2"
+    assert "Summary so far:\nsummary 1" in llm.prompts[1]
+    assert "first-7" in llm.prompts[1] and "first-8" not in llm.prompts[1]
+
+    manager.force_compact_history()
+    assert len(llm.prompts) == 2
+
+
+def test_sliding_window_strategy_drops_old_turns_without_llm(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    llm = SummaryLLM()
+    config = SolCoderConfig(history_compaction_strategy="sliding")
+    config_context = ConfigContext(config=config, llm_api_key="", passphrase=None)
+    manager = ContextManager(session, llm=llm, config_context=config_context)
+    assert isinstance(manager.strategy, SlidingWindowStrategy)
+
+    session.transcript.append({"role": "system", "message": "earlier", "summary": True})
+    for index in range(25):
+        manager.record("user", f"turn-{index}")
+    manager.compact_history_if_needed()
+
+    assert llm.prompts == []
+    assert session.transcript[0]["message"] == "earlier"
+    assert [entry["message"] for entry in session.transcript[1:]] == [
+        f"turn-{index}" for index in range(15, 25)
+    ]
+    assert manager.estimate_context_tokens() == 11
+
+
+def test_conversation_history_maps_roles_and_skips_latest_entry(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    manager = ContextManager(session, llm=None, config_context=None)
+    session.transcript.append({"role": "agent", "message": "rolled up", "summary": True})
+    manager.record("user", "hi")
+    manager.record("agent", "hello")
+    manager.record("tool", "")
+    manager.record("tool", "ran")
+    manager.record("user", "latest")
+
+    assert manager.conversation_history() == [
+        {"role": "system", "content": "rolled up"},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "system", "content": "ran"},
+    ]
+
+
+def test_compaction_during_cooldown_skips_config_lookups(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    session = SessionManager(root=tmp_path).start()
+    manager = ContextManager(session, llm=SummaryLLM(), config_context=None)
+    session.metadata.compression_cooldown = 2
+
+    def fail_lookup(*_: object) -> int:
+        raise AssertionError("config consulted during cooldown")
+
+    monkeypatch.setattr(manager, "config_int", fail_lookup)
+    manager.compact_history_if_needed()
+    manager.compact_history_if_needed()
+
+    assert session.metadata.compression_cooldown == 0
+
+
+def test_compaction_config_is_resolved_once_until_refreshed(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    config = SolCoderConfig(history_max_messages=8, history_summary_keep=3)
+    config_context = ConfigContext(config=config, llm_api_key="", passphrase=None)
+    manager = ContextManager(session, llm=None, config_context=config_context)
+
+    settings = manager.compaction_config
+    assert (settings.history_limit, settings.summary_keep) == (8, 3)
+    assert manager.compaction_config is settings
+
+    config.history_summary_keep = 4
+    assert manager.compaction_config.summary_keep == 3
+    assert manager.refresh_config().summary_keep == 4
+
+    manager.config_context = None
+    assert manager.compaction_config.history_limit == DEFAULT_HISTORY_LIMIT
+
+
+def test_compaction_rewrites_transcript_in_place(tmp_path: Path) -> None:
+    session = SessionManager(root=tmp_path).start()
+    manager = ContextManager(session, llm=SummaryLLM(), config_context=None)
+    transcript = session.transcript
+    for index in range(12):
+        manager.record("user", f"turn {index}")
+
+    manager.force_compact_history()
+
+    assert session.transcript is transcript
+    assert manager.transcript is transcript
+    assert len(transcript) == 11
+    assert manager.estimate_context_tokens() == 2 + 10 * 2
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import os
+import threading
 from subprocess import CompletedProcess
 from typing import Iterable
 from pathlib import Path
 
+import pytest
+
+from solcoder.core import env_diag
 from solcoder.core.env_diag import (
     DiagnosticResult,
     ToolRequirement,
@@ -138,3 +142,237 @@ def test_collect_environment_diagnostics_reports_fallback_hint(tmp_path: Path) -
     assert result.version == "example 2.0.0"
     assert result.details == f"Detected at {fallback}, but it is not on PATH."
     assert "Add" in (result.remediation or "")
+
+
+def test_collect_environment_diagnostics_probes_concurrently_in_order() -> None:
+    tools = tuple(
+        ToolRequirement(
+            name=f"Tool {index}",
+            executable=f"tool{index}",
+            version_args=["--version"],
+            remediation="Install tool.",
+        )
+        for index in range(4)
+    )
+    barrier = threading.Barrier(len(tools), timeout=5)
+
+    def runner(command: list[str]) -> CompletedProcess[str]:
+        barrier.wait()  # only passes if every probe runs at the same time
+        return CompletedProcess(args=command, returncode=0, stdout=f"{command[0]} 1.0\n", stderr="")
+
+    results = collect_environment_diagnostics(
+        runner=runner,
+        resolver=lambda executable: f"/bin/{executable}",
+        tools=tools,
+    )
+
+    assert [res.name for res in results[: len(tools)]] == [tool.name for tool in tools]
+    assert [res.version for res in results[: len(tools)]] == [
+        f"/bin/tool{index} 1.0" for index in range(4)
+    ]
+
+
+def test_default_path_resolution_is_cached_until_cleared(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    lookups: list[str] = []
+
+    def fake_index(executables: set[str], _path_env: str) -> dict[str, str]:
+        lookups.extend(sorted(executables))
+        return {}
+
+    monkeypatch.setattr(env_diag, "_build_path_index", fake_index)
+    env_diag.clear_env_diag_cache()
+    fallback = tmp_path / "bin" / "cached"
+    tool = ToolRequirement(
+        name="Cached Tool",
+        executable="cached-tool",
+        version_args=["--version"],
+        remediation="Install cached tool.",
+        fallback_paths=(str(fallback),),
+    )
+
+    first = collect_environment_diagnostics(runner=_runner_factory({}), tools=(tool,))
+    fallback.parent.mkdir(parents=True)
+    fallback.write_text("")
+    second = collect_environment_diagnostics(runner=_runner_factory({}), tools=(tool,))
+
+    assert lookups == ["cached-tool"]
+    assert first[0].details is None and second[0].details is None
+
+    env_diag.clear_env_diag_cache()
+    third = collect_environment_diagnostics(runner=_runner_factory({}), tools=(tool,))
+
+    assert lookups == ["cached-tool", "cached-tool"]
+    assert (third[0].details or "").startswith(f"Found at {fallback}")
+
+
+def test_fallback_paths_expand_home_directory(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    env_diag.clear_env_diag_cache()
+    fallback = tmp_path / ".cargo" / "bin" / "home-tool"
+    fallback.parent.mkdir(parents=True)
+    fallback.write_text("")
+    tool = ToolRequirement(
+        name="Home Tool",
+        executable="home-tool",
+        version_args=["--version"],
+        remediation="Install home tool.",
+        fallback_paths=("~/.cargo/bin/home-tool",),
+    )
+    runner = _runner_factory(
+        {str(fallback): CompletedProcess(args=[], returncode=0, stdout="home 1.0\n", stderr="")}
+    )
+
+    results = collect_environment_diagnostics(runner=runner, resolver=lambda _: None, tools=(tool,))
+
+    assert results[0].details == f"Detected at {fallback}, but it is not on PATH."
+    assert f"Add {fallback.parent} to your PATH." in (results[0].remediation or "")
+
+
+def test_fallback_directories_are_listed_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    env_diag.clear_env_diag_cache()
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "beta").write_text("")
+    listed: list[str] = []
+    real_listdir = os.listdir
+
+    def counting_listdir(path):
+        listed.append(path)
+        return real_listdir(path)
+
+    monkeypatch.setattr(env_diag.os, "listdir", counting_listdir)
+
+    assert env_diag._resolve_fallback_path((str(bin_dir / "alpha"),)) is None
+    assert env_diag._resolve_fallback_path((str(bin_dir / "beta"),)) == str(bin_dir / "beta")
+    assert listed == [str(bin_dir)]
+
+
+def test_runner_diagnostics_reads_irys_sdk_version(tmp_path: Path) -> None:
+    runner_dir = tmp_path / ".solcoder" / "uploader_runner"
+    runner_dir.mkdir(parents=True)
+    (runner_dir / "package.json").write_text(
+        '{\n  "name": "runner",\n  "dependencies": {\n    "@irys/sdk" : "^0.2.1"\n  }\n}\n'
+    )
+
+    results = env_diag._collect_runner_diagnostics(tmp_path)
+
+    assert results[0].status == "missing"
+    assert results[0].version == "^0.2.1"
+    assert env_diag._irys_sdk_version(runner_dir / "missing.json") is None
+
+    (runner_dir / "package.json").write_text(
+        '{"peerDependencies": {"@irys/sdk": "^0.1.0"}, "devDependencies": {"@irys/sdk": "^0.2.0"}}'
+    )
+    assert env_diag._irys_sdk_version(runner_dir / "package.json") == "^0.2.0"
+
+
+def test_workspace_discovery_is_cached_until_cleared(tmp_path: Path) -> None:
+    env_diag.clear_env_diag_cache()
+    project = tmp_path / "project"
+    project.mkdir()
+
+    first = env_diag._collect_runner_diagnostics(project)
+    (project / ".solcoder").mkdir()
+    second = env_diag._collect_runner_diagnostics(project)
+    env_diag.clear_env_diag_cache()
+    third = env_diag._collect_runner_diagnostics(project)
+
+    assert first[0].details == second[0].details
+    assert "Workspace not detected" in (second[0].details or "")
+    assert "uploader_runner missing" in (third[0].details or "")
+
+
+def test_identical_probe_commands_run_once_per_pass() -> None:
+    tools = (
+        ToolRequirement(name="Node.js", executable="node", version_args=["--version"], remediation=""),
+        ToolRequirement(name="Umi Runtime", executable="node", version_args=["--version"], remediation=""),
+    )
+    calls: list[list[str]] = []
+
+    def runner(command: list[str]) -> CompletedProcess[str]:
+        calls.append(command)
+        return CompletedProcess(args=command, returncode=0, stdout="v20.0.0\n", stderr="")
+
+    results = collect_environment_diagnostics(
+        runner=runner, resolver=lambda exe: f"/usr/bin/{exe}", tools=tools
+    )
+
+    assert calls == [["/usr/bin/node", "--version"]]
+    assert [res.version for res in results[:2]] == ["v20.0.0", "v20.0.0"]
+
+
+def test_default_probes_are_cached_until_refresh(monkeypatch: pytest.MonkeyPatch) -> None:
+    env_diag.clear_env_diag_cache()
+    calls: list[list[str]] = []
+
+    def fake_runner(command: list[str]) -> CompletedProcess[str]:
+        calls.append(command)
+        return CompletedProcess(args=command, returncode=0, stdout="cached 1.0\n", stderr="")
+
+    monkeypatch.setattr(env_diag, "_default_runner", fake_runner)
+    monkeypatch.setattr(
+        env_diag, "_build_path_index", lambda exes, _path: {exe: f"/usr/bin/{exe}" for exe in exes}
+    )
+    tool = ToolRequirement(
+        name="Cached Probe", executable="cached-probe", version_args=["--version"], remediation=""
+    )
+
+    first = collect_environment_diagnostics(tools=(tool,))
+    second = collect_environment_diagnostics(tools=(tool,))
+    assert len(calls) == 1
+    assert first[0] == second[0]
+
+    collect_environment_diagnostics(tools=(tool,), refresh=True)
+    assert len(calls) == 2
+    env_diag.clear_env_diag_cache()
+
+
+def test_refresh_finds_tools_installed_since_last_pass(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    env_diag.clear_env_diag_cache()
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", str(bin_dir))
+    monkeypatch.setattr(
+        env_diag,
+        "_default_runner",
+        lambda command: CompletedProcess(args=command, returncode=0, stdout="late 2.0\n", stderr=""),
+    )
+    tool = ToolRequirement(
+        name="Late Tool", executable="late-tool", version_args=["--version"], remediation=""
+    )
+
+    assert collect_environment_diagnostics(tools=(tool,), refresh=True)[0].found is False
+
+    installed = bin_dir / "late-tool"
+    installed.write_text("#!/bin/sh\n")
+    installed.chmod(0o755)
+
+    result = collect_environment_diagnostics(tools=(tool,), refresh=True)[0]
+    assert result.found is True
+    assert result.version == "late 2.0"
+    env_diag.clear_env_diag_cache()
+
+
+def test_path_index_matches_first_executable_on_path(tmp_path: Path) -> None:
+    first, second = tmp_path / "first", tmp_path / "second"
+    for directory in (first, second):
+        directory.mkdir()
+        tool = directory / "tool"
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+    (first / "plain").write_text("")
+    (first / "tool-dir").mkdir()
+
+    index = env_diag._build_path_index(
+        {"tool", "plain", "tool-dir", "absent"}, os.pathsep.join([str(first), str(second)])
+    )
+
+    assert index == {"tool": str(first / "tool")}
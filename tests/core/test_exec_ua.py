@@ -3,14 +3,25 @@ from __future__ import annotations
 import subprocess
 from urllib.parse import quote
 
+import pytest
+
 import solcoder.core.exec_ua as exec_ua
 
 
+@pytest.fixture(autouse=True)
+def _reset_platform_detection():
+    yield
+    # Tests fake the platform module; don't leak those answers to later tests.
+    exec_ua._detect_os.cache_clear()
+    exec_ua._detect_arch.cache_clear()
+
+
 def _completed(args, returncode=0, stdout="", stderr="") -> subprocess.CompletedProcess[str]:
     return subprocess.CompletedProcess(args, returncode=returncode, stdout=stdout, stderr=stderr)
 
 
 def test_build_exec_ua_header_compiles_expected_tokens(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
     exec_ua.clear_exec_ua_cache()
 
     project_dir = tmp_path / "My Project"
@@ -35,7 +46,9 @@ def test_build_exec_ua_header_compiles_expected_tokens(monkeypatch, tmp_path):
     def fake_which(executable: str) -> str | None:
         return available.get(executable)
 
-    monkeypatch.setattr(exec_ua.shutil, "which", fake_which)
+    monkeypatch.setattr(
+        exec_ua, "resolve_executables", lambda names: {name: fake_which(name) for name in names}
+    )
 
     python_cmd = exec_ua.sys.executable
 
@@ -44,12 +57,14 @@ def test_build_exec_ua_header_compiles_expected_tokens(monkeypatch, tmp_path):
             return _completed(args, stdout="zsh 5.9 (arm64-apple-darwin)")
         if list(args[:3]) == ["/usr/bin/sudo", "-n", "true"]:
             return _completed(args, returncode=1, stderr="sudo: a password is required")
-        if list(args[:3]) == ["/usr/bin/git", "rev-parse", "--is-inside-work-tree"]:
-            return _completed(args, stdout="true\n")
-        if list(args[:4]) == ["/usr/bin/git", "rev-parse", "--abbrev-ref", "HEAD"]:
-            return _completed(args, stdout="feature-x\n")
-        if list(args[:3]) == ["/usr/bin/git", "status", "--porcelain"]:
-            return _completed(args, stdout=" M README.md\n")
+        if list(args) == ["/usr/bin/git", "status", "--branch", "--porcelain=v2"]:
+            return _completed(
+                args,
+                stdout=(
+                    "# branch.oid 0123abcd\n# branch.head feature-x\n"
+                    "1 .M N... 100644 100644 100644 abc abc README.md\n"
+                ),
+            )
         if list(args) in ([ "/usr/local/bin/node", "--version"], ["node", "--version"]):
             return _completed(args, stdout="v20.11.0\n")
         if list(args) == [python_cmd, "--version"]:
@@ -73,3 +88,104 @@ def test_build_exec_ua_header_compiles_expected_tokens(monkeypatch, tmp_path):
 
     cached = exec_ua.build_exec_ua_header(timeout=42)
     assert cached is header
+
+
+def test_detect_git_state_handles_clean_detached_and_outside_trees(monkeypatch):
+    monkeypatch.setattr(exec_ua, "_locate_executables", lambda: {"git": "/usr/bin/git"})
+    outputs = iter(
+        [
+            _completed([], stdout="# branch.oid abc\n# branch.head main\n"),
+            _completed([], stdout="# branch.oid abc\n# branch.head (detached)\n? notes.txt\n"),
+            _completed([], returncode=128, stderr="fatal: not a git repository"),
+        ]
+    )
+    monkeypatch.setattr(exec_ua, "_run_command", lambda args, *, timeout=2.0: next(outputs))
+
+    assert exec_ua._detect_git_state() == "1:main"
+    assert exec_ua._detect_git_state() == "1:HEAD*"
+    assert exec_ua._detect_git_state() == "0"
+
+
+def test_exec_ua_header_persists_across_processes(monkeypatch, tmp_path):
+    cache_home = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.chdir(tmp_path)
+    exec_ua.clear_exec_ua_cache()
+    calls: list[str] = []
+
+    def fake_detect_tools() -> str:
+        calls.append("tools")
+        return "python/3.11"
+
+    git_state = "1:main"
+    monkeypatch.setattr(exec_ua, "_detect_tools", fake_detect_tools)
+    monkeypatch.setattr(exec_ua, "_detect_git_state", lambda: git_state)
+    monkeypatch.setattr(exec_ua, "_run_command", lambda args, *, timeout=2.0: _completed(args, returncode=1))
+
+    header = exec_ua.build_exec_ua_header()
+    assert "; git=1:main; " in header
+    assert (cache_home / "solcoder" / "exec_ua.json").exists()
+    assert (cache_home / "solcoder" / "CACHEDIR.TAG").read_text().startswith("Signature: 8a477f59")
+
+    # Simulate a fresh process: the in-memory cache is gone but the file remains.
+    exec_ua._EXEC_UA_CACHE.clear()
+    assert exec_ua.build_exec_ua_header() == header
+    assert calls == ["tools"]
+
+    # Dirty state is not in the fingerprint; it is re-read on every disk hit.
+    git_state = "1:main*"
+    exec_ua._EXEC_UA_CACHE.clear()
+    assert exec_ua.build_exec_ua_header() == header.replace("git=1:main;", "git=1:main*;")
+    assert calls == ["tools"]
+
+    # A different working directory changes the fingerprint and re-probes.
+    other = tmp_path / "other"
+    other.mkdir()
+    monkeypatch.chdir(other)
+    exec_ua._EXEC_UA_CACHE.clear()
+    exec_ua.build_exec_ua_header()
+    assert calls == ["tools", "tools"]
+
+    exec_ua.clear_exec_ua_cache()
+    assert not (cache_home / "solcoder" / "exec_ua.json").exists()
+
+
+def test_normalize_version_extracts_first_major_minor():
+    assert exec_ua._normalize_version("GNU bash, version 5.2.15(1)-release") == "5.2"
+    assert exec_ua._normalize_version("v20.11.1") == "20.11"
+    assert exec_ua._normalize_version("x86_64 build 7 -> 1.2") == "1.2"
+    assert exec_ua._normalize_version("version 12.") == "unknown"
+    assert exec_ua._normalize_version("") == "unknown"
+    assert exec_ua._normalize_version(None) == "unknown"
+
+
+def test_detectors_share_one_executable_lookup(monkeypatch):
+    lookups: list[tuple[str, ...]] = []
+
+    def fake_resolve(names):
+        lookups.append(tuple(names))
+        return {name: f"/usr/bin/{name}" if name in {"apt", "pip", "sudo"} else None for name in names}
+
+    monkeypatch.setattr(exec_ua, "resolve_executables", fake_resolve)
+    monkeypatch.setattr(exec_ua, "_run_command", lambda args, *, timeout=2.0: _completed(args))
+
+    assert exec_ua._detect_package_managers() == "apt,pip"
+    assert exec_ua._detect_sudo_mode("linux") == "passwordless"
+    assert lookups == [exec_ua._EXECUTABLES, exec_ua._EXECUTABLES]
+
+
+def test_detect_os_reads_os_release_directly(monkeypatch, tmp_path):
+    release = tmp_path / "os-release"
+    release.write_text('NAME="Ubuntu"\nVERSION_ID="22.04.3"\nID=ubuntu\n')
+    monkeypatch.setattr(exec_ua, "_OS_RELEASE_PATHS", (str(tmp_path / "missing"), str(release)))
+    monkeypatch.setattr(exec_ua.platform, "system", lambda: "Linux")
+    exec_ua._detect_os.cache_clear()
+
+    assert exec_ua._detect_os() == ("linux", "22.04")
+
+
+def test_detect_cwd_matches_quote(monkeypatch, tmp_path):
+    cafe = str(tmp_path / "caf\u00e9")
+    for cwd in ("/home/dev/project-1.0", "/home/dev/My Project", cafe, "C:\\Users\\dev"):
+        monkeypatch.setattr(exec_ua.os, "getcwd", lambda cwd=cwd: cwd)
+        assert exec_ua._detect_cwd() == quote(cwd, safe="/:\\")
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import os
+import subprocess
+
+import solcoder.core.installers as installers
 from solcoder.core.env_diag import DiagnosticResult
 from solcoder.core.installers import (
     InstallerError,
     detect_missing_tools,
     install_tool,
     installer_display_name,
+    installer_key_for_diagnostic,
     list_installable_tools,
     required_tools,
 )
@@ -83,6 +88,19 @@ def test_detect_missing_tools_flags_required() -> None:
     assert "anchor" not in missing_required
 
 
+def test_missing_diagnostics_count_as_missing_tools() -> None:
+    diagnostics = [
+        DiagnosticResult(name="Rust Compiler", status="ok", found=True, version="1.73", remediation=None),
+    ]
+
+    missing = detect_missing_tools(diagnostics)
+
+    assert "rust" in missing  # Cargo was never reported
+    assert installer_key_for_diagnostic("Node.js") == "node"
+    assert installer_key_for_diagnostic("Cargo") == "rust"
+    assert installer_key_for_diagnostic("Python 3") is None
+
+
 def test_install_tool_dry_run_returns_result() -> None:
     tools = list_installable_tools()
     assert tools
@@ -93,6 +111,36 @@ def test_install_tool_dry_run_returns_result() -> None:
         assert result.commands
 
 
+def test_install_tool_verifies_only_target_tools(monkeypatch) -> None:
+    probed: list[tuple[str, ...]] = []
+
+    def fake_collect(*, tools):
+        probed.append(tuple(tool.name for tool in tools))
+        return [
+            DiagnosticResult(name=tool.name, status="ok", found=True, version="1.0", remediation=None)
+            for tool in tools
+        ]
+
+    monkeypatch.setattr(installers, "collect_environment_diagnostics", fake_collect)
+    monkeypatch.setattr(installers, "_prepare_install_environment", lambda spec, commands: None)
+    monkeypatch.setattr(installers, "_refresh_environment", lambda spec: None)
+    monkeypatch.setattr(installers, "_platform_key", lambda: "linux")
+
+    seen_argv: list[list[str]] = []
+
+    def runner(args):
+        seen_argv.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    result = install_tool("rust", runner=runner)
+
+    assert result.verification_passed is True
+    assert probed == [("Rust Compiler", "Cargo")]
+    assert len(seen_argv) == 1
+    assert seen_argv[0][:2] == ["bash", "-lc"]
+    assert "source $HOME/.cargo/env" in seen_argv[0][2]
+
+
 def test_installer_display_name_unknown() -> None:
     try:
         installer_display_name("unknown-tool")
@@ -100,3 +148,80 @@ def test_installer_display_name_unknown() -> None:
         pass
     else:  # pragma: no cover - should never happen
         raise AssertionError("Expected InstallerError for unknown tool")
+
+
+def test_run_command_batches_console_output() -> None:
+    class RecordingConsole:
+        def __init__(self) -> None:
+            self.calls: list[str] = []
+
+        def print(self, text: str) -> None:
+            self.calls.append(text)
+
+    console = RecordingConsole()
+    return_code, lines = installers._run_command(
+        installers._bash_command("for i in $(seq 1 100); do echo line$i; done; printf tail"),
+        console=console,
+    )
+
+    assert return_code == 0
+    assert lines[-101:] == [f"line{i}" for i in range(1, 101)] + ["tail"]
+    assert len(console.calls) < len(lines)
+    assert "\n".join(console.calls).splitlines() == lines
+
+
+def test_fused_commands_share_one_shell_and_stop_on_failure() -> None:
+    argv = installers._fused_bash_command(["export GREETING=hi", "echo $GREETING", "false", "echo unreachable"])
+
+    return_code, lines = installers._run_command(argv)
+
+    assert return_code != 0
+    assert "hi" in lines
+    assert "unreachable" not in lines
+
+
+def test_fused_step_marker_after_unterminated_output() -> None:
+    argv = installers._fused_bash_command(["printf progress", "false"])
+
+    return_code, lines = installers._run_command(argv)
+    output, last_step = installers._split_step_markers(lines)
+
+    assert return_code != 0
+    assert last_step == 1
+    assert output[-1] == "progress"
+    assert not any(installers._STEP_MARKER in line for line in output)
+
+
+def test_refresh_environment_prepends_new_dirs_once(monkeypatch, tmp_path) -> None:
+    fnm_dir = tmp_path / ".local" / "share" / "fnm"
+    bin_dir = fnm_dir / "aliases" / "default" / "bin"
+    bin_dir.mkdir(parents=True)
+    monkeypatch.setattr(installers.Path, "home", classmethod(lambda cls: tmp_path))
+    monkeypatch.setenv("PATH", os.pathsep.join([f"{fnm_dir}/", "/usr/bin"]))
+
+    installers._refresh_environment(installers.INSTALLER_SPECS["node"])
+
+    assert os.environ["PATH"].split(os.pathsep) == [
+        str(bin_dir),
+        str(bin_dir.parent),
+        f"{fnm_dir}/",
+        "/usr/bin",
+    ]
+
+
+def test_install_tool_reports_failing_fused_step(monkeypatch) -> None:
+    monkeypatch.setattr(installers, "_prepare_install_environment", lambda spec, commands: None)
+    monkeypatch.setattr(installers, "_platform_key", lambda: "linux")
+    commands = installers.INSTALLER_SPECS["rust"].command_map["linux"]
+    assert len(commands) > 1
+
+    def runner(args):
+        stdout = f"{installers._STEP_MARKER}0\nfetching\n"
+        return subprocess.CompletedProcess(args, 7, stdout=stdout, stderr="boom\n")
+
+    result = install_tool("rust", runner=runner)
+
+    assert result.success is False
+    assert result.commands == tuple(commands[:1])
+    assert result.error == f"Step 1/{len(commands)} exited with 7: {commands[0]}"
+    assert list(result.logs) == ["fetching", "boom"]
@@ -65,16 +65,73 @@ async def test_aquery_handles_string_result(
     assert rag_instance.working_dir == str(kb_workspace)
     assert rag_instance.calls == [("What is Proof of History?", "mix")]
     assert rag_instance.initialize_calls == 1
+    assert rag_instance.finalize_calls == 0
+
+    await client.aquery("And Tower BFT?")
+    await client.aclose()
+
+    assert len(stub_lightrag["instances"]) == 1
+    assert rag_instance.initialize_calls == 1
     assert rag_instance.finalize_calls == 1
 
 
+@pytest.mark.asyncio
+async def test_aquery_reuses_cached_answer_when_enabled(
+    kb_workspace: Path, stub_lightrag: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SOLCODER_KB_ANSWER_CACHE", "1")
+    client = KnowledgeBaseClient(working_dir=kb_workspace)
+
+    first = await client.aquery("What is Proof of History?")
+    second = await client.aquery("  what is proof of history  ")
+    await client.aquery("What is Proof of History?", mode="local")
+
+    assert second is first
+    assert len(stub_lightrag["instances"][0].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_aquery_reuses_answer_for_paraphrased_question(
+    kb_workspace: Path, stub_lightrag: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SOLCODER_KB_ANSWER_CACHE", "1")
+    monkeypatch.setenv("SOLCODER_KB_ANSWER_CACHE_JACCARD", "0.8")
+    client = KnowledgeBaseClient(working_dir=kb_workspace)
+
+    first = await client.aquery("how does solana proof of history ordering work")
+    reordered = await client.aquery("solana proof of history ordering: how does it work?")
+    different = await client.aquery("how does solana stake delegation work")
+
+    assert reordered is first
+    assert different is not first
+    assert len(stub_lightrag["instances"][0].calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_aquery_skips_answer_cache_by_default(
+    kb_workspace: Path, stub_lightrag: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("SOLCODER_KB_ANSWER_CACHE", raising=False)
+    client = KnowledgeBaseClient(working_dir=kb_workspace)
+
+    await client.aquery("What is Proof of History?")
+    await client.aquery("What is Proof of History?")
+
+    assert len(stub_lightrag["instances"][0].calls) == 2
+
+
 def test_query_runs_async_path(kb_workspace: Path, stub_lightrag) -> None:
     client = KnowledgeBaseClient(working_dir=kb_workspace)
     result = client.query("Explain staking rewards.")
+    client.query("And inflation?")
 
     assert result.text == "solana info"
     rag_instance = stub_lightrag["instances"][0]
-    assert rag_instance.calls == [("Explain staking rewards.", "mix")]
+    assert rag_instance.calls == [("Explain staking rewards.", "mix"), ("And inflation?", "mix")]
+    assert rag_instance.initialize_calls == 1
+
+    client.close()
+    assert rag_instance.finalize_calls == 1
 
 
 @pytest.mark.asyncio
@@ -112,14 +169,39 @@ async def test_aquery_handles_dict_result(
 async def test_aquery_handles_async_iterable(
     kb_workspace: Path, stub_lightrag: dict[str, Any]
 ) -> None:
+    async def nested():
+        yield "!"
+
     async def generator():
         yield "First "
         yield {"response": "chunk", "references": ["Doc"]}
+        yield nested()
 
     stub_lightrag["cls"].return_value = generator()
     client = KnowledgeBaseClient(working_dir=kb_workspace)
     result = await client.aquery("Async?")
-    assert result.text == "First chunk"
+    assert result.text == "First chunk!"
+    assert result.citations == ["Doc"]
+
+
+@pytest.mark.asyncio
+async def test_aquery_handles_str_and_dict_subclasses(
+    kb_workspace: Path, stub_lightrag: dict[str, Any]
+) -> None:
+    class Text(str):
+        pass
+
+    class Payload(dict):
+        pass
+
+    async def generator():
+        yield Text("Sub ")
+        yield Payload(response="class", references=("Doc",))
+
+    stub_lightrag["cls"].return_value = generator()
+    client = KnowledgeBaseClient(working_dir=kb_workspace)
+    result = await client.aquery("Subclasses?")
+    assert result.text == "Sub class"
     assert result.citations == ["Doc"]
 
 
@@ -150,3 +232,172 @@ async def test_aquery_falls_back_when_lightrag_init_fails(
 
     assert result.text == "local fallback"
     assert result.citations == ["local"]
+
+
+def _write_local_pack(workspace: Path) -> None:
+    import json
+
+    (workspace / "kv_store_entity_chunks.json").write_text(
+        json.dumps({"Proof of History": {"chunk_ids": ["chunk-1"]}})
+    )
+    (workspace / "kv_store_text_chunks.json").write_text(
+        json.dumps(
+            {
+                "chunk-1": {"content": "# Source: docs/poh.md\nProof of History orders events."},
+                "chunk-2": {"content": "# Source: docs/rent.md\nRent is charged on accounts. Rent exempt accounts hold two years of rent."},
+                "chunk-3": {"content": "# Source: docs/fees.md\nFees pay validators. Accounts pay rent too."},
+            }
+        )
+    )
+
+
+def test_local_backend_ranks_chunks_from_inverted_index(kb_workspace: Path) -> None:
+    from solcoder.core.knowledge_base import _LocalKnowledgeBase
+
+    _write_local_pack(kb_workspace)
+    backend = _LocalKnowledgeBase(kb_workspace)
+
+    answer = backend.query("Rent accounts?")
+
+    assert [citation["path"] for citation in answer.citations] == ["docs/rent.md", "docs/fees.md"]
+    assert answer.text.startswith("Rent is charged on accounts.")
+    parsed = backend._parsed_chunks["chunk-3"]
+    assert parsed.text == "Fees pay validators. Accounts pay rent too."
+    assert parsed.source == "docs/fees.md"
+    assert [sentence for sentence, _tokens in parsed.sentences] == [
+        "Fees pay validators.",
+        "Accounts pay rent too.",
+    ]
+    assert parsed.sentences[1][1] == frozenset({"accounts", "pay", "rent", "too"})
+    assert {"fees", "rent"} <= parsed.tokens
+
+
+def test_local_backend_warm_starts_from_cached_index(
+    kb_workspace: Path, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    import json
+
+    from solcoder.core.knowledge_base import _LocalKnowledgeBase
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    _write_local_pack(kb_workspace)
+    pack_files = set(kb_workspace.iterdir())
+    first = _LocalKnowledgeBase(kb_workspace)
+
+    # The index is plain JSON in the user cache dir, never inside the pack.
+    assert set(kb_workspace.iterdir()) == pack_files
+    cached_files = list((tmp_path / "cache" / "solcoder" / "kb_index").glob("*.json"))
+    assert len(cached_files) == 1
+    json.loads(cached_files[0].read_text())
+
+    def fail_build(self):
+        raise AssertionError("index should come from the cached copy")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(_LocalKnowledgeBase, "_build_index", fail_build)
+        warm = _LocalKnowledgeBase(kb_workspace)
+    assert json.loads(json.dumps(warm._postings)) == json.loads(json.dumps(first._postings))
+    assert warm._text_chunks == first._text_chunks
+    assert warm.query("rent").text == first.query("rent").text
+
+    # Touching a store invalidates the cached copy.
+    (kb_workspace / "kv_store_entity_chunks.json").write_text(
+        json.dumps({"Rent": {"chunk_ids": ["chunk-2"]}, "Fees": {"chunk_ids": ["chunk-3"]}})
+    )
+    rebuilt = _LocalKnowledgeBase(kb_workspace)
+    assert list(rebuilt._entity_chunks) == ["Rent", "Fees"]
+
+
+def test_local_backend_matches_entities_by_name_and_token_overlap(kb_workspace: Path) -> None:
+    import json
+
+    from solcoder.core.knowledge_base import _LocalKnowledgeBase
+
+    _write_local_pack(kb_workspace)
+    (kb_workspace / "kv_store_entity_chunks.json").write_text(
+        json.dumps(
+            {
+                "Proof of History": {"chunk_ids": ["chunk-1"]},
+                "Rent": {"chunk_ids": ["chunk-2"]},
+                "Rent Exemption Threshold": {"chunk_ids": ["chunk-2"]},
+            }
+        )
+    )
+    from solcoder.core.knowledge_base import _tokens
+
+    backend = _LocalKnowledgeBase(kb_workspace)
+
+    def match(question: str) -> str | None:
+        tokens = _tokens(question)
+        return backend._match_entity(" ".join(tokens), frozenset(tokens))
+
+    assert match("How does Proof-of-History work?") == "Proof of History"
+    assert match("explain rent exemption") == "Rent"
+    assert match("history exemption") == "Proof of History"
+    assert match("validators") is None
+
+
+def test_summarize_chunk_text_requires_whole_token_matches() -> None:
+    from solcoder.core.knowledge_base import _parse_chunk_content, _summarize_chunk_text
+
+    text = _parse_chunk_content("# Source: docs/sol.md\nSolana is fast. The SOL token pays fees. Validators vote.")
+
+    assert _summarize_chunk_text(text, frozenset({"sol"})) == "The SOL token pays fees."
+    assert _summarize_chunk_text(text, frozenset({"rent"})) == "Solana is fast."
+
+
+def test_local_backend_reads_entity_summaries_from_llm_cache(kb_workspace: Path) -> None:
+    import json
+
+    from solcoder.core.knowledge_base import _LocalKnowledgeBase
+
+    _write_local_pack(kb_workspace)
+    (kb_workspace / "kv_store_llm_response_cache.json").write_text(
+        json.dumps(
+            {
+                "a": {"cache_type": "extract", "return": "ignored", "original_prompt": "Entity Name: Rent"},
+                "b": {"cache_type": "summary", "return": "entity<|#|>fragment", "original_prompt": "Entity Name: Rent"},
+                "c": {"cache_type": "summary", "return": "No entity here.", "original_prompt": "Describe fees"},
+                "d": {
+                    "cache_type": "summary",
+                    "return": "PoH is a verifiable delay function.<|COMPLETE|>",
+                    "original_prompt": "Task\nEntity Name: Proof of History\nDescription list:",
+                },
+            }
+        )
+    )
+
+    backend = _LocalKnowledgeBase(kb_workspace)
+
+    assert backend._entity_summaries == {"Proof of History": "PoH is a verifiable delay function."}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("inline", ["0", "1"])
+async def test_local_queries_use_dedicated_worker_unless_inline(
+    kb_workspace: Path, monkeypatch: pytest.MonkeyPatch, inline: str
+) -> None:
+    import threading
+
+    _write_local_pack(kb_workspace)
+    monkeypatch.setenv("SOLCODER_KB_BACKEND", "local")
+    monkeypatch.setenv("SOLCODER_KB_INLINE", inline)
+    threads: list[str] = []
+
+    async with KnowledgeBaseClient(working_dir=kb_workspace) as client:
+        backend = client._ensure_local_backend()
+        original_query = backend.query
+
+        def recording_query(question: str) -> KnowledgeBaseAnswer:
+            threads.append(threading.current_thread().name)
+            return original_query(question)
+
+        monkeypatch.setattr(backend, "query", recording_query)
+        answer = await client.aquery("Proof of History")
+
+    assert answer.citations == [{"title": "poh.md", "path": "docs/poh.md"}]
+    if inline == "1":
+        assert threads == [threading.current_thread().name]
+    else:
+        assert threads[0].startswith("solcoder-kb")
+    assert client._local_executor is None
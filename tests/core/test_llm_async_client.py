@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from solcoder.core.llm import AsyncLLMClient, LLMError, LLMSettings
+
+
+def _settings(**overrides) -> LLMSettings:
+    values = {
+        "provider": "ollama",
+        "base_url": "https://llm.example/v1",
+        "model": "model-x",
+        "api_key": "secret",
+        "retry_jitter": 0.0,
+    }
+    values.update(overrides)
+    return LLMSettings(**values)
+
+
+def _sse(*contents: str) -> bytes:
+    events = [
+        json.dumps({"choices": [{"delta": {"content": content}, "finish_reason": None}]})
+        for content in contents
+    ]
+    return b"".join(f"data: {event}\n\n".encode() for event in events) + b"data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_async_stream_chat_runs_prompts_concurrently() -> None:
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        return httpx.Response(200, content=_sse(prompt, "!"))
+
+    async with AsyncLLMClient(
+        _settings(), client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    ) as client:
+        chunks: list[str] = []
+        first, second = await asyncio.gather(
+            client.stream_chat("one", on_chunk=chunks.append),
+            client.stream_chat("two"),
+        )
+
+    assert (first.text, second.text) == ("one!", "two!")
+    assert sorted(chunks) == ["!", "one"]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_async_stream_tokens_retries_before_streaming() -> None:
+    responses = iter([httpx.Response(503), httpx.Response(200, content=_sse("a", "b"))])
+    sleeps: list[float] = []
+
+    async def record_sleep(delay: float) -> None:
+        sleeps.append(delay)
+
+    client = AsyncLLMClient(
+        _settings(),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(lambda _request: next(responses))),
+        sleep=record_sleep,
+    )
+
+    tokens = [token async for token in client.stream_tokens("hi")]
+
+    assert tokens == ["a", "b"]
+    assert sleeps == [2.0]
+
+
+@pytest.mark.asyncio
+async def test_async_stream_chat_raises_on_http_error() -> None:
+    transport = httpx.MockTransport(
+        lambda _request: httpx.Response(401, json={"error": {"message": "bad key"}})
+    )
+    client = AsyncLLMClient(_settings(), client=httpx.AsyncClient(transport=transport))
+
+    with pytest.raises(LLMError, match="bad key"):
+        await client.stream_chat("unauthorized")
+
+
+@pytest.mark.asyncio
+async def test_async_stream_chat_offline_returns_stub() -> None:
+    client = AsyncLLMClient(_settings(api_key=None))
+
+    response = await client.stream_chat("hello")
+    tokens = [token async for token in client.stream_tokens("hello")]
+    await client.aclose()
+
+    assert response.cached is True
+    assert tokens == [response.text]
+
+
+@pytest.mark.asyncio
+async def test_async_stream_tokens_does_not_retry_after_yielding() -> None:
+    class FailingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield _sse("Hel").split(b"data: [DONE]")[0]
+            raise httpx.ReadError("connection reset")
+
+    calls = 0
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, stream=FailingStream())
+
+    sleeps: list[float] = []
+
+    async def record_sleep(delay: float) -> None:
+        sleeps.append(delay)
+
+    client = AsyncLLMClient(
+        _settings(),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        sleep=record_sleep,
+    )
+    tokens: list[str] = []
+
+    with pytest.raises(LLMError, match="interrupted"):
+        async for token in client.stream_tokens("hi"):
+            tokens.append(token)
+
+    assert tokens == ["Hel"]
+    assert calls == 1
+    assert sleeps == []
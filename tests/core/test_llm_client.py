@@ -4,6 +4,14 @@ import httpx
 import pytest
 
 from solcoder.core.llm import LLMClient, LLMError, LLMResponse, LLMSettings
+from solcoder.core.llm.transport import (
+    StreamState,
+    build_endpoint,
+    build_headers,
+    encode_payload,
+    feed_stream_line,
+    iter_stream_lines,
+)
 
 
 def test_stream_chat_offline_returns_stub() -> None:
@@ -82,3 +90,249 @@ def test_stream_chat_raises_on_http_error() -> None:
         client.stream_chat("unauthorized")
 
     assert "bad key" in str(excinfo.value)
+
+
+def test_default_http_client_uses_pool_settings() -> None:
+    settings = LLMSettings(
+        provider="openai",
+        base_url="https://api.openai.com/v1",
+        model="gpt-5-codex",
+        api_key="test-key",
+        timeout_seconds=12.0,
+        connect_timeout_seconds=3.0,
+        keepalive_expiry_seconds=45.0,
+    )
+
+    with LLMClient(settings) as client:
+        http_client = client._client
+        assert http_client.timeout == httpx.Timeout(12.0, connect=3.0)
+        pool = http_client._transport._pool
+        assert pool._max_connections == 50
+        assert pool._max_keepalive_connections == 20
+        assert pool._keepalive_expiry == 45.0
+
+    assert http_client.is_closed
+
+
+def _feed(lines: list[str] | list[bytes]) -> tuple[str, str | None, dict[str, int] | None]:
+    state = StreamState()
+    for line in lines:
+        feed_stream_line(state, line)
+    return state.result()
+
+
+def test_feed_stream_line_skips_non_json_payloads() -> None:
+    lines = [
+        "event: ping",
+        "data: not-json",
+        'data: {"choices":[{"delta":{"content":"Hi"},"finish_reason":null}]}',
+        'data: {"choices":[{"delta":{"content":" there"},"finish_reason":"stop"}]}',
+        "data: [DONE]",
+    ]
+
+    text, finish_reason, usage = _feed(lines)
+
+    assert text == "Hi there"
+    assert finish_reason == "stop"
+    assert usage is None
+
+
+def test_iter_stream_lines_joins_lines_split_across_chunks() -> None:
+    chunks = [b'data: {"delta":', b' "a"}\r\n\r\ndata: [DO', b"NE]\n", b"tail"]
+
+    lines = list(iter_stream_lines(chunks))
+
+    assert lines == [b'data: {"delta": "a"}\r', b"\r", b"data: [DONE]", b"tail"]
+
+
+@pytest.mark.parametrize(
+    ("provider", "path", "message_key"),
+    [
+        ("OpenAI", "/responses", "input"),
+        ("claude", "/messages", "messages"),
+        ("ollama", "/chat/completions", "messages"),
+    ],
+)
+def test_provider_request_shape(provider: str, path: str, message_key: str) -> None:
+    settings = LLMSettings(
+        provider=provider,
+        base_url="https://llm.example/v1/",
+        model="model-x",
+        api_key="secret",
+        max_output_tokens=0,
+    )
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert build_endpoint(settings) == f"https://llm.example/v1{path}"
+    headers = build_headers(settings)
+    assert headers["Authorization"] == "Bearer secret"
+    assert ("x-api-key" in headers) is (provider == "claude")
+    headers["Authorization"] = "mutated"
+    assert build_headers(settings)["Authorization"] == "Bearer secret"
+
+    payload = json.loads(encode_payload(settings, messages))
+    assert payload[message_key] == messages
+    assert ("max_tokens" in payload) is (provider == "claude")
+    if provider == "claude":
+        assert payload["max_tokens"] == 1
+
+
+@pytest.mark.parametrize(
+    ("provider", "expected_options"),
+    [
+        ("openai", {"reasoning": {"effort": "low"}}),
+        ("anthropic", {"max_tokens": 1024}),
+        ("ollama", {}),
+    ],
+)
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode_payload_serializes_provider_body(
+    monkeypatch: pytest.MonkeyPatch,
+    provider: str,
+    expected_options: dict[str, object],
+    use_orjson: bool,
+) -> None:
+    if not use_orjson:
+        monkeypatch.setattr("solcoder.core.llm.transport.orjson", None)
+    settings = LLMSettings(
+        provider=provider,
+        base_url="https://llm.example/v1",
+        model=f"model-{use_orjson}",
+        api_key="secret",
+        reasoning_effort="low",
+    )
+    messages = [{"role": "user", "content": "héllo \"quoted\""}]
+    messages_key = "input" if provider == "openai" else "messages"
+
+    assert json.loads(encode_payload(settings, messages)) == {
+        "model": f"model-{use_orjson}",
+        "stream": True,
+        **expected_options,
+        messages_key: messages,
+    }
+
+    settings.model = "other-model"
+    assert json.loads(encode_payload(settings, messages))["model"] == "other-model"
+
+
+def test_stream_chat_retries_retryable_statuses() -> None:
+    responses = iter(
+        [
+            httpx.Response(status_code=503, headers={"Retry-After": "2"}),
+            httpx.Response(status_code=429),
+            httpx.Response(
+                status_code=200,
+                headers={"content-type": "text/event-stream"},
+                content=b'data: {"choices":[{"delta":{"content":"ok"},"finish_reason":"stop"}]}\n\n',
+            ),
+        ]
+    )
+    transport = httpx.MockTransport(lambda _request: next(responses))
+    settings = LLMSettings(
+        provider="ollama",
+        base_url="https://llm.example/v1",
+        model="model-x",
+        api_key="secret",
+        retry_jitter=0.0,
+    )
+    sleeps: list[float] = []
+    client = LLMClient(settings, client=httpx.Client(transport=transport), sleep=sleeps.append)
+
+    response = client.stream_chat("retry please")
+
+    assert response.text == "ok"
+    assert sleeps == [2.0, 4.0]
+
+
+def test_stream_chat_does_not_retry_client_errors_or_exhausted_attempts() -> None:
+    statuses = iter([400, 503, 503, 503])
+    transport = httpx.MockTransport(lambda _request: httpx.Response(status_code=next(statuses)))
+    settings = LLMSettings(
+        provider="ollama",
+        base_url="https://llm.example/v1",
+        model="model-x",
+        api_key="secret",
+        retry_cap_seconds=3.0,
+        retry_jitter=0.0,
+    )
+    sleeps: list[float] = []
+    client = LLMClient(settings, client=httpx.Client(transport=transport), sleep=sleeps.append)
+
+    with pytest.raises(LLMError):
+        client.stream_chat("bad request")
+    assert sleeps == []
+
+    with pytest.raises(LLMError):
+        client.stream_chat("still unavailable")
+    assert sleeps == [2.0, 3.0]
+
+
+def test_feed_stream_line_dispatches_response_events() -> None:
+    lines = [
+        b'data: {"type":"response.output_text","text":"Full"}',
+        b'data: {"type":"response.refusal.delta","delta":" text"}',
+        b'data: {"type":"response.completed","response":{"status":"done","output_text":"ignored"}}',
+    ]
+    assert _feed(lines) == ("Full text", "done", None)
+
+    with pytest.raises(LLMError, match="quota exceeded"):
+        _feed([b'data: {"type":"response.error","error":{"message":"quota exceeded"}}'])
+
+
+def test_stream_chat_iter_yields_chunks_then_returns_response() -> None:
+    content = (
+        b'data: {"choices":[{"delta":{"content":"Hel"},"finish_reason":null}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"lo"},"finish_reason":"stop"}]}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    transport = httpx.MockTransport(lambda _request: httpx.Response(200, content=content))
+    settings = LLMSettings(
+        provider="ollama",
+        base_url="https://llm.example/v1",
+        model="model-x",
+        api_key="secret",
+    )
+    client = LLMClient(settings, client=httpx.Client(transport=transport))
+
+    stream = client.stream_chat_iter("hi")
+    chunks = [next(stream), next(stream)]
+    with pytest.raises(StopIteration) as stop:
+        next(stream)
+
+    assert chunks == ["Hel", "lo"]
+    assert stop.value.value.text == "Hello"
+    assert stop.value.value.finish_reason == "stop"
+
+
+def test_stream_chat_iter_does_not_retry_after_yielding() -> None:
+    class FailingStream(httpx.SyncByteStream):
+        def __iter__(self):
+            yield b'data: {"choices":[{"delta":{"content":"Hel"},"finish_reason":null}]}\n\n'
+            raise httpx.ReadError("connection reset")
+
+    calls = 0
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, stream=FailingStream())
+
+    settings = LLMSettings(
+        provider="ollama",
+        base_url="https://llm.example/v1",
+        model="model-x",
+        api_key="secret",
+    )
+    sleeps: list[float] = []
+    client = LLMClient(
+        settings, client=httpx.Client(transport=httpx.MockTransport(handler)), sleep=sleeps.append
+    )
+    chunks: list[str] = []
+
+    with pytest.raises(LLMError, match="interrupted"):
+        for chunk in client.stream_chat_iter("hi"):
+            chunks.append(chunk)
+
+    assert chunks == ["Hel"]
+    assert calls == 1
+    assert sleeps == []
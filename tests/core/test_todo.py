@@ -74,3 +74,23 @@ def test_clear_if_all_done_only_clears_on_completion() -> None:
     manager.mark_complete(task_b.id)
     assert manager.clear_if_all_done() is True
     assert manager.tasks() == []
+
+
+def test_next_open_task_tracks_status_changes() -> None:
+    manager = TodoManager()
+    assert manager.next_open_task() is None
+
+    first = manager.create_task("Write docs")
+    second = manager.create_task("Review tests")
+    assert manager.next_open_task() is first
+
+    manager.mark_complete(first.id)
+    assert manager.next_open_task() is second
+
+    manager.update_task(first.id, status="todo")
+    assert manager.next_open_task() is first
+
+    manager.mark_complete(first.id)
+    manager.mark_complete(second.id)
+    assert manager.next_open_task() is None
+    assert not manager.has_unfinished_tasks()
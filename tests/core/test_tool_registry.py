@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from solcoder.core.agent import build_tool_manifest
+from solcoder.core.agent import build_tool_manifest, tool_manifest_prompt
 from solcoder.core.env_diag import DiagnosticResult
 from solcoder.core.tool_registry import (
     Tool,
@@ -111,6 +111,23 @@ def test_knowledge_tool_invokes_client(monkeypatch: pytest.MonkeyPatch) -> None:
     assert result.data["query"] == "Test query"
 
 
+def test_knowledge_client_is_closed_at_exit(monkeypatch: pytest.MonkeyPatch) -> None:
+    from solcoder.core.tools import knowledge
+
+    closed: list[bool] = []
+
+    class FakeClient:
+        def close(self) -> None:
+            closed.append(True)
+
+    monkeypatch.setattr(knowledge, "_KB_CLIENT", FakeClient())
+    knowledge._close_client()
+    knowledge._close_client()
+
+    assert closed == [True]
+    assert knowledge._KB_CLIENT is None
+
+
 def test_diagnostics_tool_serializes_dataclass(monkeypatch: pytest.MonkeyPatch) -> None:
     registry = build_default_registry()
     fake_results = [
@@ -167,3 +184,23 @@ def test_manifest_contains_required_fields() -> None:
 
     diagnostics = next(tk for tk in manifest if tk.name == "solcoder.diagnostics")
     assert diagnostics.tools[0].required == []
+
+
+def test_tool_manifest_prompt_is_reused_until_registry_changes() -> None:
+    registry = build_default_registry()
+
+    first = tool_manifest_prompt(registry)
+    assert tool_manifest_prompt(registry) is first
+
+    registry.add_toolkit(
+        Toolkit(
+            name="custom.module",
+            version="1.0.0",
+            description="Extra tools",
+            tools=[Tool("custom_echo", "Echo", {}, {}, lambda _: ToolResult(content="ok"))],
+        )
+    )
+
+    refreshed = tool_manifest_prompt(registry)
+    assert refreshed is not first
+    assert "custom.module" in refreshed